@@ -0,0 +1,103 @@
+"""
+CSV analysis benchmark: in-memory vs streaming vs chunked NumPy backends.
+
+Writes synthetic CSV files shaped like the sample export (an id column and
+five numeric columns with a share of empty cells) and runs FileProcessor.read_csv
+on each with every backend, each run in a fresh process so its peak memory
+can be reported.
+
+    python benchmarks/csv_backends.py --rows 1000000 10000000
+    python benchmarks/csv_backends.py --rows 10000000 --backends streaming numpy
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from file_processor import CSV_MODES
+
+WRITE_CHUNK = 500_000
+
+
+def write_csv(path: str, rows: int, empty_rate: float, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        f.write("PatientID,Age,Weight,Height,Cholesterol,HeartRate\n")
+        for start in range(0, rows, WRITE_CHUNK):
+            n = min(WRITE_CHUNK, rows - start)
+            ids = (np.arange(start, start + n) % 50_000).astype(str)
+            columns = [
+                rng.integers(18, 90, n).astype(str),
+                np.char.mod("%.1f", rng.normal(76, 4.5, n)),
+                np.char.mod("%.1f", rng.normal(170, 9, n)),
+                rng.integers(150, 260, n).astype(str),
+                rng.integers(55, 100, n).astype(str),
+            ]
+            for column in columns:
+                column[rng.random(n) < empty_rate] = ""
+            lines = ["P" + ",".join(cells) for cells in zip(ids, *columns)]
+            f.write("\n".join(lines) + "\n")
+
+
+def run(path: str, backend: str) -> dict:
+    from file_processor import FileProcessor
+
+    processor = FileProcessor(os.path.dirname(path), log_file=os.path.join(tempfile.mkdtemp(), "bench.log"))
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        processor.read_csv(os.path.basename(path), summary=True, mode=backend)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "output": output.getvalue(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--backends", nargs="+", choices=CSV_MODES, default=list(CSV_MODES))
+    parser.add_argument("--empty-rate", type=float, default=0.01, help="share of empty numeric cells")
+    parser.add_argument("--dir", help="where to write the synthetic files (default: a temporary folder)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    folder = args.dir or tempfile.mkdtemp()
+    results = {}
+    for rows in args.rows:
+        path = os.path.join(folder, f"synthetic_{rows}_{args.empty_rate}.csv")
+        if not os.path.exists(path):
+            write_csv(path, rows, args.empty_rate)
+        results[rows] = {"bytes": os.path.getsize(path)}
+        outputs = set()
+        for backend in args.backends:
+            # A fresh process per run, so peak RSS belongs to that backend alone
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run, path, backend).result()
+            outputs.add(result.pop("output"))
+            results[rows][backend] = result
+            print(f"{rows:>10} rows  {backend:<10}{result['seconds']:>9.2f}s{result['peak_rss_mb']:>10.0f} MB")
+        if len(outputs) > 1:
+            print(f"{rows:>10} rows  WARNING: backends printed different results")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
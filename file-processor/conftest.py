@@ -0,0 +1,38 @@
+import os
+import shutil
+
+import pytest
+from pydicom.data import get_testdata_file
+
+from file_processor import FileProcessor
+
+
+@pytest.fixture
+def processor(tmp_path):
+    """FileProcessor over an empty data folder, logging outside it"""
+    base = tmp_path / "data"
+    base.mkdir()
+    return FileProcessor(str(base), log_file=os.path.join(tmp_path, "logs", "processor.log"))
+
+
+@pytest.fixture
+def write_file(processor):
+    """Write a file under the processor's base_path and return its relative name"""
+    def write(name, text, mode="w"):
+        path = os.path.join(processor.base_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode, newline='' if mode == "w" else None) as f:
+            f.write(text)
+        return name
+    return write
+
+
+@pytest.fixture
+def copy_dicom(processor):
+    """Copy one of pydicom's test files under the processor's base_path and return its relative name"""
+    def copy(name, test_file="CT_small.dcm"):
+        path = os.path.join(processor.base_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy(get_testdata_file(test_file), path)
+        return name
+    return copy
@@ -0,0 +1,78 @@
+"""
+Persistent index of DICOM metadata for FileProcessor.scan_dicom.
+
+An SQLite file maps each DICOM file (absolute path) to its modification time,
+size and the DicomReport extracted from it. A file whose mtime and size are
+unchanged, and whose indexed tags include the ones requested, is answered from
+the index without opening it. Reading an unchanged file again for other tags
+adds them to the ones already indexed.
+"""
+import json
+import os
+import sqlite3
+from dataclasses import asdict, replace
+from typing import List, Optional
+
+from reports import DicomReport
+
+# Pending writes are committed every this many files, so an interrupted scan
+# keeps most of its work
+COMMIT_EVERY = 1000
+
+
+class DicomIndex:
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS dicom_index ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, report TEXT NOT NULL)"
+        )
+        self._pending = 0
+
+    def _indexed(self, file_path: str, stat: os.stat_result) -> Optional[DicomReport]:
+        """Whole indexed report of a file, None if absent or the file changed since"""
+        row = self.connection.execute(
+            "SELECT mtime_ns, size, report FROM dicom_index WHERE path = ?", (os.path.abspath(file_path),)
+        ).fetchone()
+        if row is None or (row[0], row[1]) != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return DicomReport(**json.loads(row[2]))
+
+    def get(self, file_path: str, stat: os.stat_result, tag_keys: List[str]) -> Optional[DicomReport]:
+        """Indexed report of an unchanged file, limited to ``tag_keys`` (None if it must be read)"""
+        report = self._indexed(file_path, stat)
+        if report is None:
+            return None
+        if report.error is None and not set(tag_keys) <= set(report.tags):
+            return None
+        return replace(report, tags={key: report.tags[key] for key in tag_keys if key in report.tags})
+
+    def put(self, file_path: str, stat: os.stat_result, report: DicomReport) -> None:
+        """Index the report of a file, keeping the tags indexed before if the file is unchanged"""
+        if report.error is None:
+            indexed = self._indexed(file_path, stat)
+            if indexed is not None and indexed.error is None:
+                report = replace(report, tags={**indexed.tags, **report.tags})
+        self.connection.execute(
+            "INSERT OR REPLACE INTO dicom_index VALUES (?, ?, ?, ?)",
+            (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, json.dumps(asdict(report))),
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+    def __enter__(self) -> "DicomIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
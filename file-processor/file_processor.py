@@ -4,10 +4,465 @@ import csv
 import statistics
 import pydicom
 import datetime
-from typing import Optional, List, Tuple
+import copy
+import functools
+import glob
+import io
+import itertools
+import locale
+import math
+import warnings
+from collections import Counter
+from dataclasses import replace
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, List, Set, Tuple
 from PIL import Image
 import numpy as np
 
+from dicom_index import DicomIndex
+from reports import REPORT_FORMATS, CSVReport, DicomReport, ReportWriter, check_report_format
+
+# Column names, row count, {numeric column: its statistics}, {other column: value counts}
+CSVStats = Tuple[List[str], int, Dict[str, "RunningStats"], Dict[str, Counter]]
+
+# read_csv modes: rows loaded in memory, one streaming pass, chunked NumPy arrays
+CSV_MODES = ("memory", "streaming", "numpy")
+# "txt" is the hand-formatted report.txt of numeric averages
+CSV_REPORT_FORMATS = ("txt",) + REPORT_FORMATS
+# File name of the statistics of all the files in batch reports
+COMBINED_REPORT = "(combined)"
+# DicomReport fields and the DICOM keywords they come from
+DICOM_FIELDS = {"patient_name": "PatientName", "study_date": "StudyDate", "modality": "Modality"}
+# Files handed to each pool worker at a time by scan_dicom
+SCAN_CHUNK = 64
+
+# Encoding open() uses for text files, applied to the byte ranges of batch analysis
+ENCODING = locale.getpreferredencoding(False)
+
+
+class CSVBatchResult(NamedTuple):
+    # Reports per file path and of all the files together, by column name
+    files: Dict[str, CSVReport]
+    combined: Optional[CSVReport]
+    # Files that could not be analyzed, with the error
+    errors: Dict[str, str]
+
+
+class RunningStats:
+    """Mean, sample standard deviation, min, max and empty cells of a numeric column
+
+    Values are added one at a time (Welford) or a NumPy chunk at a time, and
+    partial results merge exactly with Chan's formula. Infinite and NaN
+    values follow IEEE arithmetic whatever the order or chunking: the mean is
+    their sum (±inf, or nan when both signs or a NaN occur), the standard
+    deviation of two or more values is nan and NaN is left out of min and max.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self._minimum = math.inf
+        self._maximum = -math.inf
+        # Welford/Chan state of the finite values
+        self._finite = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # Sum of the infinite and NaN values, 0.0 while there are none
+        self._nonfinite = 0.0
+
+    @classmethod
+    def from_values(cls, values: List[float], nulls: int = 0) -> "RunningStats":
+        """Statistics of an in-memory list, computed with the statistics module"""
+        if not values:
+            raise statistics.StatisticsError("no values")
+        stats = cls()
+        stats.count = len(values)
+        stats.nulls = nulls
+        if all(map(math.isfinite, values)):
+            finite = numbers = values
+        else:
+            finite = [value for value in values if math.isfinite(value)]
+            numbers = [value for value in values if not math.isnan(value)]
+            stats._nonfinite = sum((value for value in values if not math.isfinite(value)), 0.0)
+        stats._finite = len(finite)
+        if finite:
+            stats._mean = statistics.mean(finite)
+            stats._m2 = statistics.variance(finite) * (len(finite) - 1) if len(finite) > 1 else 0.0
+        if numbers:
+            stats._minimum = min(numbers)
+            stats._maximum = max(numbers)
+        return stats
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value < self._minimum:
+            self._minimum = value
+        if value > self._maximum:
+            self._maximum = value
+        if not math.isfinite(value):
+            self._nonfinite += value
+            return
+        self._finite += 1
+        delta = value - self._mean
+        self._mean += delta / self._finite
+        self._m2 += delta * (value - self._mean)
+
+    @classmethod
+    def of_array(cls, values: np.ndarray, nulls: int = 0) -> "RunningStats":
+        """Statistics of a chunk of values, with vectorized operations"""
+        stats = cls()
+        stats.nulls = nulls
+        if not values.size:
+            return stats
+        stats.count = int(values.size)
+        finite = np.isfinite(values)
+        if not finite.all():
+            with np.errstate(invalid="ignore"):
+                # inf + -inf is nan, as intended
+                stats._nonfinite = float(values[~finite].sum())
+            numbers = values[~np.isnan(values)]
+            if numbers.size:
+                stats._minimum = float(numbers.min())
+                stats._maximum = float(numbers.max())
+            values = values[finite]
+            if not values.size:
+                return stats
+        else:
+            stats._minimum = float(values.min())
+            stats._maximum = float(values.max())
+        stats._finite = int(values.size)
+        stats._mean = float(values.mean())
+        stats._m2 = float(np.square(values - stats._mean).sum())
+        return stats
+
+    def merge(self, other: "RunningStats") -> None:
+        self.nulls += other.nulls
+        if not other.count:
+            return
+        self.count += other.count
+        self._minimum = min(self._minimum, other._minimum)
+        self._maximum = max(self._maximum, other._maximum)
+        self._nonfinite += other._nonfinite
+        if not other._finite:
+            return
+        finite = self._finite + other._finite
+        delta = other._mean - self._mean
+        self._mean += delta * other._finite / finite
+        self._m2 += other._m2 + delta * delta * self._finite * other._finite / finite
+        self._finite = finite
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self._nonfinite == 0.0 else self._nonfinite
+
+    @property
+    def stdev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        if self._nonfinite != 0.0:
+            return math.nan
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    @property
+    def minimum(self) -> float:
+        """Smallest value other than NaN (nan when every value is NaN)"""
+        return self._minimum if self._minimum <= self._maximum or not self.count else math.nan
+
+    @property
+    def maximum(self) -> float:
+        return self._maximum if self._minimum <= self._maximum or not self.count else math.nan
+
+
+def count_leading_rows(lines: Iterable[str], counts: Dict[str, Counter], flipped_at: Dict[str, int],
+                       fieldnames: Optional[List[str]] = None) -> None:
+    """Count the values a column had before it turned out to be categorical
+
+    ``lines`` are the CSV lines read the first time, with the header unless
+    ``fieldnames`` is given. Only the rows before the last flip are re-read;
+    columns that are categorical from their first value need no second pass.
+    """
+    pending = {h: n for h, n in flipped_at.items() if n}
+    if not pending:
+        return
+    last = max(pending.values())
+    for i, row in enumerate(csv.DictReader(lines, fieldnames=fieldnames)):
+        if i >= last:
+            break
+        for h, n in pending.items():
+            if i < n:
+                counts[h][row[h]] += 1
+
+
+def record_chunks(lines: Iterable[str], chunk_rows: int) -> Iterator[List[str]]:
+    """Lists of about ``chunk_rows`` lines, never splitting a quoted field across two lists"""
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_rows))
+        if not chunk:
+            return
+        # An odd number of quotes means the last record goes on in the next line
+        quotes = "".join(chunk).count('"')
+        while quotes % 2:
+            line = next(lines, None)
+            if line is None:
+                break
+            chunk.append(line)
+            quotes += line.count('"')
+        yield chunk
+
+
+class ChunkedCSVStats:
+    """Column statistics of a CSV file fed a chunk of records at a time (NumPy backend)
+
+    Column types are inferred once, from the first chunk: a column is numeric
+    when all its non-empty cells parse as floats. Later chunks are parsed by
+    np.loadtxt straight into a float array per numeric column and a string
+    array per other column; chunks it cannot parse (short rows, quoted line
+    breaks) go through the csv module instead. A numeric column that meets a
+    non-numeric value falls back to value counts, like in the streaming mode.
+    """
+
+    def __init__(self, headers: List[str]):
+        self.headers = headers
+        self.numeric: Dict[str, RunningStats] = {}
+        self.counts: Dict[str, Counter] = {}
+        # Row at which a column seen as numeric so far got its first non-numeric value
+        self.flipped_at: Dict[str, int] = {}
+        self.rows = 0
+        # Cells of short rows in numeric columns, None in csv.DictReader
+        self.missing: Counter = Counter()
+        self._typed = False
+
+    def add_lines(self, lines: List[str]) -> None:
+        """Add a chunk of complete CSV records (header excluded)"""
+        if self._typed:
+            try:
+                with warnings.catch_warnings():
+                    # loadtxt warns about blank lines, which it skips like csv.DictReader
+                    warnings.simplefilter("ignore", UserWarning)
+                    columns, rows = self._load(lines)
+            except ValueError:
+                pass
+            else:
+                self._apply(columns, rows)
+                return
+        self.add_rows(list(csv.reader(lines)))
+
+    def add_rows(self, rows: List[List[str]]) -> None:
+        """Add rows already split by the csv module"""
+        width = len(self.headers)
+        # Like DictReader: skip blank lines, pad short rows and drop extra cells
+        rows = [row if len(row) == width else (row + [None] * width)[:width] for row in rows if row]
+        if not rows:
+            return
+        columns = []
+        for h, column in zip(self.headers, zip(*rows)):
+            if h in self.counts:
+                columns.append(column)
+                continue
+            try:
+                values = np.fromiter(map(float, filter(None, column)), np.float64)
+            except ValueError:
+                columns.append(column)
+                continue
+            columns.append(RunningStats.of_array(values, nulls=len(column) - values.size))
+            self.missing[h] += column.count(None)
+        self._apply(columns, len(rows))
+        self._typed = True
+
+    def _load(self, lines: List[str]) -> Tuple[list, int]:
+        """Parse ``lines`` with np.loadtxt; raises ValueError when it cannot split them"""
+        load = functools.partial(np.loadtxt, lines, delimiter=',', quotechar='"', comments=None, ndmin=2)
+        numeric_idx = [j for j, h in enumerate(self.headers) if h in self.numeric]
+        other_idx = [j for j, h in enumerate(self.headers) if h not in self.numeric]
+        columns = {}
+        if other_idx:
+            block = load(dtype=str, usecols=other_idx)
+            columns.update(zip(other_idx, (column.tolist() for column in block.T)))
+        if numeric_idx:
+            try:
+                # Fast path: no empty or non-numeric cell in these columns
+                block = load(dtype=np.float64, usecols=numeric_idx)
+                columns.update((j, RunningStats.of_array(column)) for j, column in zip(numeric_idx, block.T))
+            except ValueError:
+                block = load(dtype=bytes, usecols=numeric_idx)
+                for j, cells in zip(numeric_idx, block.T):
+                    filled = cells != b''
+                    try:
+                        values = cells[filled].astype(np.float64)
+                    except ValueError:
+                        columns[j] = load(dtype=str, usecols=[j])[:, 0].tolist()
+                        continue
+                    columns[j] = RunningStats.of_array(values, nulls=len(cells) - values.size)
+        return [columns[j] for j in range(len(self.headers))], len(block)
+
+    def _apply(self, columns: list, rows: int) -> None:
+        """Merge a chunk: RunningStats for numeric columns, a sequence of strings for the rest"""
+        for h, column in zip(self.headers, columns):
+            if isinstance(column, RunningStats):
+                self.numeric.setdefault(h, RunningStats()).merge(column)
+            elif h in self.counts:
+                self.counts[h].update(column)
+            else:
+                self.numeric.pop(h, None)
+                self.counts[h] = Counter(column)
+                self.flipped_at[h] = self.rows
+        self.rows += rows
+
+    def count_flipped(self, lines: Iterable[str]) -> None:
+        """Finish the value counts of flipped columns from the lines added so far (header excluded)"""
+        count_leading_rows(lines, self.counts, self.flipped_at, fieldnames=self.headers)
+        self.flipped_at.clear()
+
+    def with_categorical(self, columns: Set[str], recounts: Dict[str, Counter]) -> "ChunkedCSVStats":
+        """Copy where the numeric ``columns`` are replaced by their value counts from ``recounts``"""
+        view = copy.copy(self)
+        view.numeric = {h: stats for h, stats in self.numeric.items() if h not in columns}
+        view.counts = {**self.counts, **{h: recounts[h] for h in self.numeric if h in columns}}
+        return view
+
+    def merge(self, other: "ChunkedCSVStats") -> None:
+        """Add the statistics of another part; a column must be numeric in both or categorical in both"""
+        self.headers = self.headers + [h for h in other.headers if h not in self.headers]
+        for h, stats in other.numeric.items():
+            self.numeric.setdefault(h, RunningStats()).merge(stats)
+        for h, counts in other.counts.items():
+            self.counts.setdefault(h, Counter()).update(counts)
+        self.rows += other.rows
+        self.missing.update(other.missing)
+
+    def result(self) -> Optional[CSVStats]:
+        if not self.rows:
+            return None
+        # A column without any value has no mean; count it as categorical
+        for h in [h for h, acc in self.numeric.items() if not acc.count]:
+            del self.numeric[h]
+            missing = self.missing[h]
+            self.counts[h] = Counter({'': self.rows - missing, None: missing}) + Counter()
+        num_cols = {h: self.numeric[h] for h in self.headers if h in self.numeric}
+        non_num_cols = {h: self.counts[h] for h in self.headers if h in self.counts}
+        return self.headers, self.rows, num_cols, non_num_cols
+
+
+class SplitRecordError(ValueError):
+    """A byte range of a CSV file starts or ends inside a quoted field"""
+
+
+def csv_header(file_path: str) -> Tuple[List[str], int]:
+    """Column names of a CSV file and the byte offset where its records start"""
+    with open(file_path, 'rb') as f:
+        line = f.readline()
+    return next(csv.reader([line.decode(ENCODING)]), []), len(line)
+
+
+def csv_parts(file_path: str, chunk_bytes: Optional[int]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Byte ranges of the records of a file, or [(None, None)] to read it whole"""
+    size = os.path.getsize(file_path)
+    if not chunk_bytes or size <= chunk_bytes:
+        return [(None, None)]
+    _, data_start = csv_header(file_path)
+    n = math.ceil((size - data_start) / chunk_bytes)
+    bounds = [data_start + (size - data_start) * i // n for i in range(n + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def read_part(file_path: str, start: int, end: int) -> str:
+    """Text of the records whose first byte lies in [start, end)
+
+    ``start`` is never before the end of the header, so the byte before it
+    exists; the record running through it belongs to the previous range.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start - 1)
+        f.readline()
+        begin = f.tell()
+        if begin >= end:
+            return ''
+        data = f.read(end - begin)
+        if not data.endswith(b'\n'):
+            data += f.readline()
+    text = data.decode(ENCODING)
+    if text.count('"') % 2:
+        raise SplitRecordError(f"{file_path}: bytes {start}-{end} split a quoted field")
+    return text
+
+
+def analyze_csv_part(file_path: str, start: Optional[int] = None, end: Optional[int] = None,
+                     chunk_rows: int = 100_000) -> ChunkedCSVStats:
+    """NumPy-backend statistics of a whole CSV file, or of the records in one of its csv_parts"""
+    if start is None:
+        with open(file_path, newline='') as csvfile:
+            stats = ChunkedCSVStats(next(csv.reader(csvfile), []))
+            for lines in record_chunks(csvfile, chunk_rows):
+                stats.add_lines(lines)
+            if stats.flipped_at:
+                csvfile.seek(0)
+                next(csv.reader(csvfile))
+                stats.count_flipped(csvfile)
+        return stats
+
+    stats = ChunkedCSVStats(csv_header(file_path)[0])
+    text = read_part(file_path, start, end)
+    for lines in record_chunks(io.StringIO(text, newline=''), chunk_rows):
+        stats.add_lines(lines)
+    if stats.flipped_at:
+        stats.count_flipped(io.StringIO(text, newline=''))
+    return stats
+
+
+def count_csv_part(file_path: str, columns: List[str], start: Optional[int] = None,
+                   end: Optional[int] = None) -> Dict[str, Counter]:
+    """Value counts of ``columns`` in a whole CSV file or one of its csv_parts"""
+    counts = {h: Counter() for h in columns}
+
+    def count(reader: csv.DictReader) -> None:
+        for row in reader:
+            for h in columns:
+                counts[h][row[h]] += 1
+
+    if start is None:
+        with open(file_path, newline='') as csvfile:
+            count(csv.DictReader(csvfile))
+    else:
+        text = read_part(file_path, start, end)
+        count(csv.DictReader(io.StringIO(text, newline=''), fieldnames=csv_header(file_path)[0]))
+    return counts
+
+
+def dicom_value(value) -> Optional[str]:
+    """DICOM element value as a report string (None when absent)"""
+    return None if value is None else str(value)
+
+
+def dicom_tag_key(tag: Tuple[int, int]) -> str:
+    return f"({tag[0]:04X},{tag[1]:04X})"
+
+
+def dicom_header(file_path: str, tags: Iterable[Tuple[int, int]] = ()) -> pydicom.Dataset:
+    """The DICOM_FIELDS and ``tags`` of a file, parsed without reading its pixel data"""
+    return pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=list(DICOM_FIELDS.values()) + list(tags))
+
+
+def read_dicom_metadata(file_path: str, name: str, tags: List[Tuple[int, int]]) -> DicomReport:
+    ds = dicom_header(file_path, tags)
+    report = DicomReport(name, **{field: dicom_value(ds.get(keyword)) for field, keyword in DICOM_FIELDS.items()})
+    for tag in tags:
+        element = ds.get(tag)
+        report.tags[dicom_tag_key(tag)] = dicom_value(element.value if element is not None else None)
+    return report
+
+
+def scan_dicom_file(file_path: str, name: str, tags: List[Tuple[int, int]]) -> Tuple[DicomReport, bool]:
+    """read_dicom_metadata reporting failures, and whether the report may be indexed"""
+    try:
+        return read_dicom_metadata(file_path, name, tags), True
+    except OSError as e:
+        # Not a property of the file's content (permissions, I/O): retried next scan
+        return DicomReport(name, error=str(e)), False
+    except Exception as e:
+        return DicomReport(name, error=str(e)), True
+
+
 class FileProcessor:
     def __init__(self, base_path: str, log_file: str = "processor.log"):
         self.base_path = base_path
@@ -40,64 +495,300 @@ class FileProcessor:
             self.logger.error(f"Folder not found: {folder_path}")
             print("Error: Folder not found.")
 
-    def read_csv(self, filename: str, report_path: Optional[str] = None, summary: bool = False) -> None:
+    def read_csv(self, filename: str, report_path: Optional[str] = None, summary: bool = False,
+                 mode: str = "memory", chunk_rows: int = 100_000, report_format: str = "txt") -> CSVReport:
+        if mode not in CSV_MODES:
+            raise ValueError(f"Unknown CSV mode {mode!r}, expected one of {CSV_MODES}")
+        check_report_format(report_format, CSV_REPORT_FORMATS)
         file_path = os.path.join(self.base_path, filename)
         try:
-            with open(file_path, newline='') as csvfile:
-                reader = list(csv.DictReader(csvfile))
-                if not reader:
-                    print("Empty CSV file.")
-                    return
-                headers = reader[0].keys()
-                print(f"Columns: {list(headers)}")
-                print(f"Rows: {len(reader)}")
+            if mode == "numpy":
+                stats = self._csv_stats_numpy(file_path, chunk_rows)
+            elif mode == "streaming":
+                stats = self._csv_stats_streaming(file_path)
+            else:
+                stats = self._csv_stats_in_memory(file_path)
+            report = CSVReport.from_stats(filename, stats)
+            if stats is None:
+                print("Empty CSV file.")
+                return report
+            self._print_csv_stats(stats, summary)
+
+            if report_path:
+                if report_format == "txt":
+                    os.makedirs(report_path, exist_ok=True)
+                    with open(os.path.join(report_path, "report.txt"), "w") as f:
+                        f.writelines(self._report_lines(stats))
+                else:
+                    with ReportWriter(report_path, report_format) as writer:
+                        writer.add(report)
+                print(f"Saved summary report to {report_path}")
+            return report
+
+        except Exception as e:
+            self.logger.error(f"Error reading CSV: {e}")
+            print("Error: Cannot read CSV file.")
+            return CSVReport(filename, error=str(e))
+
+    def read_csv_batch(self, source: str, report_path: Optional[str] = None, summary: bool = False,
+                       workers: Optional[int] = None, chunk_bytes: Optional[int] = 64 * 1024 * 1024,
+                       chunk_rows: int = 100_000, report_format: str = "txt") -> CSVBatchResult:
+        """Analyze every CSV file of a folder, or matching a glob pattern, in a process pool
+
+        ``source`` is relative to base_path. Files larger than ``chunk_bytes``
+        are split into byte ranges analyzed in parallel with the NumPy backend
+        (None reads every file whole; files with line breaks inside quoted
+        fields fall back to that). A file that fails is reported in the
+        result's errors and left out of the combined statistics.
+
+        Reports other than "txt" hold every file, the failed ones included,
+        and the combined statistics under the file name "(combined)".
+        """
+        check_report_format(report_format, CSV_REPORT_FORMATS)
+        pattern = os.path.normpath(os.path.join(self.base_path, source))
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        files = sorted(glob.glob(pattern, recursive=True))
+        if not files:
+            print("No CSV files found.")
+            return CSVBatchResult({}, None, {})
+
+        # file -> start offset -> (part statistics, start, end)
+        parts: Dict[str, Dict[int, Tuple[ChunkedCSVStats, Optional[int], Optional[int]]]] = {}
+        errors: Dict[str, str] = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = {}
+            whole: Set[str] = set()
+
+            def submit(fn, file_path, *args, start=None, end=None, **kwargs):
+                future = pool.submit(fn, file_path, *args, start=start, end=end, **kwargs)
+                tasks[future] = (file_path, start, end)
+                return future
+
+            def run_tasks():
+                pending = set(tasks)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_path, start, end = tasks.pop(future)
+                        if file_path in errors:
+                            continue
+                        try:
+                            yield file_path, start, end, future.result()
+                        except SplitRecordError:
+                            if file_path not in whole:
+                                whole.add(file_path)
+                                parts.pop(file_path, None)
+                                pending.add(submit(analyze_csv_part, file_path, chunk_rows=chunk_rows))
+                        except Exception as e:
+                            self.logger.error(f"Error reading CSV {file_path}: {e}")
+                            errors[file_path] = str(e)
+                            parts.pop(file_path, None)
+
+            for file_path in files:
+                try:
+                    for start, end in csv_parts(file_path, chunk_bytes):
+                        submit(analyze_csv_part, file_path, start=start, end=end, chunk_rows=chunk_rows)
+                except OSError as e:
+                    self.logger.error(f"Error reading CSV {file_path}: {e}")
+                    errors[file_path] = str(e)
+            for file_path, start, end, part in run_tasks():
+                if file_path in whole and start is not None:
+                    continue
+                parts.setdefault(file_path, {})[start or 0] = (part, start, end)
+
+            # Columns numeric in some parts and categorical in others need value
+            # counts of the numeric parts, for their file or for the combination
+            categorical = {h for file_parts in parts.values() for part, _, _ in file_parts.values() for h in part.counts}
+            for file_path, file_parts in parts.items():
+                for part, start, end in file_parts.values():
+                    columns = [h for h in part.numeric if h in categorical]
+                    if columns:
+                        submit(count_csv_part, file_path, columns, start=start, end=end)
+            recounts = {}
+            for file_path, start, end, counts in run_tasks():
+                recounts[file_path, start or 0] = counts
 
-                num_cols = {}
-                non_num_cols = {}
+        file_stats = {}
+        combined = ChunkedCSVStats([])
+        for file_path in files:
+            if file_path not in parts:
+                continue
+            file_parts = [parts[file_path][key] for key in sorted(parts[file_path])]
+            in_file = {h for part, _, _ in file_parts for h in part.counts}
+            views = []
+            for part, start, _ in file_parts:
+                part_recounts = recounts.get((file_path, start or 0), {})
+                views.append(part.with_categorical(in_file, part_recounts))
+                combined.merge(part.with_categorical(categorical, part_recounts))
+            if len(views) > 1:
+                merged = ChunkedCSVStats([])
+                for view in views:
+                    merged.merge(view)
+                views = [merged]
+            file_stats[file_path] = views[0].result()
+        combined_stats = combined.result()
+        result = CSVBatchResult(
+            {path: CSVReport.from_stats(self._relative(path), stats) for path, stats in file_stats.items()},
+            CSVReport.from_stats(COMBINED_REPORT, combined_stats) if combined_stats else None,
+            errors,
+        )
 
+        print(f"Files: {len(files)} ({len(errors)} failed)")
+        for file_path in files:
+            name = self._relative(file_path)
+            if file_path in errors:
+                print(f"  - {name}: Error: {errors[file_path]}")
+            elif file_stats[file_path] is None:
+                print(f"  - {name}: Empty CSV file")
+            else:
+                headers, rows, _, _ = file_stats[file_path]
+                print(f"  - {name}: Rows = {rows}, Columns = {len(headers)}")
+        if combined_stats:
+            print("Combined:")
+            self._print_csv_stats(combined_stats, summary)
+
+        if report_path:
+            if report_format == "txt":
+                os.makedirs(report_path, exist_ok=True)
+                with open(os.path.join(report_path, "batch_report.txt"), "w") as f:
+                    if combined_stats:
+                        f.write("[combined]\n")
+                        f.writelines(self._report_lines(combined_stats))
+                    for file_path, stats in file_stats.items():
+                        if stats:
+                            f.write(f"[{self._relative(file_path)}]\n")
+                            f.writelines(self._report_lines(stats))
+            else:
+                with ReportWriter(report_path, report_format, prefix="batch_") as writer:
+                    writer.add(result.combined)
+                    for file_path in files:
+                        if file_path in errors:
+                            writer.add(CSVReport(self._relative(file_path), error=errors[file_path]))
+                        else:
+                            writer.add(result.files[file_path])
+            print(f"Saved batch report to {report_path}")
+        return result
+
+    def _relative(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.base_path)
+
+    @staticmethod
+    def _print_csv_stats(stats: CSVStats, summary: bool) -> None:
+        headers, rows, num_cols, non_num_cols = stats
+        print(f"Columns: {list(headers)}")
+        print(f"Rows: {rows}")
+
+        print("Numeric Columns:")
+        for k, col in num_cols.items():
+            print(f"  - {k}: Average = {col.mean:.2f}, Std Dev = {col.stdev:.2f}")
+
+        if summary:
+            print("Non-Numeric Summary:")
+            for k, freq in non_num_cols.items():
+                print(f"  - {k}: Unique Values = {len(freq)}")
+
+    @staticmethod
+    def _report_lines(stats: CSVStats) -> List[str]:
+        return [f"{k}: Avg={col.mean:.2f}, StdDev={col.stdev:.2f}\n" for k, col in stats[2].items()]
+
+    def _csv_stats_in_memory(self, file_path: str) -> Optional[CSVStats]:
+        with open(file_path, newline='') as csvfile:
+            reader = list(csv.DictReader(csvfile))
+        if not reader:
+            return None
+        headers = list(reader[0].keys())
+
+        num_cols = {}
+        non_num_cols = {}
+
+        for h in headers:
+            try:
+                nums = [float(row[h]) for row in reader if row[h]]
+                num_cols[h] = RunningStats.from_values(nums, nulls=len(reader) - len(nums))
+            except ValueError:
+                non_num_cols[h] = Counter(row[h] for row in reader)
+        return headers, len(reader), num_cols, non_num_cols
+
+    def _csv_stats_streaming(self, file_path: str) -> Optional[CSVStats]:
+        """Stream the rows; memory grows with columns and distinct values, not rows
+
+        Usually a single pass. When a column read as numeric meets a
+        non-numeric value after row 0, its earlier values were not counted,
+        so a second pass re-reads the rows up to the last such flip (see
+        ``count_leading_rows``).
+        """
+        with open(file_path, newline='') as csvfile:
+            reader = csv.DictReader(csvfile)
+            headers = reader.fieldnames or []
+            numeric = {h: RunningStats() for h in headers}
+            counts = {}
+            # Row at which a column seen as numeric so far got its first non-numeric value
+            flipped_at = {}
+            # Cells of short rows in numeric columns, None in csv.DictReader
+            missing = Counter()
+            rows = 0
+            for row in reader:
                 for h in headers:
+                    value = row[h]
+                    if h in counts:
+                        counts[h][value] += 1
+                        continue
+                    if not value:
+                        numeric[h].nulls += 1
+                        if value is None:
+                            missing[h] += 1
+                        continue
                     try:
-                        nums = [float(row[h]) for row in reader if row[h]]
-                        avg = statistics.mean(nums)
-                        std = statistics.stdev(nums) if len(nums) > 1 else 0.0
-                        num_cols[h] = (avg, std)
+                        numeric[h].add(float(value))
                     except ValueError:
-                        values = [row[h] for row in reader]
-                        freq = {v: values.count(v) for v in set(values)}
-                        non_num_cols[h] = freq
+                        del numeric[h]
+                        counts[h] = Counter({value: 1})
+                        flipped_at[h] = rows
+                rows += 1
+        if not rows:
+            return None
 
-                print("Numeric Columns:")
-                for k, (avg, std) in num_cols.items():
-                    print(f"  - {k}: Average = {avg:.2f}, Std Dev = {std:.2f}")
+        # A column without any value has no mean; count it as categorical, its
+        # values being the empty cells
+        for h in [h for h, acc in numeric.items() if not acc.count]:
+            del numeric[h]
+            counts[h] = Counter({'': rows - missing[h], None: missing[h]}) + Counter()
+        if flipped_at:
+            with open(file_path, newline='') as csvfile:
+                count_leading_rows(csvfile, counts, flipped_at)
 
-                if summary:
-                    print("Non-Numeric Summary:")
-                    for k, freq in non_num_cols.items():
-                        print(f"  - {k}: Unique Values = {len(freq)}")
+        non_num_cols = {h: counts[h] for h in headers if h in counts}
+        return headers, rows, numeric, non_num_cols
 
-                if report_path:
-                    os.makedirs(report_path, exist_ok=True)
-                    with open(os.path.join(report_path, "report.txt"), "w") as f:
-                        for k, (avg, std) in num_cols.items():
-                            f.write(f"{k}: Avg={avg:.2f}, StdDev={std:.2f}\n")
-                    print(f"Saved summary report to {report_path}")
+    def _csv_stats_numpy(self, file_path: str, chunk_rows: int) -> Optional[CSVStats]:
+        return analyze_csv_part(file_path, chunk_rows=chunk_rows).result()
 
-        except Exception as e:
-            self.logger.error(f"Error reading CSV: {e}")
-            print("Error: Cannot read CSV file.")
+    def read_dicom(self, filename: str, tags: Optional[List[Tuple[int, int]]] = None, extract_image: bool = False,
+                   report_path: Optional[str] = None, report_format: str = "json",
+                   metadata_only: bool = False) -> DicomReport:
+        """Print and report a DICOM file's metadata, optionally saving its image as PNG
 
-    def read_dicom(self, filename: str, tags: Optional[List[Tuple[int, int]]] = None, extract_image: bool = False) -> None:
+        With ``metadata_only`` only the reported elements are parsed and the
+        file is not read past them, leaving out the pixel data.
+        """
+        check_report_format(report_format, REPORT_FORMATS)
+        if metadata_only and extract_image:
+            raise ValueError("extract_image needs the pixel data, which metadata_only skips")
         file_path = os.path.join(self.base_path, filename)
+        report = DicomReport(filename)
         try:
-            ds = pydicom.dcmread(file_path)
-            print(f"Patient Name: {ds.get('PatientName', 'N/A')}")
-            print(f"Study Date: {ds.get('StudyDate', 'N/A')}")
-            print(f"Modality: {ds.get('Modality', 'N/A')}")
+            ds = dicom_header(file_path, tags or []) if metadata_only else pydicom.dcmread(file_path)
+            for field, keyword in DICOM_FIELDS.items():
+                value = ds.get(keyword)
+                print(f"{field.replace('_', ' ').title()}: {value if value is not None else 'N/A'}")
+                setattr(report, field, dicom_value(value))
 
             if tags:
                 for tag in tags:
-                    value = ds.get(tag, "N/A")
-                    print(f"Tag {tag}: {value}")
+                    element = ds.get(tag)
+                    print(f"Tag {tag}: {element if element is not None else 'N/A'}")
+                    report.tags[dicom_tag_key(tag)] = dicom_value(element.value if element is not None else None)
 
             if extract_image and hasattr(ds, 'pixel_array'):
                 arr = ds.pixel_array
@@ -107,7 +798,84 @@ class FileProcessor:
                 img_path = os.path.join(self.base_path, filename.replace(".dcm", ".png"))
                 img.save(img_path)
                 print(f"Extracted image saved to {img_path}")
+                report.image_path = img_path
 
         except Exception as e:
             self.logger.error(f"Error reading DICOM: {e}")
             print("Error: Cannot read DICOM file.")
+            report.error = str(e)
+
+        if report_path:
+            with ReportWriter(report_path, report_format) as writer:
+                writer.add(report)
+        return report
+
+    def scan_dicom(self, source: str, tags: Optional[List[Tuple[int, int]]] = None,
+                   index_path: Optional[str] = None, report_path: Optional[str] = None,
+                   report_format: str = "json", workers: Optional[int] = None) -> List[DicomReport]:
+        """Report the metadata of every DICOM file of a folder, or matching a glob pattern
+
+        ``source`` is relative to base_path. Only the headers are parsed, as
+        with read_dicom(metadata_only=True), in a process pool of ``workers``
+        processes (1 reads in this process). With ``index_path`` the reports
+        are kept in a DicomIndex, and files with the same mtime and size as in
+        a previous scan are answered from it without being opened.
+        """
+        check_report_format(report_format, REPORT_FORMATS)
+        tags = list(tags or [])
+        tag_keys = [dicom_tag_key(tag) for tag in tags]
+        pattern = os.path.normpath(os.path.join(self.base_path, source))
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.dcm")
+        files = sorted(glob.glob(pattern, recursive=True))
+        if not files:
+            print("No DICOM files found.")
+            return []
+
+        reports: Dict[str, DicomReport] = {}
+        to_read: Dict[str, os.stat_result] = {}
+        index = DicomIndex(index_path) if index_path else None
+        from_index = 0
+        try:
+            for file_path in files:
+                try:
+                    stat = os.stat(file_path)
+                except OSError as e:
+                    reports[file_path] = DicomReport(self._relative(file_path), error=str(e))
+                    continue
+                indexed = index.get(file_path, stat, tag_keys) if index else None
+                if indexed:
+                    reports[file_path] = replace(indexed, file=self._relative(file_path))
+                    from_index += 1
+                else:
+                    to_read[file_path] = stat
+
+            args = (list(to_read), [self._relative(path) for path in to_read], itertools.repeat(tags))
+            pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 and len(to_read) > 1 else None
+            try:
+                results = pool.map(scan_dicom_file, *args, chunksize=SCAN_CHUNK) if pool else map(scan_dicom_file, *args)
+                for file_path, (report, indexable) in zip(to_read, results):
+                    reports[file_path] = report
+                    if index and indexable:
+                        index.put(file_path, to_read[file_path], report)
+            finally:
+                if pool:
+                    pool.shutdown(cancel_futures=True)
+        finally:
+            if index:
+                index.close()
+
+        failed = [file_path for file_path in files if reports[file_path].error is not None]
+        for file_path in failed:
+            self.logger.error(f"Error reading DICOM {file_path}: {reports[file_path].error}")
+        print(f"Files: {len(files)} ({from_index} from index, {len(to_read)} read, {len(failed)} failed)")
+        for file_path in failed:
+            print(f"  - {self._relative(file_path)}: Error: {reports[file_path].error}")
+
+        result = [reports[file_path] for file_path in files]
+        if report_path:
+            with ReportWriter(report_path, report_format, prefix="batch_") as writer:
+                for report in result:
+                    writer.add(report)
+            print(f"Saved batch report to {report_path}")
+        return result
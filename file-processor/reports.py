@@ -0,0 +1,192 @@
+"""
+Structured results of FileProcessor.read_csv / read_dicom and their reports.
+
+Both methods return a report object (CSVReport, DicomReport) besides
+printing their summary. ReportWriter collects reports and writes them in one
+go, one file per report kind, as JSON, CSV or Parquet (requires pyarrow).
+The CSV and Parquet layouts are columnar: one row per analyzed CSV column,
+or per DICOM file.
+"""
+import csv
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+REPORT_FORMATS = ("json", "csv", "parquet")
+# Most frequent values kept per categorical column
+TOP_VALUES = 10
+
+
+@dataclass
+class NumericColumn:
+    name: str
+    count: int
+    nulls: int
+    mean: float
+    std: float
+    min: float
+    max: float
+
+
+@dataclass
+class CategoricalColumn:
+    name: str
+    count: int
+    unique: int
+    # (value, occurrences) of the most frequent values
+    top: List[Tuple[Optional[str], int]]
+
+
+@dataclass
+class CSVReport:
+    file: str
+    rows: int = 0
+    columns: List[str] = field(default_factory=list)
+    numeric: List[NumericColumn] = field(default_factory=list)
+    categorical: List[CategoricalColumn] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @classmethod
+    def from_stats(cls, file: str, stats) -> "CSVReport":
+        """Report of the (headers, rows, numeric, value counts) statistics of file_processor"""
+        if stats is None:
+            return cls(file)
+        headers, rows, num_cols, non_num_cols = stats
+        return cls(
+            file=file,
+            rows=rows,
+            columns=list(headers),
+            numeric=[
+                NumericColumn(h, col.count, col.nulls, col.mean, col.stdev, col.minimum, col.maximum)
+                for h, col in num_cols.items()
+            ],
+            categorical=[
+                CategoricalColumn(h, sum(freq.values()), len(freq), freq.most_common(TOP_VALUES))
+                for h, freq in non_num_cols.items()
+            ],
+        )
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Columnar rows, one per analyzed column (a single error row if the file failed)"""
+        if self.error:
+            return [{"file": self.file, "kind": "error", "error": self.error}]
+        records = [
+            {"file": self.file, "kind": "numeric", **asdict(col), "unique": None, "top": None}
+            for col in self.numeric
+        ]
+        records += [
+            {
+                "file": self.file, "kind": "categorical", "name": col.name, "count": col.count,
+                "nulls": None, "mean": None, "std": None, "min": None, "max": None,
+                "unique": col.unique, "top": json.dumps(col.top),
+            }
+            for col in self.categorical
+        ]
+        return records
+
+
+@dataclass
+class DicomReport:
+    file: str
+    patient_name: Optional[str] = None
+    study_date: Optional[str] = None
+    modality: Optional[str] = None
+    # Requested tags as "(gggg,eeee)" -> value
+    tags: Dict[str, Optional[str]] = field(default_factory=dict)
+    image_path: Optional[str] = None
+    error: Optional[str] = None
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Columnar rows: a single one, with a column per requested tag"""
+        record = {k: v for k, v in asdict(self).items() if k != "tags"}
+        record.update(self.tags)
+        return [record]
+
+
+Report = Union[CSVReport, DicomReport]
+
+
+def check_report_format(report_format: str, formats: Tuple[str, ...]) -> None:
+    """Fail before any work for an unknown format, or Parquet without pyarrow"""
+    if report_format not in formats:
+        raise ValueError(f"Unknown report format {report_format!r}, expected one of {formats}")
+    if report_format == "parquet":
+        load_pyarrow()
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet reports require the 'pyarrow' package") from e
+    return pyarrow
+
+
+class ReportWriter:
+    """Collects reports and writes them together, one file per report kind
+
+        with ReportWriter("./reports", "csv") as writer:
+            writer.add(processor.read_csv("a.csv"))
+            writer.add(processor.read_dicom("b.dcm"))
+        # ./reports/csv_report.csv and ./reports/dicom_report.csv
+    """
+
+    def __init__(self, report_path: str, report_format: str = "json", prefix: str = ""):
+        check_report_format(report_format, REPORT_FORMATS)
+        self.report_path = report_path
+        self.report_format = report_format
+        self.prefix = prefix
+        self.reports: Dict[str, List[Report]] = {"csv": [], "dicom": []}
+
+    def add(self, report: Optional[Report]) -> None:
+        if report is not None:
+            self.reports["csv" if isinstance(report, CSVReport) else "dicom"].append(report)
+
+    def write(self) -> List[str]:
+        """Write the collected reports and return the paths written"""
+        os.makedirs(self.report_path, exist_ok=True)
+        written = []
+        for kind, reports in self.reports.items():
+            if not reports:
+                continue
+            path = os.path.join(self.report_path, f"{self.prefix}{kind}_report.{self.report_format}")
+            if self.report_format == "json":
+                with open(path, "w") as f:
+                    json.dump([asdict(report) for report in reports], f, indent=2, default=str)
+            else:
+                records = [record for report in reports for record in report.records()]
+                if self.report_format == "csv":
+                    write_csv(path, records)
+                else:
+                    write_parquet(path, records)
+            written.append(path)
+        return written
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.write()
+
+
+def columns_of(records: List[Dict[str, Any]]) -> List[str]:
+    columns = {}
+    for record in records:
+        columns.update(dict.fromkeys(record))
+    return list(columns)
+
+
+def write_csv(path: str, records: List[Dict[str, Any]]) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns_of(records))
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def write_parquet(path: str, records: List[Dict[str, Any]]) -> None:
+    pa = load_pyarrow()
+    columns = columns_of(records)
+    pa.parquet.write_table(pa.table({c: [record.get(c) for record in records] for c in columns}), path)
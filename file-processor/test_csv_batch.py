@@ -0,0 +1,107 @@
+"""
+read_csv_batch: splitting files into byte ranges must not change any report,
+and a file that fails must not stop the others.
+"""
+import random
+
+import pytest
+
+from file_processor import COMBINED_REPORT
+
+
+def numeric_csv(rows, seed):
+    """Numeric columns with empty cells and a categorical one (few distinct values)"""
+    rng = random.Random(seed)
+    lines = ["id,age,weight,group"]
+    for i in range(rows):
+        weight = "" if rng.random() < 0.1 else f"{rng.gauss(70, 8):.2f}"
+        lines.append(f"{i},{rng.randint(18, 90)},{weight},{rng.choice('ABC')}")
+    return "\n".join(lines) + "\n"
+
+
+def late_flip_csv(rows):
+    """"code" is numeric in the first rows and categorical from the last one on"""
+    lines = ["id,code"] + [f"{i},{i % 7}" for i in range(rows)] + [f"{rows},X"]
+    return "\n".join(lines) + "\n"
+
+
+def quoted_csv(rows):
+    """Quoted fields with line breaks, which byte ranges cannot split"""
+    lines = ["id,note"] + [f'{i},"line {i % 3}\nmore"' for i in range(rows)]
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def batch(write_file):
+    write_file("batch/numbers.csv", numeric_csv(400, seed=1))
+    write_file("batch/more_numbers.csv", numeric_csv(250, seed=2))
+    write_file("batch/flip.csv", late_flip_csv(300))
+    write_file("batch/quoted.csv", quoted_csv(120))
+    write_file("batch/nested/small.csv", "id,age,weight,group\n1,30,,A\n")
+    return "batch/**/*.csv"
+
+
+def assert_same_report(actual, expected):
+    assert (actual.file, actual.rows, actual.columns, actual.error) == (
+        expected.file, expected.rows, expected.columns, expected.error
+    )
+    assert [col.name for col in actual.numeric] == [col.name for col in expected.numeric]
+    for col, other in zip(actual.numeric, expected.numeric):
+        assert (col.count, col.nulls, col.mean, col.std, col.min, col.max) == pytest.approx(
+            (other.count, other.nulls, other.mean, other.std, other.min, other.max)
+        ), col.name
+    assert [(col.name, col.count, col.unique, sorted(col.top)) for col in actual.categorical] == [
+        (col.name, col.count, col.unique, sorted(col.top)) for col in expected.categorical
+    ]
+
+
+def test_split_files_match_whole_files(processor, batch):
+    whole = processor.read_csv_batch(batch, chunk_bytes=None, workers=2)
+    split = processor.read_csv_batch(batch, chunk_bytes=512, workers=2, chunk_rows=16)
+    assert not whole.errors and not split.errors
+    assert list(split.files) == list(whole.files) and len(whole.files) == 5
+    for path, report in whole.files.items():
+        assert_same_report(split.files[path], report)
+    assert_same_report(split.combined, whole.combined)
+    assert whole.combined.file == COMBINED_REPORT
+
+
+def test_batch_files_match_read_csv(processor, batch):
+    result = processor.read_csv_batch(batch, chunk_bytes=512, workers=2)
+    for path, report in result.files.items():
+        assert_same_report(report, processor.read_csv(report.file))
+
+
+def test_combined_report_counts_every_file(processor, batch):
+    combined = processor.read_csv_batch(batch, chunk_bytes=512, workers=2).combined
+    assert combined.rows == 400 + 250 + 301 + 120 + 1
+    # "code" is categorical in flip.csv, so its numeric rows are recounted
+    code = next(col for col in combined.categorical if col.name == "code")
+    assert code.count == 301 and code.unique == 8
+
+
+@pytest.mark.parametrize("chunk_bytes", [None, 64])
+def test_failed_file_does_not_stop_the_batch(processor, batch, write_file, chunk_bytes):
+    expected = processor.read_csv_batch(batch, chunk_bytes=chunk_bytes, workers=2)
+    bad = write_file("batch/bad.csv", b"id,age\n1,2\n" + b"3,\xff\xfe\n" * 20, mode="wb")
+
+    result = processor.read_csv_batch(batch, chunk_bytes=chunk_bytes, workers=2)
+    assert list(result.errors) == [f"{processor.base_path}/{bad}"]
+    assert "decode" in result.errors[f"{processor.base_path}/{bad}"]
+    assert list(result.files) == list(expected.files)
+    for path, report in expected.files.items():
+        assert_same_report(result.files[path], report)
+    assert_same_report(result.combined, expected.combined)
+
+
+def test_failed_files_are_in_reports(processor, batch, write_file, tmp_path):
+    write_file("batch/bad.csv", b"id\n\xff\n", mode="wb")
+    processor.read_csv_batch(batch, report_path=str(tmp_path / "reports"), report_format="csv", workers=2)
+    report = (tmp_path / "reports" / "batch_csv_report.csv").read_text()
+    assert "batch/bad.csv,error," in report
+    assert f"{COMBINED_REPORT},numeric,age," in report
+
+
+def test_no_matching_files(processor):
+    result = processor.read_csv_batch("missing/*.csv")
+    assert result == ({}, None, {})
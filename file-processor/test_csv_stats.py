@@ -0,0 +1,153 @@
+"""
+read_csv modes against each other: the streaming and NumPy modes must report
+what the in-memory mode does, however the NumPy mode chunks or splits a file.
+"""
+import io
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+import file_processor
+from file_processor import CSV_MODES, ChunkedCSVStats, RunningStats, record_chunks
+
+CSV_FILES = {
+    "numeric": "a,b\n1,2.5\n3,-4\n5,6e2\n",
+    "categorical": "name,value\nx,1\ny,2\nx,3\n",
+    "empty_cells": "a,b\n1,\n,2\n3,4\n",
+    "flips_late": "a,b\n1,1\n2,2\n3,x\n4,y\n",
+    "flips_after_empty": "a,b\n,1\n,2\nz,3\n",
+    "all_empty": "a,b\n,1\n,2\n,3\n",
+    "short_rows": "a,b,c\n1,2,3\n4\n5,6\n",
+    "all_empty_short_rows": "a,b\n1,\n2\n3,\n",
+    "quoted_newline": 'a,b\n1,"line\nbreak"\n2,"x"\n',
+    "single_row": "a,b\n1,x\n",
+    "flips_in_later_chunk": "a,b\n1,2\n3,4\n5,6\n7,x\n8,9\n",
+    "short_row_in_later_chunk": "a,b,c\n1,2,3\n4,5,6\n7\n8,9,10\n",
+    "quoted_newline_in_later_chunk": 'a,b\n1,x\n2,y\n3,"line\nbreak"\n4,z\n',
+    "negative_inf_last": "a\n1\n-inf\n",
+    "negative_inf_first": "a\n-inf\n2\n",
+    "both_infs": "a,b\ninf,1\n3,2\n-inf,3\n",
+    "inf_and_empty": "a\ninf\n\n4\n",
+    "nan": "a\n1\nnan\n2\n",
+    "only_nan": "a\nnan\nnan\n",
+    "single_inf": "a\ninf\n",
+}
+# Files whose columns keep one type throughout, so any split of them merges
+SAME_TYPE_FILES = [
+    "numeric", "empty_cells", "short_rows", "short_row_in_later_chunk", "negative_inf_last",
+    "negative_inf_first", "both_infs", "inf_and_empty", "nan", "only_nan", "single_inf",
+]
+# read_csv modes and NumPy chunk sizes compared with the in-memory mode
+MODES = [("streaming", None), ("numpy", 1), ("numpy", 2), ("numpy", 100_000)]
+
+
+def assert_same_stats(actual, expected):
+    """Same CSVStats, numeric statistics compared approximately"""
+    headers, rows, numeric, counts = actual
+    assert (headers, rows, counts) == (expected[0], expected[1], expected[3])
+    assert numeric.keys() == expected[2].keys()
+    for h, acc in numeric.items():
+        other = expected[2][h]
+        assert summary(acc) == pytest.approx(summary(other), nan_ok=True), h
+
+
+def summary(acc):
+    return acc.count, acc.mean, acc.stdev, acc.minimum, acc.maximum, acc.nulls
+
+
+def stats_of(processor, name, mode, chunk_rows=None):
+    path = f"{processor.base_path}/{name}"
+    if mode == "memory":
+        return processor._csv_stats_in_memory(path)
+    if mode == "streaming":
+        return processor._csv_stats_streaming(path)
+    return processor._csv_stats_numpy(path, chunk_rows or 100_000)
+
+
+@pytest.fixture(autouse=True)
+def numpy_warnings_are_errors():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        yield
+
+
+@pytest.mark.parametrize("mode, chunk_rows", MODES)
+@pytest.mark.parametrize("name", sorted(CSV_FILES))
+def test_modes_match_memory_mode(processor, write_file, name, mode, chunk_rows):
+    write_file(name, CSV_FILES[name])
+    assert_same_stats(stats_of(processor, name, mode, chunk_rows), stats_of(processor, name, "memory"))
+
+
+@pytest.mark.parametrize("name", SAME_TYPE_FILES)
+def test_merged_parts_match_memory_mode(processor, write_file, name):
+    write_file(name, CSV_FILES[name])
+    header, _, body = CSV_FILES[name].partition("\n")
+    records = list(record_chunks(io.StringIO(body, newline=''), 1))
+    for split in range(1, len(records)):
+        merged = ChunkedCSVStats([])
+        for part in (records[:split], records[split:]):
+            stats = ChunkedCSVStats(header.split(","))
+            for lines in part:
+                stats.add_lines(lines)
+            merged.merge(stats)
+        assert_same_stats(merged.result(), stats_of(processor, name, "memory"))
+
+
+@pytest.mark.parametrize("values", [
+    [1.0, 2.0, 4.0, 8.0],
+    [1.0, -math.inf, 2.0, 3.0],
+    [-math.inf, 2.0, math.inf, 5.0],
+    [math.inf, math.inf, 1.0],
+    [3.0, math.nan, 1.0],
+    [math.nan, math.nan],
+])
+def test_running_stats_agree_however_values_are_added(values):
+    expected = summary(RunningStats.from_values(values))
+    one_by_one = RunningStats()
+    for value in values:
+        one_by_one.add(value)
+    assert summary(one_by_one) == pytest.approx(expected, nan_ok=True)
+    for split in range(len(values) + 1):
+        merged = RunningStats.of_array(np.array(values[:split]))
+        merged.merge(RunningStats.of_array(np.array(values[split:])))
+        assert summary(merged) == pytest.approx(expected, nan_ok=True), split
+
+
+def test_infinite_values_follow_ieee_arithmetic():
+    assert summary(RunningStats.from_values([1.0, -math.inf])) == pytest.approx(
+        (2, -math.inf, math.nan, -math.inf, 1.0, 0), nan_ok=True
+    )
+    assert math.isnan(RunningStats.from_values([math.inf, -math.inf]).mean)
+    assert summary(RunningStats.from_values([math.inf])) == (1, math.inf, 0.0, math.inf, math.inf, 0)
+
+
+def test_empty_file_has_no_stats(processor, write_file):
+    write_file("empty.csv", "a,b\n")
+    for mode in CSV_MODES:
+        assert stats_of(processor, "empty.csv", mode) is None
+
+
+def test_streaming_reads_all_empty_columns_once(processor, write_file, monkeypatch):
+    rereads = []
+    monkeypatch.setattr(file_processor, "count_leading_rows", lambda *args: rereads.append(args))
+    write_file("all_empty", CSV_FILES["all_empty_short_rows"])
+    _, _, numeric, counts = stats_of(processor, "all_empty", "streaming")
+    assert not rereads
+    assert list(numeric) == ["a"]
+    assert counts == {"b": {"": 2, None: 1}}
+
+
+def test_streaming_rereads_only_flipped_columns(processor, write_file):
+    write_file("flips", CSV_FILES["flips_late"])
+    _, rows, numeric, counts = stats_of(processor, "flips", "streaming")
+    assert rows == 4
+    assert numeric["a"].mean == 2.5
+    assert counts == {"b": {"1": 1, "2": 1, "x": 1, "y": 1}}
+
+
+def test_unknown_mode_is_rejected(processor, write_file):
+    write_file("numeric.csv", CSV_FILES["numeric"])
+    with pytest.raises(ValueError, match="Unknown CSV mode"):
+        processor.read_csv("numeric.csv", mode="python")
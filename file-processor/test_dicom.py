@@ -0,0 +1,111 @@
+"""
+read_dicom(metadata_only=True), scan_dicom and the DicomIndex behind it.
+"""
+import os
+
+import pytest
+
+import file_processor
+from dicom_index import DicomIndex
+from file_processor import dicom_header
+from reports import DicomReport
+
+THICKNESS = (0x0018, 0x0050)
+ROWS = (0x0028, 0x0010)
+
+
+@pytest.fixture
+def ct(processor, copy_dicom):
+    return copy_dicom("scans/ct.dcm")
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Files scan_dicom opens, when it reads in this process (workers=1)"""
+    opened = []
+    read = file_processor.scan_dicom_file
+
+    def scan_dicom_file(file_path, name, tags):
+        opened.append((name, tuple(tags)))
+        return read(file_path, name, tags)
+
+    monkeypatch.setattr(file_processor, "scan_dicom_file", scan_dicom_file)
+    return opened
+
+
+def test_metadata_only_matches_full_read(processor, ct):
+    full = processor.read_dicom(ct, tags=[THICKNESS, ROWS])
+    assert processor.read_dicom(ct, tags=[THICKNESS, ROWS], metadata_only=True) == full
+    assert full.patient_name == "CompressedSamples^CT1" and full.tags == {"(0018,0050)": "5.000000", "(0028,0010)": "128"}
+
+
+def test_metadata_only_skips_pixel_data(processor, ct):
+    header = dicom_header(os.path.join(processor.base_path, ct), [THICKNESS])
+    assert "PixelData" not in header and THICKNESS in header
+    with pytest.raises(ValueError, match="metadata_only"):
+        processor.read_dicom(ct, extract_image=True, metadata_only=True)
+
+
+def test_scan_matches_read_dicom(processor, copy_dicom, write_file):
+    copy_dicom("scans/ct.dcm")
+    copy_dicom("scans/nested/mr.dcm", "MR_small.dcm")
+    write_file("scans/broken.dcm", "not a DICOM file")
+    reports = processor.scan_dicom("scans/**/*.dcm", tags=[THICKNESS], workers=2)
+    assert [report.file for report in reports] == ["scans/broken.dcm", "scans/ct.dcm", "scans/nested/mr.dcm"]
+    assert reports[0].error
+    for report in reports[1:]:
+        assert report == processor.read_dicom(report.file, tags=[THICKNESS], metadata_only=True)
+
+
+def test_scan_answers_unchanged_files_from_index(processor, ct, reads, tmp_path):
+    index = str(tmp_path / "index.sqlite")
+    first = processor.scan_dicom("scans", tags=[THICKNESS], index_path=index, workers=1)
+    again = processor.scan_dicom("scans", tags=[THICKNESS], index_path=index, workers=1)
+    assert again == first
+    assert reads == [("scans/ct.dcm", (THICKNESS,))]
+
+    # A changed file is read again
+    path = os.path.join(processor.base_path, ct)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    processor.scan_dicom("scans", tags=[THICKNESS], index_path=index, workers=1)
+    assert len(reads) == 2
+
+
+def test_scan_with_other_tags_adds_to_the_index(processor, ct, reads, tmp_path):
+    index = str(tmp_path / "index.sqlite")
+    processor.scan_dicom("scans", tags=[THICKNESS], index_path=index, workers=1)
+    processor.scan_dicom("scans", tags=[ROWS], index_path=index, workers=1)
+    both = processor.scan_dicom("scans", tags=[ROWS, THICKNESS], index_path=index, workers=1)
+    assert reads == [("scans/ct.dcm", (THICKNESS,)), ("scans/ct.dcm", (ROWS,))]
+    assert both[0].tags == {"(0028,0010)": "128", "(0018,0050)": "5.000000"}
+
+
+def test_index_get_and_put(tmp_path):
+    file_path = tmp_path / "a.dcm"
+    file_path.write_bytes(b"x")
+    stat = os.stat(file_path)
+    with DicomIndex(str(tmp_path / "index" / "index.sqlite")) as index:
+        assert index.get(str(file_path), stat, []) is None
+        index.put(str(file_path), stat, DicomReport("a.dcm", modality="CT", tags={"(0018,0050)": "5"}))
+        index.put(str(file_path), stat, DicomReport("a.dcm", modality="CT", tags={"(0028,0010)": None}))
+
+        assert index.get(str(file_path), stat, ["(0028,0010)"]) == DicomReport(
+            "a.dcm", modality="CT", tags={"(0028,0010)": None}
+        )
+        assert index.get(str(file_path), stat, []).tags == {}
+        assert index.get(str(file_path), stat, ["(0018,0050)", "(0028,0010)"]).tags == {
+            "(0018,0050)": "5", "(0028,0010)": None,
+        }
+        assert index.get(str(file_path), stat, ["(0008,0070)"]) is None
+
+        # A changed file replaces what was indexed, tags included
+        file_path.write_bytes(b"xy")
+        changed = os.stat(file_path)
+        assert index.get(str(file_path), changed, []) is None
+        index.put(str(file_path), changed, DicomReport("a.dcm", error="bad file"))
+        assert index.get(str(file_path), changed, ["(0018,0050)"]) == DicomReport("a.dcm", error="bad file")
+
+    # Committed on close
+    with DicomIndex(str(tmp_path / "index" / "index.sqlite")) as index:
+        assert index.get(str(file_path), changed, []).error == "bad file"
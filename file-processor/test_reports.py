@@ -0,0 +1,130 @@
+"""
+Report objects returned by read_csv / read_dicom, and ReportWriter files read
+back in every format.
+"""
+import csv
+import json
+import math
+
+import pytest
+
+from reports import CategoricalColumn, CSVReport, DicomReport, NumericColumn, ReportWriter
+
+CSV_TEXT = "id,age,group\n1,30,A\n2,,B\n3,42,A\n4,51\n"
+CT_TAGS = [(0x0018, 0x0050), (0x0028, 0x0010), (0x0011, 0x0011)]
+
+
+@pytest.fixture
+def reports(processor, write_file, copy_dicom):
+    """A CSV report, a failed CSV report and two DICOM reports with different tags"""
+    write_file("data.csv", CSV_TEXT)
+    copy_dicom("ct.dcm")
+    copy_dicom("mr.dcm", "MR_small.dcm")
+    return [
+        processor.read_csv("data.csv"),
+        processor.read_csv("missing.csv"),
+        processor.read_dicom("ct.dcm", tags=CT_TAGS),
+        processor.read_dicom("mr.dcm", tags=[(0x0008, 0x0070)]),
+    ]
+
+
+def test_read_csv_returns_report(processor, write_file):
+    write_file("data.csv", CSV_TEXT)
+    report = processor.read_csv("data.csv")
+    assert (report.file, report.rows, report.columns, report.error) == ("data.csv", 4, ["id", "age", "group"], None)
+    assert report.numeric[0] == NumericColumn("id", 4, 0, 2.5, pytest.approx(math.sqrt(5 / 3)), 1.0, 4.0)
+    assert report.numeric[1] == NumericColumn("age", 3, 1, pytest.approx(41.0), pytest.approx(10.5357, abs=1e-4), 30.0, 51.0)
+    assert report.categorical == [CategoricalColumn("group", 4, 3, [("A", 2), ("B", 1), (None, 1)])]
+
+
+def test_read_csv_reports_failures_and_empty_files(processor, write_file):
+    failed = processor.read_csv("missing.csv")
+    assert failed.file == "missing.csv" and "No such file" in failed.error
+    write_file("empty.csv", "a,b\n")
+    assert processor.read_csv("empty.csv") == CSVReport("empty.csv")
+
+
+def test_read_dicom_returns_report(processor, copy_dicom):
+    copy_dicom("ct.dcm")
+    report = processor.read_dicom("ct.dcm", tags=CT_TAGS)
+    assert report == DicomReport(
+        "ct.dcm", patient_name="CompressedSamples^CT1", study_date="20040119", modality="CT",
+        tags={"(0018,0050)": "5.000000", "(0028,0010)": "128", "(0011,0011)": None},
+    )
+    failed = processor.read_dicom("missing.dcm")
+    assert failed.file == "missing.dcm" and failed.patient_name is None and failed.error
+
+
+def test_read_csv_writes_its_report(processor, write_file, tmp_path):
+    write_file("data.csv", CSV_TEXT)
+    report = processor.read_csv("data.csv", report_path=str(tmp_path / "out"), report_format="json")
+    assert load_json(tmp_path / "out" / "csv_report.json") == [report]
+
+
+def load_json(path):
+    """Reports of a JSON report file, rebuilt as report objects"""
+    reports = []
+    for data in json.loads(path.read_text()):
+        if "rows" in data:
+            data["numeric"] = [NumericColumn(**col) for col in data["numeric"]]
+            data["categorical"] = [
+                CategoricalColumn(**{**col, "top": [tuple(pair) for pair in col["top"]]})
+                for col in data["categorical"]
+            ]
+            reports.append(CSVReport(**data))
+        else:
+            reports.append(DicomReport(**data))
+    return reports
+
+
+def expected_records(reports):
+    """Columnar records of ``reports``, each with every column of the file"""
+    records = [record for report in reports for record in report.records()]
+    columns = list({column: None for record in records for column in record})
+    return [{column: record.get(column) for column in columns} for record in records]
+
+
+def test_json_round_trip(reports, tmp_path):
+    with ReportWriter(str(tmp_path), "json") as writer:
+        for report in reports:
+            writer.add(report)
+    assert load_json(tmp_path / "csv_report.json") == reports[:2]
+    assert load_json(tmp_path / "dicom_report.json") == reports[2:]
+
+
+def test_csv_round_trip(reports, tmp_path):
+    with ReportWriter(str(tmp_path), "csv", prefix="batch_") as writer:
+        for report in reports:
+            writer.add(report)
+    for kind, kind_reports in (("csv", reports[:2]), ("dicom", reports[2:])):
+        with open(tmp_path / f"batch_{kind}_report.csv", newline="") as f:
+            rows = list(csv.DictReader(f))
+        # Every value is written as text, None as an empty cell
+        assert rows == [
+            {column: "" if value is None else str(value) for column, value in record.items()}
+            for record in expected_records(kind_reports)
+        ]
+
+
+def test_parquet_round_trip(reports, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    written = ReportWriter(str(tmp_path), "parquet")
+    for report in reports:
+        written.add(report)
+    paths = written.write()
+    assert [path.rsplit("/", 1)[1] for path in paths] == ["csv_report.parquet", "dicom_report.parquet"]
+    assert pq.read_table(paths[0]).to_pylist() == expected_records(reports[:2])
+    assert pq.read_table(paths[1]).to_pylist() == expected_records(reports[2:])
+
+
+def test_nothing_is_written_when_the_block_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ReportWriter(str(tmp_path / "out"), "json") as writer:
+            writer.add(CSVReport("a.csv"))
+            raise RuntimeError("interrupted")
+    assert not (tmp_path / "out").exists()
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown report format"):
+        ReportWriter(str(tmp_path), "xml")
@@ -0,0 +1,115 @@
+"""
+Storage benchmark for processing-result raw data.
+
+Builds synthetic payloads shaped like POST /api/elements/ data (rows of
+space-separated numbers) and compares the JSON rows the API stores by default
+with raw_codec blobs: encoded size, decode time and time to compute the
+statistics from the stored form.
+
+    python benchmarks/raw_storage.py --rows 100 --values-per-row 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import raw_codec
+from stats_engine import get_engine
+
+# (label, raw_codec.encode keyword arguments); None is the JSON baseline
+FORMATS = {
+    "json": None,
+    "float64": {"dtype": "float64"},
+    "float64+zlib": {"dtype": "float64", "compress": True},
+    "float32": {"dtype": "float32"},
+    "float32+zlib": {"dtype": "float32", "compress": True},
+}
+
+
+def make_payload(rows: int, values_per_row: int, seed: int = 42) -> list:
+    """Rows of sensor-like readings with a few decimals, as the API receives them"""
+    rng = random.Random(seed)
+    return [
+        " ".join(str(round(rng.gauss(50, 15), 3)) for _ in range(values_per_row))
+        for _ in range(rows)
+    ]
+
+
+def timed(func, repeat: int) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(data: list, options, repeat: int) -> dict:
+    engine = get_engine()
+    if options is None:
+        stored = json.dumps(data).encode()
+
+        def load():
+            return engine.parse(json.loads(stored))
+    else:
+        stored = raw_codec.encode(*engine.parse_rows(data), **options)
+
+        def load():
+            return raw_codec.decode(stored).values
+
+    return {
+        "bytes": len(stored),
+        "load_ms": timed(load, repeat),
+        "stats_ms": timed(lambda: engine.compute(load()), repeat),
+        "max_abs_error": float(abs(load() - engine.parse(data)).max()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--values-per-row", type=int, default=1000)
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="timed runs per format"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    data = make_payload(args.rows, args.values_per_row)
+    results = {
+        name: measure(data, options, args.repeat) for name, options in FORMATS.items()
+    }
+
+    baseline = results["json"]["bytes"]
+    print(
+        f"{'format':<16}{'bytes':>12}{'ratio':>8}"
+        f"{'load':>10}{'stats':>10}{'max error':>12}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['bytes']:>12}{result['bytes'] / baseline:>8.2f}"
+            f"{result['load_ms']:>8.2f}ms{result['stats_ms']:>8.2f}ms"
+            f"{result['max_abs_error']:>12.2e}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "rows": args.rows,
+                "values_per_row": args.values_per_row,
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Serialization benchmark for GET /api/elements/ pages.
+
+Seeds processing results into a local database and compares the default
+path (ORM objects validated into ProcessingResultResponse, encoded by
+Pydantic) with the fast path (plain SQL rows encoded by orjson), timing the
+query and the encoding of 100- and 1000-row pages separately.
+
+    python benchmarks/serialization.py --rows 5000 --page-sizes 100 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def seed(engine, rows: int) -> None:
+    from sqlalchemy import insert
+    from models import Base, Device, ProcessingResult
+
+    Base.metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        device_ids = list(conn.scalars(
+            insert(Device).returning(Device.id),
+            [{"device_name": f"DEVICE {i}"} for i in range(10)],
+        ))
+        conn.execute(insert(ProcessingResult), [
+            {
+                "id": f"ser{i:08d}",
+                "device_id": device_ids[i % len(device_ids)],
+                "average_before_normalization": 50.0 + i % 97 / 7,
+                "average_after_normalization": 0.5 + i % 89 / 1000,
+                "data_size": 1000 + i % 500,
+                "raw_data": ["1 2 3"],
+                "created_date": start + timedelta(seconds=37 * i),
+                "updated_date": start + timedelta(seconds=37 * i),
+            }
+            for i in range(rows)
+        ])
+
+
+def percentiles(timings: list) -> dict:
+    return {
+        "p50_ms": statistics.median(timings),
+        "p99_ms": statistics.quantiles(timings, n=100, method="inclusive")[98],
+    }
+
+
+async def measure(page_size: int, repeat: int) -> dict:
+    import orjson
+    import fast_json
+    from crud import get_processing_result_rows, get_processing_results
+    from database import AsyncSessionLocal
+    from schemas import ProcessingResultList, ProcessingResultResponse
+
+    fast_json.orjson = orjson
+    paths = {
+        "pydantic": (
+            get_processing_results,
+            lambda results: ProcessingResultList.dump_json(
+                [ProcessingResultResponse.model_validate(result) for result in results]
+            ),
+        ),
+        "orjson_rows": (get_processing_result_rows, fast_json.dump_rows),
+    }
+
+    measured = {}
+    for name, (load, encode) in paths.items():
+        query_timings, encode_timings, total_timings = [], [], []
+        for attempt in range(repeat + 1):
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                results = await load(db, limit=page_size)
+                loaded = time.perf_counter()
+                body = encode(results)
+                done = time.perf_counter()
+            if attempt == 0:
+                continue  # warm-up
+            query_timings.append((loaded - start) * 1000)
+            encode_timings.append((done - loaded) * 1000)
+            total_timings.append((done - start) * 1000)
+        measured[name] = {
+            "bytes": len(body),
+            "query": percentiles(query_timings),
+            "encode": percentiles(encode_timings),
+            "total": percentiles(total_timings),
+        }
+    return measured
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--database-url", help="database to seed (default: a fresh SQLite file)"
+    )
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument(
+        "--repeat", type=int, default=50, help="timed runs per path and page size"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # The app modules read DATABASE_URL on import
+    path = os.path.join(tempfile.mkdtemp(), "bench_serialization.db")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{path}"
+    from database import engine
+    seed(engine, args.rows)
+
+    results = {}
+    for page_size in args.page_sizes:
+        results[page_size] = asyncio.run(measure(page_size, args.repeat))
+
+    print(
+        f"{'rows':>6}  {'path':<12}"
+        f"{'query p50':>12}{'encode p50':>12}{'total p50':>12}{'total p99':>12}"
+    )
+    for page_size, paths in results.items():
+        for name, result in paths.items():
+            print(
+                f"{page_size:>6}  {name:<12}"
+                f"{result['query']['p50_ms']:>10.2f}ms"
+                f"{result['encode']['p50_ms']:>10.2f}ms"
+                f"{result['total']['p50_ms']:>10.2f}ms"
+                f"{result['total']['p99_ms']:>10.2f}ms"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "database": engine.dialect.name,
+                "rows": args.rows,
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
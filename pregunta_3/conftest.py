@@ -0,0 +1,27 @@
+"""
+Shared test setup: the app runs in-process against one throwaway SQLite
+database, emptied together with the in-process caches before each test module.
+"""
+import os
+import tempfile
+
+# database.py reads the URL at import time, so it must be set before any app import
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest
+
+import models
+from database import engine
+from device_cache import device_cache
+from response_cache import build_backend, response_cache
+
+
+@pytest.fixture(scope="module", autouse=True)
+def clean_state():
+    """Start every module with empty tables, device cache and response cache"""
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    device_cache.clear()
+    response_cache.backend = build_backend()
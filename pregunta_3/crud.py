@@ -1,131 +1,607 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
 from datetime import datetime
-import statistics
+import base64
+import json
 
-from models import ProcessingResult, Device
+import numpy as np
+
+import raw_codec
+from config import settings
+from database import upsert_for
+from device_cache import device_cache, cache_after_commit
+from metrics import STAGE_LATENCY
+from models import (
+    ProcessingResult, Device, STATUS_COMPLETED, STATUS_FAILED, STATUS_PENDING
+)
+from rollups import (
+    BUCKET, base_stats, bucket_of, merge_stats, record_inserts, refresh_buckets,
+    rollup_stats, rollups, truncate_to
+)
 from schemas import ProcessingResultCreate, ProcessingResultUpdate
+from stats_engine import get_engine
 
-def get_or_create_device(db: Session, device_name: str) -> Device:
-    """Get existing device or create new one"""
-    device = db.query(Device).filter(Device.device_name == device_name).first()
-    if not device:
-        device = Device(device_name=device_name)
-        db.add(device)
-        db.commit()
-        db.refresh(device)
-    return device
+async def get_or_create_device(db: AsyncSession, device_name: str) -> Device:
+    """Get or create a device (committed with the caller's transaction)"""
+    devices = await get_or_create_devices(db, [device_name])
+    return devices[device_name]
 
 def process_data(data: List[str]) -> tuple:
     """Process raw data and return statistics"""
-    # Convert string data to numbers
-    all_numbers = []
-    for row in data:
-        numbers = [float(x) for x in row.split()]
-        all_numbers.extend(numbers)
-    
-    # Calculate average before normalization
-    avg_before = statistics.mean(all_numbers)
-    
-    # Normalize data (0 to 1)
-    max_value = max(all_numbers)
-    normalized_numbers = [x / max_value for x in all_numbers]
-    
-    # Calculate average after normalization
-    avg_after = statistics.mean(normalized_numbers)
-    
-    return avg_before, avg_after, len(all_numbers)
-
-def create_processing_result(db: Session, result: ProcessingResultCreate) -> ProcessingResult:
-    """Create a new processing result"""
-    # Get or create device
-    device = get_or_create_device(db, result.device_name)
-    
-    # Process data
-    avg_before, avg_after, data_size = process_data(result.data)
-    
-    # Create processing result
-    db_result = ProcessingResult(
-        id=result.id,
-        device_id=device.id,
-        average_before_normalization=avg_before,
-        average_after_normalization=avg_after,
-        data_size=data_size,
-        raw_data=result.data
-    )
+    stats = get_engine().process(data)
+    return stats.avg_before, stats.avg_after, stats.data_size
+
+def compute_result_fields(
+    data: List[str],
+    values: Optional[np.ndarray] = None,
+    row_lengths: Optional[np.ndarray] = None
+) -> dict:
+    """Statistics and stored raw data of one element's data rows
     
-    db.add(db_result)
-    db.commit()
-    db.refresh(db_result)
-    return db_result
+    ``values`` and ``row_lengths`` are the already parsed rows, if any; binary
+    raw data storage needs both.
+    """
+    engine = get_engine()
+    binary = settings.raw_data_storage == "binary"
+    if values is None or (binary and row_lengths is None):
+        if binary:
+            values, row_lengths = engine.parse_rows(data)
+        else:
+            values = engine.parse(data)
+    stats = engine.compute(values)
+    
+    fields = {
+        "average_before_normalization": stats.avg_before,
+        "average_after_normalization": stats.avg_after,
+        "data_size": stats.data_size,
+        "status": STATUS_COMPLETED,
+    }
+    if binary:
+        fields["raw_data"] = None
+        fields["raw_values"] = raw_codec.encode(
+            values, row_lengths,
+            dtype=settings.raw_data_dtype, compress=settings.raw_data_compress
+        )
+    else:
+        fields["raw_data"] = data
+    return fields
 
-def get_processing_results(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
-    **filters
+def build_result_row(
+    result: ProcessingResultCreate, device_id: int, pending: bool = False
+) -> dict:
+    """Row of a new processing result; pending rows only keep the raw data"""
+    row = {"id": result.id, "device_id": device_id}
+    if pending:
+        row.update(raw_data=result.data, status=STATUS_PENDING)
+    else:
+        with STAGE_LATENCY.time(stage="process_data"):
+            row.update(compute_result_fields(
+                result.data, result.parsed_values, result.parsed_row_lengths
+            ))
+    return row
+
+async def get_or_create_devices(
+    db: AsyncSession, device_names: Iterable[str]
+) -> Dict[str, Device]:
+    """Resolve many device names at once, creating the missing ones (no commit)
+    
+    Known devices come from the in-process device cache; only names never
+    seen before reach the database, with a single SELECT plus one upsert.
+    """
+    names = set(device_names)
+    devices = {
+        name: entry.to_device() for name, entry in device_cache.get_many(names).items()
+    }
+    missing = names - devices.keys()
+    if not missing:
+        return devices
+    
+    known = select(Device).where(Device.device_name.in_(missing))
+    for device in await db.scalars(known):
+        device_cache.put(device)
+        devices[device.device_name] = device
+    missing -= devices.keys()
+    if not missing:
+        return devices
+    
+    upsert = upsert_for(db.get_bind().dialect.name)
+    rows = [{"device_name": name} for name in sorted(missing)]
+    if upsert is not None:
+        # DO UPDATE (a no-op) instead of DO NOTHING so RETURNING also yields
+        # rows inserted concurrently by another transaction
+        stmt = upsert(Device).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Device.device_name],
+            set_={"device_name": stmt.excluded.device_name}
+        )
+        created = list(await db.scalars(stmt.returning(Device)))
+    else:
+        for row in rows:
+            # A concurrent first insert of the same name trips the unique
+            # constraint; the savepoint keeps the outer transaction usable
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(Device), [row])
+            except IntegrityError:
+                pass
+        created = list(await db.scalars(
+            select(Device).where(Device.device_name.in_(missing))
+        ))
+    
+    # New rows only become visible to other sessions once this one commits
+    cache_after_commit(db.sync_session, created)
+    devices.update({device.device_name: device for device in created})
+    return devices
+
+async def create_processing_results_bulk(
+    db: AsyncSession,
+    results: List[ProcessingResultCreate],
+    pending: bool = False
 ) -> List[ProcessingResult]:
-    """Get processing results with optional filtering"""
-    query = db.query(ProcessingResult)
+    """Create many processing results in a single transaction
     
-    # Apply filters
+    With ``pending`` the statistics are left for a background worker
+    (see workers.py) and the results are stored with the pending status.
+    """
+    if not results:
+        return []
+    
+    names = (result.device_name for result in results)
+    devices = await get_or_create_devices(db, names)
+    
+    rows = [
+        build_result_row(result, devices[result.device_name].id, pending)
+        for result in results
+    ]
+    
+    try:
+        # One executemany; RETURNING hands back the server-side timestamps
+        with STAGE_LATENCY.time(stage="db_flush"):
+            db_results = list(await db.scalars(
+                insert(ProcessingResult)
+                .returning(ProcessingResult, sort_by_parameter_order=True),
+                rows
+            ))
+            if not pending:
+                await record_inserts(db, db_results)
+        # Attach the already resolved devices so serializing needs no query
+        for db_result, result in zip(db_results, results):
+            set_committed_value(db_result, "device", devices[result.device_name])
+        with STAGE_LATENCY.time(stage="db_commit"):
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return db_results
+
+async def complete_processing_results(
+    db: AsyncSession, fields_by_id: Dict[str, dict]
+) -> List[str]:
+    """Store computed fields of pending results and return the completed ids
+    
+    Results that are no longer pending (or locked by another worker) are
+    skipped, so completing the same results twice is harmless.
+    """
+    pending = (await db.execute(
+        select(
+            ProcessingResult.id,
+            ProcessingResult.device_id,
+            ProcessingResult.created_date,
+        )
+        .where(
+            ProcessingResult.id.in_(fields_by_id),
+            ProcessingResult.status == STATUS_PENDING,
+        )
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not pending:
+        return []
+    
+    try:
+        # Keyed by the table's full primary key, which prunes to one partition
+        await db.execute(update(ProcessingResult), [
+            {"id": row.id, "created_date": row.created_date, **fields_by_id[row.id]}
+            for row in pending
+        ])
+        await record_inserts(db, [
+            ProcessingResult(
+                device_id=row.device_id, created_date=row.created_date,
+                **fields_by_id[row.id]
+            )
+            for row in pending
+        ])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return [row.id for row in pending]
+
+async def fail_processing_results(db: AsyncSession, result_ids: Iterable[str]) -> None:
+    """Mark pending results whose statistics could not be computed"""
+    await db.execute(
+        update(ProcessingResult)
+        .where(
+            ProcessingResult.id.in_(list(result_ids)),
+            ProcessingResult.status == STATUS_PENDING,
+        )
+        .values(status=STATUS_FAILED)
+    )
+    await db.commit()
+
+def apply_filters(query, filters: dict):
+    """Apply the list endpoint filters (ranges, device_name) to a query"""
+    if filters.get('device_name'):
+        query = query.where(ProcessingResult.device_id == (
+            select(Device.id)
+            .where(Device.device_name == filters['device_name'])
+            .scalar_subquery()
+        ))
     if filters.get('created_date_from'):
-        query = query.filter(ProcessingResult.created_date >= filters['created_date_from'])
+        query = query.where(
+            ProcessingResult.created_date >= filters['created_date_from']
+        )
     if filters.get('created_date_to'):
-        query = query.filter(ProcessingResult.created_date <= filters['created_date_to'])
+        query = query.where(ProcessingResult.created_date <= filters['created_date_to'])
     if filters.get('updated_date_from'):
-        query = query.filter(ProcessingResult.updated_date >= filters['updated_date_from'])
+        query = query.where(
+            ProcessingResult.updated_date >= filters['updated_date_from']
+        )
     if filters.get('updated_date_to'):
-        query = query.filter(ProcessingResult.updated_date <= filters['updated_date_to'])
+        query = query.where(ProcessingResult.updated_date <= filters['updated_date_to'])
     if filters.get('avg_before_min'):
-        query = query.filter(ProcessingResult.average_before_normalization >= filters['avg_before_min'])
+        query = query.where(
+            ProcessingResult.average_before_normalization >= filters['avg_before_min']
+        )
     if filters.get('avg_before_max'):
-        query = query.filter(ProcessingResult.average_before_normalization <= filters['avg_before_max'])
+        query = query.where(
+            ProcessingResult.average_before_normalization <= filters['avg_before_max']
+        )
     if filters.get('avg_after_min'):
-        query = query.filter(ProcessingResult.average_after_normalization >= filters['avg_after_min'])
+        query = query.where(
+            ProcessingResult.average_after_normalization >= filters['avg_after_min']
+        )
     if filters.get('avg_after_max'):
-        query = query.filter(ProcessingResult.average_after_normalization <= filters['avg_after_max'])
+        query = query.where(
+            ProcessingResult.average_after_normalization <= filters['avg_after_max']
+        )
     if filters.get('data_size_min'):
-        query = query.filter(ProcessingResult.data_size >= filters['data_size_min'])
+        query = query.where(ProcessingResult.data_size >= filters['data_size_min'])
     if filters.get('data_size_max'):
-        query = query.filter(ProcessingResult.data_size <= filters['data_size_max'])
+        query = query.where(ProcessingResult.data_size <= filters['data_size_max'])
+    
+    return query
+
+def encode_cursor(result: ProcessingResult) -> str:
+    """Build the opaque keyset token pointing just after ``result``"""
+    key = json.dumps([result.created_date.isoformat(), result.id])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a keyset token into its (created_date, id) position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_date, result_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_date), str(result_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+async def get_processing_results(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    **filters
+) -> List[ProcessingResult]:
+    """Get processing results with optional filtering
     
-    return query.offset(skip).limit(limit).all()
+    Results are ordered by (created_date, id). When ``cursor`` is given the page
+    starts right after that position (keyset pagination) and ``skip`` is
+    ignored, so deep pages cost the same as the first one.
+    """
+    query = select(ProcessingResult).options(
+        joinedload(ProcessingResult.device, innerjoin=True)
+    )
+    return list(await db.scalars(page_query(query, skip, limit, cursor, filters)))
 
-def get_processing_result(db: Session, result_id: str) -> Optional[ProcessingResult]:
+def page_query(query, skip: int, limit: int, cursor: Optional[str], filters: dict):
+    """Order, position and filter a list query over ProcessingResult"""
+    query = query.order_by(ProcessingResult.created_date, ProcessingResult.id)
+    if cursor:
+        position = tuple_(ProcessingResult.created_date, ProcessingResult.id)
+        query = query.where(position > decode_cursor(cursor))
+        skip = 0
+    return apply_filters(query, filters).offset(skip).limit(limit)
+
+async def get_processing_result_rows(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    **filters
+) -> list:
+    """The same page as get_processing_results, as plain rows without ORM objects
+    
+    Columns are fast_json.RESULT_FIELDS followed by the device's
+    fast_json.DEVICE_FIELDS.
+    """
+    query = select(
+        ProcessingResult.id,
+        ProcessingResult.device_id,
+        ProcessingResult.average_before_normalization,
+        ProcessingResult.average_after_normalization,
+        ProcessingResult.data_size,
+        ProcessingResult.status,
+        ProcessingResult.created_date,
+        ProcessingResult.updated_date,
+        # Labeled so row.id and row.created_date stay the result's (encode_cursor)
+        Device.id.label("device__id"),
+        Device.device_name.label("device__device_name"),
+        Device.created_date.label("device__created_date"),
+    ).join(ProcessingResult.device)
+    return (await db.execute(page_query(query, skip, limit, cursor, filters))).all()
+
+async def get_processing_result(
+    db: AsyncSession, result_id: str
+) -> Optional[ProcessingResult]:
     """Get a specific processing result by ID"""
-    return db.query(ProcessingResult).filter(ProcessingResult.id == result_id).first()
+    return await db.scalar(
+        select(ProcessingResult)
+        .options(joinedload(ProcessingResult.device, innerjoin=True))
+        .where(ProcessingResult.id == result_id)
+        .execution_options(populate_existing=True)
+    )
 
-def update_processing_result(
-    db: Session,
+async def update_processing_result(
+    db: AsyncSession,
     result_id: str,
     update_data: ProcessingResultUpdate
 ) -> Optional[ProcessingResult]:
     """Update a processing result"""
-    db_result = db.query(ProcessingResult).filter(ProcessingResult.id == result_id).first()
+    db_result = await db.scalar(
+        select(ProcessingResult).where(ProcessingResult.id == result_id)
+    )
     if not db_result:
         return None
     
+    old_bucket = (db_result.device_id, db_result.created_date)
+    
     # Update device if provided
     if update_data.device_name:
-        device = get_or_create_device(db, update_data.device_name)
+        device = await get_or_create_device(db, update_data.device_name)
         db_result.device_id = device.id
     
     # Update ID if provided
     if update_data.id:
         db_result.id = update_data.id
     
-    db.commit()
-    db.refresh(db_result)
-    return db_result
+    if db_result.device_id != old_bucket[0]:
+        await db.flush()
+        new_bucket = (db_result.device_id, db_result.created_date)
+        await refresh_buckets(db, [old_bucket, new_bucket])
+    await db.commit()
+    # Reload with the device and the new updated_date
+    return await get_processing_result(db, db_result.id)
 
-def delete_processing_result(db: Session, result_id: str) -> bool:
+async def delete_processing_result(db: AsyncSession, result_id: str) -> bool:
     """Delete a processing result"""
-    db_result = db.query(ProcessingResult).filter(ProcessingResult.id == result_id).first()
+    db_result = await db.scalar(
+        select(ProcessingResult).where(ProcessingResult.id == result_id)
+    )
     if not db_result:
         return False
     
-    db.delete(db_result)
-    db.commit()
+    await db.delete(db_result)
+    await db.flush()
+    await refresh_buckets(db, [(db_result.device_id, db_result.created_date)])
+    await db.commit()
     return True
+
+async def _matching_chunks(
+    db: AsyncSession,
+    ids: Optional[Sequence[str]],
+    chunk_size: int,
+    filters: dict,
+    *where
+) -> AsyncIterator[list]:
+    """Yield locked (id, device_id, created_date) rows of a bulk selection, by chunks
+    
+    Explicit ids are taken ``chunk_size`` at a time; a filter-only selection
+    is walked in id order with a keyset, so each chunk is one indexed query.
+    """
+    columns = select(
+        ProcessingResult.id, ProcessingResult.device_id, ProcessingResult.created_date
+    )
+    query = (
+        apply_filters(columns, filters)
+        .where(*where)
+        .order_by(ProcessingResult.id)
+        .limit(chunk_size)
+        .with_for_update()
+    )
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start:start + chunk_size]
+            rows = (await db.execute(
+                query.where(ProcessingResult.id.in_(chunk_ids))
+            )).all()
+            if rows:
+                yield rows
+        return
+    
+    last_id = None
+    while True:
+        chunk_query = query
+        if last_id is not None:
+            chunk_query = query.where(ProcessingResult.id > last_id)
+        rows = (await db.execute(chunk_query)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+async def bulk_update_processing_results(
+    db: AsyncSession,
+    new_device_name: str,
+    ids: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+    **filters
+) -> AsyncIterator[List[str]]:
+    """Reassign the selected results to ``new_device_name``, one UPDATE per chunk
+    
+    Every chunk is committed on its own so row locks are held briefly;
+    yields the ids updated by each chunk.
+    """
+    chunk_size = chunk_size or settings.bulk_chunk_size
+    device_id = (await get_or_create_device(db, new_device_name)).id
+    try:
+        moving = ProcessingResult.device_id != device_id
+        async for rows in _matching_chunks(db, ids, chunk_size, filters, moving):
+            row_ids = [row.id for row in rows]
+            await db.execute(
+                update(ProcessingResult)
+                .where(ProcessingResult.id.in_(row_ids))
+                .values(device_id=device_id)
+                .execution_options(synchronize_session=False)
+            )
+            await refresh_buckets(db, [
+                # The bucket the row leaves and the one it joins
+                (bucket_device_id, row.created_date)
+                for row in rows
+                for bucket_device_id in (row.device_id, device_id)
+            ])
+            await db.commit()
+            yield row_ids
+        # Commits a device created for a selection that matched nothing
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+async def bulk_delete_processing_results(
+    db: AsyncSession,
+    ids: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+    **filters
+) -> AsyncIterator[List[str]]:
+    """Delete the selected results with one DELETE per chunk
+    
+    Every chunk is committed on its own so row locks are held briefly;
+    yields the ids deleted by each chunk.
+    """
+    chunk_size = chunk_size or settings.bulk_chunk_size
+    try:
+        async for rows in _matching_chunks(db, ids, chunk_size, filters):
+            row_ids = [row.id for row in rows]
+            await db.execute(
+                delete(ProcessingResult)
+                .where(ProcessingResult.id.in_(row_ids))
+                .execution_options(synchronize_session=False)
+            )
+            await refresh_buckets(
+                db, [(row.device_id, row.created_date) for row in rows]
+            )
+            await db.commit()
+            yield row_ids
+    except Exception:
+        await db.rollback()
+        raise
+
+async def aggregate_processing_results(
+    db: AsyncSession,
+    group_by: Sequence[str] = (),
+    **filters
+) -> List[dict]:
+    """Count, min/max/mean of both averages and total data_size per group
+    
+    ``group_by`` holds "device" and/or one time bucket, "hour" or "day". When
+    only created_date filters are given, whole hours are read from the rollup
+    table and processing_results is only scanned for the partial hours at the
+    edges of the range.
+    """
+    dialect_name = db.get_bind().dialect.name
+    by_device = "device" in group_by
+    unit = next((name for name in group_by if name in ("hour", "day")), None)
+    
+    def grouped(device_id, created_date, stats):
+        keys = []
+        if by_device:
+            keys.append(device_id.label("device_id"))
+        if unit:
+            keys.append(truncate_to(dialect_name, unit, created_date).label("bucket"))
+        return select(*keys, *stats).group_by(*keys)
+    
+    def from_base(**range_filters):
+        return apply_filters(
+            grouped(
+                ProcessingResult.device_id, ProcessingResult.created_date, base_stats()
+            ),
+            range_filters
+        )
+    
+    start, end = filters.get('created_date_from'), filters.get('created_date_to')
+    first = start and (
+        start if start == bucket_of(start) else bucket_of(start) + BUCKET
+    )
+    last = end and bucket_of(end)
+    only_dates = not any(
+        value for name, value in filters.items()
+        if not name.startswith('created_date_')
+    )
+    
+    if only_dates and (first is None or last is None or first < last):
+        query = grouped(rollups.c.device_id, rollups.c.bucket, rollup_stats())
+        if first:
+            query = query.where(rollups.c.bucket >= first)
+        if last:
+            query = query.where(rollups.c.bucket < last)
+        queries = [query]
+        if start and start < first:
+            queries.append(
+                from_base(created_date_from=start)
+                .where(ProcessingResult.created_date < first)
+            )
+        if end:
+            queries.append(from_base(created_date_from=last, created_date_to=end))
+    else:
+        queries = [from_base(**filters)]
+    
+    # Merge the partial groups of each query
+    totals: Dict[tuple, dict] = {}
+    for query in queries:
+        for row in await db.execute(query):
+            if not row.result_count:
+                continue  # an ungrouped aggregate over no rows
+            key = tuple(row)[:by_device + bool(unit)]
+            if key in totals:
+                merge_stats(totals[key], row._mapping)
+            else:
+                totals[key] = dict(row._mapping)
+    
+    names = {}
+    if by_device and totals:
+        names = dict((await db.execute(
+            select(Device.id, Device.device_name)
+            .where(Device.id.in_({stats["device_id"] for stats in totals.values()}))
+        )).all())
+    
+    return [
+        {
+            "device_id": stats.get("device_id"),
+            "device_name": names.get(stats.get("device_id")),
+            "bucket": stats.get("bucket"),
+            "count": stats["result_count"],
+            "avg_before_min": stats["avg_before_min"],
+            "avg_before_max": stats["avg_before_max"],
+            "avg_before_mean": stats["avg_before_sum"] / stats["result_count"],
+            "avg_after_min": stats["avg_after_min"],
+            "avg_after_max": stats["avg_after_max"],
+            "avg_after_mean": stats["avg_after_sum"] / stats["result_count"],
+            "total_data_size": int(stats["data_size_total"]),
+        }
+        for _, stats in sorted(totals.items())
+    ]
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config import settings
+from models import Device
+
+# Session.info key holding devices created in the current transaction
+PENDING_KEY = "device_cache_pending"
+
+
+class CachedDevice(NamedTuple):
+    """Immutable snapshot of a devices row"""
+    id: int
+    device_name: str
+    created_date: Optional[datetime]
+
+    @classmethod
+    def from_device(cls, device: Device) -> "CachedDevice":
+        return cls(device.id, device.device_name, device.created_date)
+
+    def to_device(self) -> Device:
+        """Build a detached Device usable in any session without a query"""
+        device = Device(id=self.id, device_name=self.device_name, created_date=self.created_date)
+        make_transient_to_detached(device)
+        return device
+
+
+class DeviceCache:
+    """Bounded LRU cache of devices keyed by device_name
+
+    Entries are plain snapshots guarded by a lock, so one cache can be shared
+    by every request, thread and session. Devices are only ever added, never
+    renamed or deleted, so entries do not need expiring.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CachedDevice]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, device_name: str) -> Optional[CachedDevice]:
+        with self._lock:
+            entry = self._entries.get(device_name)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(device_name)
+            self.hits += 1
+            return entry
+
+    def get_many(self, device_names: Iterable[str]) -> Dict[str, CachedDevice]:
+        """Return the cached subset of ``device_names``"""
+        found = {}
+        for name in device_names:
+            entry = self.get(name)
+            if entry is not None:
+                found[name] = entry
+        return found
+
+    def put(self, device) -> None:
+        """Cache a Device (or CachedDevice) snapshot"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[device.device_name] = CachedDevice.from_device(device)
+            self._entries.move_to_end(device.device_name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+device_cache = DeviceCache(settings.device_cache_size)
+
+
+def cache_after_commit(session: Session, devices: Iterable[Device]) -> None:
+    """Cache devices created in this transaction once (and only if) it commits"""
+    session.info.setdefault(PENDING_KEY, []).extend(
+        CachedDevice.from_device(device) for device in devices
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for entry in session.info.pop(PENDING_KEY, []):
+        device_cache.put(entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
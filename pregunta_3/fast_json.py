@@ -0,0 +1,58 @@
+"""
+Opt-in fast JSON path (``FAST_JSON=true``, requires the orjson package).
+
+Responses are encoded with orjson, and list pages are built from plain SQL
+rows (see crud.get_processing_result_rows) instead of ORM objects validated
+one by one into ProcessingResultResponse. The JSON has the same fields and
+formats as the Pydantic path.
+"""
+from typing import Any, Dict, Iterable, Type
+
+from fastapi.responses import JSONResponse
+
+from config import settings
+
+
+def load_orjson():
+    try:
+        import orjson
+    except ImportError as e:
+        raise RuntimeError("FAST_JSON=true requires the 'orjson' package") from e
+    return orjson
+
+
+orjson = load_orjson() if settings.fast_json else None
+
+# Leading columns of crud.get_processing_result_rows, in ProcessingResultResponse
+# order, followed by the device's DEVICE_FIELDS
+RESULT_FIELDS = (
+    "id", "device_id", "average_before_normalization", "average_after_normalization",
+    "data_size", "status", "created_date", "updated_date",
+)
+DEVICE_FIELDS = ("id", "device_name", "created_date")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+def response_class() -> Type[JSONResponse]:
+    """Default response class of the app"""
+    return FastJSONResponse if orjson is not None else JSONResponse
+
+
+def row_to_dict(row) -> Dict[str, Any]:
+    """ProcessingResultResponse-shaped dict of a get_processing_result_rows row"""
+    result = dict(zip(RESULT_FIELDS, row))
+    result["device"] = dict(zip(DEVICE_FIELDS, row[len(RESULT_FIELDS):]))
+    return result
+
+
+def dump_rows(rows: Iterable) -> bytes:
+    """JSON array of get_processing_result_rows rows"""
+    return orjson.dumps([row_to_dict(row) for row in rows])
@@ -0,0 +1,132 @@
+"""
+Logging configuration for the API.
+
+Records are handed to a queue in the request path and formatted and written
+(console and ``settings.log_file``) by a listener thread, so a slow disk
+does not stall the event loop. Lines are JSON objects carrying the id of the
+request that emitted them.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Id of the request being handled; copied into tasks it creates
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes of every LogRecord; anything else was passed with ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id (runs in the emitting thread)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records with their message merged, leaving formatting to the listener
+
+    Like the stock handler, the arguments are merged into the message in the
+    calling thread, since they may change before the listener runs. Unlike
+    it, the traceback is not formatted here: this queue never leaves the
+    process, so exc_info can be queued as is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        return record
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    if log_format == "text":
+        return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+    raise ValueError(f"Unsupported log format: {log_format}")
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    log_file: Optional[str] = "api.log",
+    log_format: str = "json",
+    use_queue: bool = True
+) -> None:
+    """Configure the root logger, replacing any handlers it had"""
+    global _listener
+    stop_logging()
+
+    formatter = build_formatter(log_format)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, log_level.upper()))
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        front = DeferredQueueHandler(log_queue)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        handlers = [front]
+    for handler in handlers:
+        handler.addFilter(RequestIdFilter())
+        root.addHandler(handler)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def should_log_request(status_code: int, sample_rate: float) -> bool:
+    """Whether a request gets an access line: errors always, the rest sampled"""
+    return status_code >= 400 or sample_rate >= 1 or random.random() < sample_rate
+
+
+atexit.register(stop_logging)
@@ -1,48 +1,82 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
+import asyncio
+import json
 import logging
+import math
+import time
+import uuid
 from contextlib import asynccontextmanager
-from pydantic import ValidationError
 
-from database import SessionLocal, engine, Base
-from models import Device, ProcessingResult
+import fast_json
+import partitions
+import workers
+from config import settings
+from database import AsyncSessionLocal, async_engine, Base
+from device_cache import device_cache
+from logging_setup import request_id_var, setup_logging, should_log_request
+from metrics import CONTENT_TYPE, HTTP_LATENCY, HTTP_REQUESTS, REGISTRY, STAGE_LATENCY
+from replicas import READ_PRIMARY_COOKIE, reads_primary, replica_router
+from response_cache import response_cache, make_etag, json_response
+from models import Device, ProcessingResult, STATUS_PENDING
 from schemas import (
-    ProcessingResultCreate, ProcessingResultResponse, 
-    ProcessingResultUpdate, DeviceResponse
+    ProcessingResultResponse, 
+    ProcessingResultUpdate, DeviceResponse, ProcessingResultList,
+    ProcessingResultAggregate, ProcessingResultAccepted,
+    ProcessingResultSelection, ProcessingResultBulkUpdate, ProcessingResultBulkResult,
+    FilterDatetime
 )
 from crud import (
-    create_processing_result, get_processing_results,
+    create_processing_results_bulk, get_processing_results, get_processing_result_rows,
     get_processing_result, update_processing_result,
-    delete_processing_result
+    delete_processing_result, encode_cursor, aggregate_processing_results,
+    bulk_update_processing_results, bulk_delete_processing_results
 )
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('api.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging(settings.log_level, settings.log_file, settings.log_format, settings.log_queue)
 logger = logging.getLogger(__name__)
 
+# Response header carrying the keyset token of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Request header (echoed in the response) identifying a request in the logs
+REQUEST_ID_HEADER = "X-Request-ID"
+
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    resumed = await workers.resume_pending()
+    if resumed:
+        logger.info("Resumed background processing of %s pending elements", resumed)
+    background = []
+    if async_engine.dialect.name == "postgresql" and settings.partition_maintenance_interval > 0:
+        background.append(asyncio.create_task(partitions.maintenance_loop(async_engine)))
+    if replica_router.replicas:
+        await replica_router.check()
+        background.append(asyncio.create_task(replica_router.health_loop()))
     yield
+    for task in background:
+        task.cancel()
+    await workers.shutdown()
+    await replica_router.dispose()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Medical Image Processing API",
     description="API for managing medical image processing results",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=fast_json.response_class()
 )
 
 # Add CORS middleware
@@ -52,77 +86,142 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", REQUEST_ID_HEADER],
 )
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def get_read_db(request: Request):
+    """Session for read-only endpoints: a healthy replica, unless the client just wrote"""
+    replica = None if reads_primary(request.cookies) else replica_router.choose()
+    async with AsyncSessionLocal(bind=replica.engine if replica else async_engine) as db:
+        yield db
+
+def uses_response_cache(request: Request) -> bool:
+    """Whether a read may be served from (and stored in) the response cache
+
+    Replica reads fill the cache, so it can hold rows older than a client's
+    own writes: clients inside the read-your-writes window bypass it.
+    """
+    return response_cache.enabled and not reads_primary(request.cookies)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
 
 @app.middleware("http")
-async def log_requests(request, call_next):
-    start_time = datetime.now()
-    
-    # Log request
-    logger.info(f"Request: {request.method} {request.url}")
-    
+async def read_your_writes(request, call_next):
     response = await call_next(request)
+    window = settings.read_your_writes_window
+    if window > 0 and request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, f"{time.time() + window:.3f}",
+            max_age=math.ceil(window), httponly=True, samesite="lax"
+        )
+    return response
+
+@app.middleware("http")
+async def log_requests(request, call_next):
+    start_time = time.perf_counter()
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
     
-    # Log response
-    process_time = (datetime.now() - start_time).total_seconds()
-    logger.info(f"Response: {response.status_code} - Time: {process_time:.4f}s")
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers[REQUEST_ID_HEADER] = request_id
+    finally:
+        process_time = time.perf_counter() - start_time
+        # Label by route template (not the raw path) to bound the label sets
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        labels = {"method": request.method, "route": route, "status": status_code}
+        HTTP_REQUESTS.inc(**labels)
+        HTTP_LATENCY.observe(process_time, **labels)
+        
+        # One access line per request, formatted by the log listener
+        if should_log_request(status_code, settings.log_request_sample_rate):
+            logger.info(
+                "%s %s %s %.4fs", request.method, route, status_code, process_time,
+                extra={
+                    "method": request.method, "route": route, "path": request.url.path,
+                    "status": status_code, "duration_ms": round(process_time * 1000, 3)
+                }
+            )
+        request_id_var.reset(token)
     
     return response
 
-@app.post("/api/elements/", response_model=List[ProcessingResultResponse])
+@app.post(
+    "/api/elements/",
+    response_model=List[ProcessingResultResponse],
+    responses={202: {"model": ProcessingResultAccepted}}
+)
 async def create_elements(
     payload: Dict[str, Any],
-    db: Session = Depends(get_db)
+    background: bool = Query(
+        False, description="Store the elements as pending and compute their statistics in the background"
+    ),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create new processing results from JSON payload"""
     try:
-        logger.info(f"Creating elements from payload with {len(payload)} items")
+        logger.info("Creating elements from payload with %s items", len(payload))
+        
+        # Validate every element before touching the database; large elements
+        # are parsed in the worker pool, small ones inline
+        required = ['id', 'data', 'deviceName']
+        complete = [(key, element) for key, element in payload.items() if all(field in element for field in required)]
+        with STAGE_LATENCY.time(stage="validation"):
+            validated = dict(zip(
+                (key for key, _ in complete),
+                await workers.validate_elements(complete)
+            ))
         
-        results = []
-        for key, element in payload.items():
+        results_data = []
+        for key in payload:
             # Validate required fields
-            if not all(field in element for field in ['id', 'data', 'deviceName']):
+            if key not in validated:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Missing required fields in element {key}"
                 )
             
-            try:
-                # Create processing result with validation
-                result_data = ProcessingResultCreate(
-                    id=element['id'],
-                    data=element['data'],
-                    device_name=element['deviceName']
-                )
-                
-                result = create_processing_result(db, result_data)
-                results.append(result)
-                
-            except ValidationError as validation_error:
+            if isinstance(validated[key], str):
                 # Handle Pydantic validation errors specifically
-                error_details = []
-                for error in validation_error.errors():
-                    field = error['loc'][0] if error['loc'] else 'unknown'
-                    message = error['msg']
-                    error_details.append(f"Field '{field}': {message}")
-                
-                error_message = f"Validation error in element {key}: {'; '.join(error_details)}"
-                logger.warning(f"Validation error: {error_message}")
+                logger.warning("Validation error: %s", validated[key])
                 raise HTTPException(
                     status_code=422,
-                    detail=error_message
+                    detail=validated[key]
                 )
+            results_data.append(validated[key])
+        
+        # Devices and results are written in one transaction (all or nothing)
+        results = await create_processing_results_bulk(db, results_data, pending=background)
+        await response_cache.invalidate()
+        
+        if background:
+            # The rows were parsed during validation; the pool only computes the statistics
+            workers.submit([
+                (result.id, result.data, result.parsed_values, result.parsed_row_lengths)
+                for result in results_data
+            ])
+            logger.info("Accepted %s processing results for background processing", len(results))
+            return JSONResponse(
+                status_code=202,
+                content=ProcessingResultAccepted(
+                    ids=[result.id for result in results], status=STATUS_PENDING
+                ).model_dump()
+            )
+        
+        with STAGE_LATENCY.time(stage="serialization"):
+            body = ProcessingResultList.dump_json(
+                [ProcessingResultResponse.model_validate(result) for result in results]
+            )
         
-        logger.info(f"Successfully created {len(results)} processing results")
-        return results
+        logger.info("Successfully created %s processing results", len(results))
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         # Re-raise HTTP exceptions (including our 422 errors)
@@ -130,123 +229,394 @@ async def create_elements(
     except IntegrityError as e:
         # Handle database integrity errors (e.g., duplicate keys)
         if "duplicate key" in str(e).lower() or "unique constraint" in str(e).lower():
-            logger.warning(f"Duplicate key error: {str(e)}")
+            logger.warning("Duplicate key error: %s", e)
             raise HTTPException(
                 status_code=409,
                 detail="A processing result with this ID already exists"
             )
         else:
-            logger.error(f"Database integrity error: {str(e)}")
+            logger.error("Database integrity error: %s", e)
             raise HTTPException(status_code=500, detail="Database integrity error")
     except Exception as e:
-        logger.error(f"Error creating elements: {str(e)}")
+        logger.error("Error creating elements: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/elements/", response_model=List[ProcessingResultResponse])
-async def get_elements(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    created_date_from: Optional[datetime] = None,
-    created_date_to: Optional[datetime] = None,
-    updated_date_from: Optional[datetime] = None,
-    updated_date_to: Optional[datetime] = None,
+async def iter_ndjson_lines(request: Request, max_line_size: int):
+    """Yield the lines of the request body as it arrives
+
+    Each chunk is split on its own, so a line costs time linear in its size.
+    A line longer than ``max_line_size`` bytes is dropped as it arrives and
+    yielded as None.
+    """
+    pending: List[bytes] = []  # start of the current line, from earlier chunks
+    size = 0
+    too_long = False
+    async for chunk in request.stream():
+        start = 0
+        end = chunk.find(b"\n")
+        while end >= 0:
+            if too_long or size + end - start > max_line_size:
+                yield None
+            else:
+                yield b"".join(pending) + chunk[start:end] if pending else chunk[start:end]
+            pending, size, too_long = [], 0, False
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if not too_long and start < len(chunk):
+            size += len(chunk) - start
+            if size > max_line_size:
+                pending, too_long = [], True
+            else:
+                pending.append(chunk[start:])
+    if too_long:
+        yield None
+    elif pending:
+        yield b"".join(pending)
+
+def stream_line(line_number: int, status_code: int, **fields) -> str:
+    """Serialize one per-element outcome of the streaming endpoint"""
+    return json.dumps({"line": line_number, "status_code": status_code, **fields}) + "\n"
+
+async def flush_stream_batch(db: AsyncSession, batch: List[tuple]) -> List[str]:
+    """Write a batch of validated elements and report each outcome"""
+    try:
+        results = await create_processing_results_bulk(db, [result_data for _, result_data in batch])
+    except IntegrityError as e:
+        if len(batch) > 1:
+            # Retry the rejected batch one element at a time to isolate the conflict
+            return [outcome for item in batch for outcome in await flush_stream_batch(db, [item])]
+        
+        line_number, result_data = batch[0]
+        if "duplicate key" in str(e).lower() or "unique constraint" in str(e).lower():
+            logger.warning("Duplicate key error in streamed element %s", result_data.id)
+            return [stream_line(
+                line_number, 409,
+                detail="A processing result with this ID already exists"
+            )]
+        logger.error("Database integrity error: %s", e)
+        return [stream_line(line_number, 500, detail="Database integrity error")]
+    
+    return [
+        stream_line(
+            line_number, 201,
+            result=ProcessingResultResponse.model_validate(result).model_dump(mode="json")
+        )
+        for (line_number, _), result in zip(batch, results)
+    ]
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse whose iterator reads the request body itself
+
+    Starlette's StreamingResponse listens for a disconnect on ``receive``
+    while streaming, which would swallow the body messages the iterator is
+    waiting for. A disconnect shows up as ClientDisconnect from
+    request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+async def stream_outcomes(request: Request, batch_size: int):
+    """Read NDJSON elements, write them in batches and yield each outcome line"""
+    max_line_size = settings.stream_max_line_size
+    batch = []
+    line_number = 0
+    async with AsyncSessionLocal() as db:
+        try:
+            async for line in iter_ndjson_lines(request, max_line_size):
+                line_number += 1
+                if line is None:
+                    yield stream_line(
+                        line_number, 413, detail=f"Line longer than {max_line_size} bytes"
+                    )
+                    continue
+                if not line.strip():
+                    continue
+                
+                try:
+                    element = json.loads(line)
+                except ValueError:
+                    yield stream_line(line_number, 400, detail="Invalid JSON")
+                    continue
+                
+                if not isinstance(element, dict) or not all(
+                    field in element for field in ['id', 'data', 'deviceName']
+                ):
+                    yield stream_line(
+                        line_number, 400,
+                        detail=f"Missing required fields in element {line_number}"
+                    )
+                    continue
+                
+                with STAGE_LATENCY.time(stage="validation"):
+                    [result_data] = await workers.validate_elements(
+                        [(str(line_number), element)]
+                    )
+                if isinstance(result_data, str):
+                    yield stream_line(line_number, 422, detail=result_data)
+                    continue
+                
+                batch.append((line_number, result_data))
+                if len(batch) >= batch_size:
+                    yield "".join(await flush_stream_batch(db, batch))
+                    await response_cache.invalidate()
+                    batch = []
+            
+            if batch:
+                yield "".join(await flush_stream_batch(db, batch))
+                await response_cache.invalidate()
+            logger.info("Processed %s streamed elements", line_number)
+        except ClientDisconnect:
+            # Batches written before the disconnect stay committed
+            logger.warning("Client disconnected after %s streamed lines", line_number)
+        except Exception as e:
+            logger.error("Error streaming elements: %s", e)
+            yield stream_line(line_number, 500, detail=str(e))
+
+@app.post("/api/elements/stream")
+async def create_elements_stream(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000),
+):
+    """Create processing results from a newline-delimited JSON upload
+    
+    Each line holds one element with the same shape as the batch endpoint
+    (``id``, ``data``, ``deviceName``). The body is read incrementally and
+    elements are written in batches of ``batch_size``, each batch in its own
+    transaction. One NDJSON line per element is sent back while the upload is
+    still being read: rejected lines right away, the others when their batch
+    is written. Memory is bounded by the batch size and the maximum line size.
+    """
+    return BodyStreamingResponse(
+        stream_outcomes(request, batch_size), media_type="application/x-ndjson"
+    )
+
+@app.post("/api/elements/bulk-update", response_model=ProcessingResultBulkResult)
+async def bulk_update_elements(body: ProcessingResultBulkUpdate, db: AsyncSession = Depends(get_db)):
+    """Reassign every selected processing result to another device"""
+    affected = chunks = 0
+    try:
+        logger.info("Bulk updating processing results")
+        
+        selection = body.where.model_dump()
+        async for ids in bulk_update_processing_results(db, body.device_name, **selection):
+            affected += len(ids)
+            chunks += 1
+            await response_cache.invalidate(*ids)
+        
+        logger.info("Bulk updated %s processing results in %s chunks", affected, chunks)
+        return {"affected": affected, "chunks": chunks}
+        
+    except Exception as e:
+        # Chunks committed before the error stay applied
+        logger.error("Error bulk updating elements after %s rows: %s", affected, e)
+        raise HTTPException(status_code=500, detail=f"{str(e)} ({affected} rows were updated)")
+
+@app.post("/api/elements/bulk-delete", response_model=ProcessingResultBulkResult)
+async def bulk_delete_elements(selection: ProcessingResultSelection, db: AsyncSession = Depends(get_db)):
+    """Delete every selected processing result"""
+    affected = chunks = 0
+    try:
+        logger.info("Bulk deleting processing results")
+        
+        async for ids in bulk_delete_processing_results(db, **selection.model_dump()):
+            affected += len(ids)
+            chunks += 1
+            await response_cache.invalidate(*ids)
+        
+        logger.info("Bulk deleted %s processing results in %s chunks", affected, chunks)
+        return {"affected": affected, "chunks": chunks}
+        
+    except Exception as e:
+        # Chunks committed before the error stay applied
+        logger.error("Error bulk deleting elements after %s rows: %s", affected, e)
+        raise HTTPException(status_code=500, detail=f"{str(e)} ({affected} rows were deleted)")
+
+def element_filters(
+    created_date_from: FilterDatetime = None,
+    created_date_to: FilterDatetime = None,
+    updated_date_from: FilterDatetime = None,
+    updated_date_to: FilterDatetime = None,
     avg_before_min: Optional[float] = None,
     avg_before_max: Optional[float] = None,
     avg_after_min: Optional[float] = None,
     avg_after_max: Optional[float] = None,
     data_size_min: Optional[int] = None,
     data_size_max: Optional[int] = None,
-    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Range filters shared by the list and aggregate endpoints"""
+    return {
+        'created_date_from': created_date_from,
+        'created_date_to': created_date_to,
+        'updated_date_from': updated_date_from,
+        'updated_date_to': updated_date_to,
+        'avg_before_min': avg_before_min,
+        'avg_before_max': avg_before_max,
+        'avg_after_min': avg_after_min,
+        'avg_after_max': avg_after_max,
+        'data_size_min': data_size_min,
+        'data_size_max': data_size_max,
+    }
+
+@app.get("/api/elements/", response_model=List[ProcessingResultResponse])
+async def get_elements(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque token from the X-Next-Cursor header of the previous page"),
+    filters: Dict[str, Any] = Depends(element_filters),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all processing results with optional filtering"""
     try:
         logger.info("Retrieving processing results with filters")
         
-        filters = {
-            'created_date_from': created_date_from,
-            'created_date_to': created_date_to,
-            'updated_date_from': updated_date_from,
-            'updated_date_to': updated_date_to,
-            'avg_before_min': avg_before_min,
-            'avg_before_max': avg_before_max,
-            'avg_after_min': avg_after_min,
-            'avg_after_max': avg_after_max,
-            'data_size_min': data_size_min,
-            'data_size_max': data_size_max,
-        }
-        
-        results = get_processing_results(db, skip=skip, limit=limit, **filters)
-        logger.info(f"Retrieved {len(results)} processing results")
-        return results
+        cache_key = None
+        if uses_response_cache(request):
+            cache_key = await response_cache.list_key(request.query_params.multi_items())
+            cached = await response_cache.get(cache_key)
+            if cached:
+                return json_response(request, *cached)
+        
+        try:
+            if settings.fast_json:
+                results = await get_processing_result_rows(db, skip=skip, limit=limit, cursor=cursor, **filters)
+            else:
+                results = await get_processing_results(db, skip=skip, limit=limit, cursor=cursor, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        with STAGE_LATENCY.time(stage="serialization"):
+            if settings.fast_json:
+                body = fast_json.dump_rows(results)
+            else:
+                body = ProcessingResultList.dump_json(
+                    [ProcessingResultResponse.model_validate(result) for result in results]
+                )
+        headers = {"ETag": make_etag(body)}
+        # A full page may have more rows after it
+        if len(results) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(results[-1])
+        if cache_key:
+            await response_cache.set(cache_key, body, headers)
+        
+        logger.info("Retrieved %s processing results", len(results))
+        return json_response(request, body, headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving elements: {str(e)}")
+        logger.error("Error retrieving elements: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/elements/aggregate", response_model=List[ProcessingResultAggregate])
+async def get_elements_aggregate(
+    group_by: List[Literal["device", "hour", "day"]] = Query(
+        [], description="Group by device and/or one time bucket (hour or day)"
+    ),
+    filters: Dict[str, Any] = Depends(element_filters),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Aggregate processing results per device and/or time bucket"""
+    if {"hour", "day"} <= set(group_by):
+        raise HTTPException(status_code=400, detail="Group by either hour or day, not both")
+    
+    try:
+        logger.info("Aggregating processing results by %s", group_by or 'nothing')
+        aggregates = await aggregate_processing_results(db, group_by, **filters)
+        logger.info("Computed %s aggregate groups", len(aggregates))
+        return aggregates
+        
+    except Exception as e:
+        logger.error("Error aggregating elements: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/elements/{element_id}", response_model=ProcessingResultResponse)
-async def get_element(element_id: str, db: Session = Depends(get_db)):
+async def get_element(element_id: str, request: Request, db: AsyncSession = Depends(get_read_db)):
     """Get a specific processing result by ID"""
     try:
-        logger.info(f"Retrieving processing result with ID: {element_id}")
+        logger.info("Retrieving processing result with ID: %s", element_id)
+        
+        cache_key = response_cache.element_key(element_id) if uses_response_cache(request) else None
+        cached = await response_cache.get(cache_key) if cache_key else None
+        if cached:
+            return json_response(request, *cached)
         
-        result = get_processing_result(db, element_id)
+        result = await get_processing_result(db, element_id)
         if not result:
             raise HTTPException(status_code=404, detail="Processing result not found")
         
-        return result
+        with STAGE_LATENCY.time(stage="serialization"):
+            body = ProcessingResultResponse.model_validate(result).model_dump_json().encode()
+        headers = {"ETag": make_etag(body)}
+        if cache_key:
+            await response_cache.set(cache_key, body, headers)
+        return json_response(request, body, headers)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving element {element_id}: {str(e)}")
+        logger.error("Error retrieving element %s: %s", element_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/elements/{element_id}", response_model=ProcessingResultResponse)
 async def update_element(
     element_id: str,
     update_data: ProcessingResultUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a processing result"""
     try:
-        logger.info(f"Updating processing result with ID: {element_id}")
+        logger.info("Updating processing result with ID: %s", element_id)
         
-        result = update_processing_result(db, element_id, update_data)
+        result = await update_processing_result(db, element_id, update_data)
         if not result:
             raise HTTPException(status_code=404, detail="Processing result not found")
         
-        logger.info(f"Successfully updated processing result {element_id}")
+        await response_cache.invalidate(element_id, result.id)
+        logger.info("Successfully updated processing result %s", element_id)
         return result
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating element {element_id}: {str(e)}")
+        logger.error("Error updating element %s: %s", element_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/elements/{element_id}")
-async def delete_element(element_id: str, db: Session = Depends(get_db)):
+async def delete_element(element_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a processing result"""
     try:
-        logger.info(f"Deleting processing result with ID: {element_id}")
+        logger.info("Deleting processing result with ID: %s", element_id)
         
-        success = delete_processing_result(db, element_id)
+        success = await delete_processing_result(db, element_id)
         if not success:
             raise HTTPException(status_code=404, detail="Processing result not found")
         
-        logger.info(f"Successfully deleted processing result {element_id}")
+        await response_cache.invalidate(element_id)
+        logger.info("Successfully deleted processing result %s", element_id)
         return {"message": "Processing result deleted successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting element {element_id}: {str(e)}")
+        logger.error("Error deleting element %s: %s", element_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(),
+        "device_cache": device_cache.stats(),
+        "replicas": replica_router.stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, ingestion stage and connection pool metrics (Prometheus text format)"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,45 @@
+"""Indexes for the GET /api/elements/ range filters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_processing_results_device_id_created_date": ["device_id", "created_date"],
+    "ix_processing_results_updated_date": ["updated_date"],
+    "ix_processing_results_avg_before": ["average_before_normalization"],
+    "ix_processing_results_avg_after": ["average_after_normalization"],
+    "ix_processing_results_data_size": ["data_size"],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the table writable while a large table is indexed;
+    # PostgreSQL does not allow it inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, "processing_results", columns,
+                if_not_exists=True, postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name, table_name="processing_results",
+                if_exists=True, postgresql_concurrently=True,
+            )
@@ -0,0 +1,133 @@
+"""Binary raw_values column for processing results
+
+Adds raw_values (a raw_codec blob) and backfills it from raw_data in
+batches. Run with ``alembic -x drop_json=true upgrade head`` to also clear
+the converted JSON rows; ``-x batch_size=N`` changes the batch size.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+import struct
+import zlib
+from typing import List, Sequence, Union
+
+from alembic import context, op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+processing_results = sa.table(
+    "processing_results",
+    sa.column("id", sa.String),
+    sa.column("raw_data", sa.JSON(none_as_null=True)),
+    sa.column("raw_values", sa.LargeBinary),
+)
+
+
+# The raw_codec blob layout as of this revision, copied so later changes to
+# raw_codec do not change what this migration writes
+MAGIC = b"PRV1"
+HEADER = struct.Struct("<4sBc2xIQ4x")
+FLAG_COMPRESSED = 0x01
+
+
+def encode_rows(rows: List[str]) -> bytes:
+    """Uncompressed float64 blob of space-separated data rows"""
+    tokens = [row.split() for row in rows]
+    lengths = np.array([len(row) for row in tokens], dtype="<u4").tobytes()
+    values = np.array([float(token) for row in tokens for token in row], dtype="<f8")
+    padding = b"\0" * (-len(lengths) % 8)
+    return HEADER.pack(MAGIC, 0, b"d", len(tokens), values.size) + lengths + padding + values.tobytes()
+
+
+def decode_rows(blob: bytes) -> List[np.ndarray]:
+    """Values of every row of a blob, of any dtype and compression"""
+    magic, flags, code, n_rows, n_values = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a raw values blob")
+    body = blob[HEADER.size:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+    lengths = np.frombuffer(body, dtype="<u4", count=n_rows)
+    values = np.frombuffer(body, dtype=f"<{code.decode()}", count=n_values, offset=(4 * n_rows + 7) & ~7)
+    return np.split(values, np.cumsum(lengths)[:-1]) if n_rows else []
+
+
+def iter_batches(connection, where, columns, batch_size):
+    """Yield batches of rows matching ``where``, keyset-paginated by id"""
+    last_id = None
+    while True:
+        query = sa.select(processing_results.c.id, *columns).where(where)
+        if last_id is not None:
+            query = query.where(processing_results.c.id > last_id)
+        rows = connection.execute(query.order_by(processing_results.c.id).limit(batch_size)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    options = context.get_x_argument(as_dictionary=True)
+    drop_json = options.get("drop_json", "false").lower() in ("1", "true", "yes")
+    batch_size = int(options.get("batch_size", 1000))
+
+    op.add_column("processing_results", sa.Column("raw_values", sa.LargeBinary(), nullable=True))
+    with op.batch_alter_table("processing_results") as batch_op:
+        batch_op.alter_column("raw_data", existing_type=sa.JSON(), nullable=True)
+
+    connection = op.get_bind()
+    update = (
+        processing_results.update()
+        .where(processing_results.c.id == sa.bindparam("b_id"))
+        .values(raw_values=sa.bindparam("b_raw_values"))
+    )
+    if drop_json:
+        update = update.values(raw_data=None)
+
+    pending = sa.and_(processing_results.c.raw_values.is_(None), processing_results.c.raw_data.isnot(None))
+    for rows in iter_batches(connection, pending, [processing_results.c.raw_data], batch_size):
+        connection.execute(update, [
+            {
+                "b_id": row.id,
+                "b_raw_values": encode_rows(row.raw_data),
+            }
+            for row in rows
+        ])
+
+
+def downgrade() -> None:
+    options = context.get_x_argument(as_dictionary=True)
+    batch_size = int(options.get("batch_size", 1000))
+
+    # Rebuild JSON rows for results stored only as blobs
+    connection = op.get_bind()
+    update = (
+        processing_results.update()
+        .where(processing_results.c.id == sa.bindparam("b_id"))
+        .values(raw_data=sa.bindparam("b_raw_data"))
+    )
+    blob_only = processing_results.c.raw_data.is_(None)
+    for rows in iter_batches(connection, blob_only, [processing_results.c.raw_values], batch_size):
+        connection.execute(update, [
+            {
+                "b_id": row.id,
+                "b_raw_data": [
+                    " ".join(np.format_float_positional(value, trim="-") for value in values)
+                    for values in decode_rows(row.raw_values)
+                ],
+            }
+            for row in rows
+        ])
+
+    with op.batch_alter_table("processing_results") as batch_op:
+        batch_op.alter_column("raw_data", existing_type=sa.JSON(), nullable=False)
+    op.drop_column("processing_results", "raw_values")
@@ -0,0 +1,72 @@
+"""Hourly per-device rollups of processing results
+
+Creates processing_result_rollups and fills it from the existing rows with a
+single INSERT ... SELECT ... GROUP BY. Rows without a created_date belong to
+no hour and are left out.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Start of the hour of created_date, per dialect
+HOUR_BUCKETS = {
+    "postgresql": "date_trunc('hour', created_date)",
+    "sqlite": "strftime('%Y-%m-%d %H:00:00', created_date)",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "processing_result_rollups",
+        sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.id"), primary_key=True),
+        sa.Column("bucket", sa.DateTime(), primary_key=True),
+        sa.Column("result_count", sa.Integer(), nullable=False),
+        sa.Column("avg_before_sum", sa.Float(), nullable=False),
+        sa.Column("avg_before_min", sa.Float(), nullable=False),
+        sa.Column("avg_before_max", sa.Float(), nullable=False),
+        sa.Column("avg_after_sum", sa.Float(), nullable=False),
+        sa.Column("avg_after_min", sa.Float(), nullable=False),
+        sa.Column("avg_after_max", sa.Float(), nullable=False),
+        sa.Column("data_size_total", sa.BigInteger(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_processing_result_rollups_bucket", "processing_result_rollups", ["bucket"],
+        if_not_exists=True,
+    )
+
+    bucket = HOUR_BUCKETS[op.get_bind().dialect.name]
+    op.execute("DELETE FROM processing_result_rollups")
+    op.execute(f"""
+        INSERT INTO processing_result_rollups (
+            device_id, bucket, result_count,
+            avg_before_sum, avg_before_min, avg_before_max,
+            avg_after_sum, avg_after_min, avg_after_max, data_size_total
+        )
+        SELECT device_id, {bucket}, count(average_before_normalization),
+            sum(average_before_normalization), min(average_before_normalization), max(average_before_normalization),
+            sum(average_after_normalization), min(average_after_normalization), max(average_after_normalization),
+            sum(data_size)
+        FROM processing_results
+        WHERE created_date IS NOT NULL
+        GROUP BY device_id, {bucket}
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_processing_result_rollups_bucket", table_name="processing_result_rollups")
+    op.drop_table("processing_result_rollups")
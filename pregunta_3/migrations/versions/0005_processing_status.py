@@ -0,0 +1,53 @@
+"""Processing status for background statistics
+
+Adds processing_results.status (existing rows are completed), lets the
+statistics columns be NULL while a result is pending and indexes the
+pending rows.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATISTICS = {
+    "average_before_normalization": sa.Float(),
+    "average_after_normalization": sa.Float(),
+    "data_size": sa.Integer(),
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("processing_results") as batch_op:
+        batch_op.add_column(
+            sa.Column("status", sa.String(), nullable=False, server_default="completed")
+        )
+        for name, type_ in STATISTICS.items():
+            batch_op.alter_column(name, existing_type=type_, nullable=True)
+
+    op.create_index(
+        "ix_processing_results_pending", "processing_results", ["id"],
+        postgresql_where=sa.text("status = 'pending'"),
+        sqlite_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_processing_results_pending", table_name="processing_results")
+    # Results without statistics cannot satisfy the NOT NULL constraints
+    op.execute(sa.text("DELETE FROM processing_results WHERE status <> 'completed'"))
+    with op.batch_alter_table("processing_results") as batch_op:
+        for name, type_ in STATISTICS.items():
+            batch_op.alter_column(name, existing_type=type_, nullable=False)
+        batch_op.drop_column("status")
@@ -0,0 +1,167 @@
+"""Monthly range partitions of processing_results (PostgreSQL)
+
+Rebuilds processing_results as a table partitioned by created_date: one
+partition per month from the oldest row up to MONTHS_AHEAD months ahead,
+plus a default partition. The primary key becomes (id, created_date) and ids
+are kept unique by the processing_result_ids registry (see partitions.py).
+Rows are copied with a single INSERT ... SELECT and the indexes are built
+after the copy. Later months are created by the partition maintenance job.
+
+Other dialects are left as they are: SQLite keeps its id primary key.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Names and DDL as of this revision, copied from partitions.py so later
+# changes there do not change what this migration does
+TABLE = "processing_results"
+OLD_TABLE = f"{TABLE}_unpartitioned"
+IDS_TABLE = "processing_result_ids"
+DEFAULT_PARTITION = f"{TABLE}_default"
+MONTHS_AHEAD = 3
+
+ID_REGISTRY_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {IDS_TABLE} (id VARCHAR PRIMARY KEY)",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO {IDS_TABLE} (id) SELECT id FROM new_rows;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM {IDS_TABLE} AS ids USING old_rows WHERE ids.id = old_rows.id;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_update() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.id <> OLD.id THEN
+        UPDATE {IDS_TABLE} SET id = NEW.id WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$""",
+    f"""CREATE TRIGGER {IDS_TABLE}_insert AFTER INSERT ON {TABLE}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {IDS_TABLE}_insert()""",
+    f"""CREATE TRIGGER {IDS_TABLE}_delete AFTER DELETE ON {TABLE}
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {IDS_TABLE}_delete()""",
+    f"""CREATE TRIGGER {IDS_TABLE}_update AFTER UPDATE OF id ON {TABLE}
+    FOR EACH ROW EXECUTE FUNCTION {IDS_TABLE}_update()""",
+]
+
+DROP_ID_REGISTRY_DDL = [
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_insert() CASCADE",
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_delete() CASCADE",
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_update() CASCADE",
+    f"DROP TABLE IF EXISTS {IDS_TABLE}",
+]
+
+INDEXES = {
+    "ix_processing_results_id": ["id"],
+    "ix_processing_results_created_date_id": ["created_date", "id"],
+    "ix_processing_results_device_id_created_date": ["device_id", "created_date"],
+    "ix_processing_results_updated_date": ["updated_date"],
+    "ix_processing_results_avg_before": ["average_before_normalization"],
+    "ix_processing_results_avg_after": ["average_after_normalization"],
+    "ix_processing_results_data_size": ["data_size"],
+}
+PENDING_INDEX = "ix_processing_results_pending"
+
+
+def is_partitioned(connection) -> bool:
+    return bool(connection.scalar(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": TABLE}))
+
+
+def month_index(value: datetime) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def create_partitions(first: datetime) -> None:
+    """Monthly partitions from the month of ``first`` to MONTHS_AHEAD months from now, and the default"""
+    for index in range(month_index(first), month_index(datetime.now()) + MONTHS_AHEAD + 1):
+        start, end = (datetime(i // 12, i % 12 + 1, 1) for i in (index, index + 1))
+        op.execute(
+            f"CREATE TABLE {TABLE}_p{start:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+
+def drop_indexes(table: str) -> None:
+    for name in [*INDEXES, PENDING_INDEX]:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def create_indexes() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, TABLE, columns)
+    op.create_index(PENDING_INDEX, TABLE, ["id"], postgresql_where=sa.text("status = 'pending'"))
+
+
+def set_aside(table: str) -> None:
+    """Rename ``table`` out of the way, freeing its constraint and index names"""
+    op.rename_table(table, OLD_TABLE)
+    op.execute(f"ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {table}_pkey TO {OLD_TABLE}_pkey")
+    drop_indexes(OLD_TABLE)
+
+
+def add_keys(primary_key: str) -> None:
+    op.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({primary_key})")
+    op.create_foreign_key(f"{TABLE}_device_id_fkey", TABLE, "devices", ["device_id"], ["id"])
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql" or is_partitioned(connection):
+        return
+
+    op.execute(f"UPDATE {TABLE} SET created_date = now() WHERE created_date IS NULL")
+    set_aside(TABLE)
+
+    # LIKE keeps the column order, so rows can be copied with SELECT *
+    op.execute(f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created_date)")
+    op.execute(f"ALTER TABLE {TABLE} ALTER COLUMN created_date SET NOT NULL")
+    oldest = connection.scalar(sa.text(f"SELECT min(created_date) FROM {OLD_TABLE}"))
+    for statement in ID_REGISTRY_DDL:
+        op.execute(statement)
+    create_partitions(oldest or datetime.now())
+
+    # Fills processing_result_ids through the insert trigger
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}")
+    op.drop_table(OLD_TABLE)
+
+    add_keys("id, created_date")
+    create_indexes()
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql" or not is_partitioned(connection):
+        return
+
+    op.drop_constraint(f"{TABLE}_device_id_fkey", TABLE, type_="foreignkey")
+    op.execute(f"CREATE TABLE {OLD_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {OLD_TABLE} SELECT * FROM {TABLE}")
+    op.execute(f"DROP TABLE {TABLE} CASCADE")
+    for statement in DROP_ID_REGISTRY_DDL:
+        op.execute(statement)
+
+    op.rename_table(OLD_TABLE, TABLE)
+    op.execute(f"ALTER TABLE {TABLE} ALTER COLUMN created_date DROP NOT NULL")
+    add_keys("id")
+    create_indexes()
@@ -1,14 +1,33 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Text, JSON, Index, LargeBinary,
+    UniqueConstraint, event
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from database import Base
+import partitions
+
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind parameters in the
+# same text format so range filters and keyset cursors compare correctly
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
+# ProcessingResult.status values; pending results wait for a background worker
+STATUS_PENDING = "pending"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
 
 class Device(Base):
     __tablename__ = "devices"
     
     id = Column(Integer, primary_key=True, index=True)
     device_name = Column(String, unique=True, index=True, nullable=False)
-    created_date = Column(DateTime, default=func.now())
+    created_date = Column(Timestamp, default=func.now())
     
     # Relationship
     processing_results = relationship("ProcessingResult", back_populates="device")
@@ -16,14 +35,76 @@ class Device(Base):
 class ProcessingResult(Base):
     __tablename__ = "processing_results"
     
-    id = Column(String, primary_key=True, index=True)
+    # Client supplied and unique: lets batched INSERT ... RETURNING keep row order
+    id = Column(String, primary_key=True, index=True, insert_sentinel=True)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
-    average_before_normalization = Column(Float, nullable=False)
-    average_after_normalization = Column(Float, nullable=False)
-    data_size = Column(Integer, nullable=False)
-    raw_data = Column(JSON, nullable=False)  # Store original data
-    created_date = Column(DateTime, default=func.now())
-    updated_date = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Statistics are NULL until a pending result is processed
+    average_before_normalization = Column(Float, nullable=True)
+    average_after_normalization = Column(Float, nullable=True)
+    data_size = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default=STATUS_COMPLETED, server_default=STATUS_COMPLETED)
+    # Original data, either as JSON rows or as a raw_codec blob; deferred so
+    # reads only load it when asked to (undefer)
+    raw_data = deferred(Column(JSON(none_as_null=True), nullable=True))
+    raw_values = deferred(Column(LargeBinary, nullable=True))
+    # Part of the table's primary key: PostgreSQL partitions the table by month
+    # on it (see partitions.py); the ORM still identifies results by id
+    created_date = Column(Timestamp, primary_key=True, default=func.now())
+    updated_date = Column(Timestamp, default=func.now(), onupdate=func.now())
     
     # Relationship
-    device = relationship("Device", back_populates="processing_results")
\ No newline at end of file
+    device = relationship("Device", back_populates="processing_results")
+    
+    __mapper_args__ = {"primary_key": [id]}
+    
+    __table_args__ = (
+        # PostgreSQL enforces unique ids through partitions.IDS_TABLE instead
+        UniqueConstraint("id", name="uq_processing_results_id").ddl_if(dialect="sqlite"),
+        # Keyset pagination order: (created_date, id); also serves created_date ranges
+        Index("ix_processing_results_created_date_id", "created_date", "id"),
+        # Device-scoped listings and the foreign key lookups on device delete
+        Index("ix_processing_results_device_id_created_date", "device_id", "created_date"),
+        # One index per range filter of GET /api/elements/; PostgreSQL combines
+        # them with bitmap AND when several filters are given
+        Index("ix_processing_results_updated_date", "updated_date"),
+        Index("ix_processing_results_avg_before", "average_before_normalization"),
+        Index("ix_processing_results_avg_after", "average_after_normalization"),
+        Index("ix_processing_results_data_size", "data_size"),
+        # Small partial index for resuming pending results on startup
+        Index(
+            "ix_processing_results_pending", "id",
+            postgresql_where=(status == STATUS_PENDING),
+            sqlite_where=(status == STATUS_PENDING),
+        ),
+        {"postgresql_partition_by": "RANGE (created_date)"},
+    )
+
+@event.listens_for(ProcessingResult.__table__, "after_create")
+def _create_partitions(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        partitions.setup_partitioning(connection)
+
+@event.listens_for(ProcessingResult.__table__, "after_drop")
+def _drop_id_registry(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        partitions.drop_id_registry(connection)
+
+class ProcessingResultRollup(Base):
+    """Per device and hour totals of processing results, maintained by rollups.py"""
+    __tablename__ = "processing_result_rollups"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    bucket = Column(Timestamp, primary_key=True)  # start of the hour
+    result_count = Column(Integer, nullable=False)
+    avg_before_sum = Column(Float, nullable=False)
+    avg_before_min = Column(Float, nullable=False)
+    avg_before_max = Column(Float, nullable=False)
+    avg_after_sum = Column(Float, nullable=False)
+    avg_after_min = Column(Float, nullable=False)
+    avg_after_max = Column(Float, nullable=False)
+    data_size_total = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        # Time-bucketed dashboards across all devices
+        Index("ix_processing_result_rollups_bucket", "bucket"),
+    )
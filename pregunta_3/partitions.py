@@ -0,0 +1,250 @@
+"""
+Monthly range partitions of processing_results (PostgreSQL).
+
+The table is partitioned by created_date, one partition per calendar month
+plus a default partition catching rows outside every month created so far.
+Date-range filters are pruned to the partitions they overlap, and retention
+drops whole partitions instead of deleting rows.
+
+A partitioned table can only enforce unique keys that include created_date,
+so the primary key is (id, created_date) and global id uniqueness comes from
+processing_result_ids, kept in step by statement-level triggers. Duplicate
+ids still fail with a unique violation.
+
+Run ``python partitions.py`` (e.g. from cron) to create upcoming partitions
+and apply the retention setting; the API also does it periodically.
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "processing_results"
+IDS_TABLE = "processing_result_ids"
+DEFAULT_PARTITION = f"{TABLE}_default"
+ROLLUPS_TABLE = "processing_result_rollups"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+# pg_try_advisory_lock key so only one process maintains partitions at a time
+MAINTENANCE_LOCK = 0x70617274
+
+ID_REGISTRY_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {IDS_TABLE} (id VARCHAR PRIMARY KEY)",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO {IDS_TABLE} (id) SELECT id FROM new_rows;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM {IDS_TABLE} AS ids USING old_rows WHERE ids.id = old_rows.id;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION {IDS_TABLE}_update() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.id <> OLD.id THEN
+        UPDATE {IDS_TABLE} SET id = NEW.id WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$""",
+    f"""CREATE TRIGGER {IDS_TABLE}_insert AFTER INSERT ON {TABLE}
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {IDS_TABLE}_insert()""",
+    f"""CREATE TRIGGER {IDS_TABLE}_delete AFTER DELETE ON {TABLE}
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {IDS_TABLE}_delete()""",
+    f"""CREATE TRIGGER {IDS_TABLE}_update AFTER UPDATE OF id ON {TABLE}
+    FOR EACH ROW EXECUTE FUNCTION {IDS_TABLE}_update()""",
+]
+
+DROP_ID_REGISTRY_DDL = [
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_insert() CASCADE",
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_delete() CASCADE",
+    f"DROP FUNCTION IF EXISTS {IDS_TABLE}_update() CASCADE",
+    f"DROP TABLE IF EXISTS {IDS_TABLE}",
+]
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": TABLE}))
+
+
+def monthly_partitions(connection: Connection) -> List[datetime]:
+    """First day of the month of every existing monthly partition, in order"""
+    names = connection.scalars(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": TABLE})
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_id_registry(connection: Connection) -> None:
+    """The id registry table and its triggers on the partitioned table"""
+    for statement in ID_REGISTRY_DDL:
+        connection.execute(text(statement))
+
+
+def drop_id_registry(connection: Connection) -> None:
+    for statement in DROP_ID_REGISTRY_DDL:
+        connection.execute(text(statement))
+
+
+def create_default_partition(connection: Connection) -> None:
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+
+def create_partition(connection: Connection, month: datetime) -> bool:
+    """Create the partition of ``month`` unless it exists (no commit)
+
+    Rows of that month already in the default partition are moved into the
+    new one. The move writes the partitions directly, so the id registry
+    triggers (defined on the parent table) do not fire.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if connection.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}):
+        return False
+
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_month = "created_date >= :start AND created_date < :end"
+    has_default = connection.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    stray = has_default and connection.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"), bounds
+    )
+    if stray:
+        connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+
+    # Bounds are literals: DDL takes no bind parameters
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+    ))
+
+    if stray:
+        connection.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+        connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+        connection.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return True
+
+
+def create_partitions(connection: Connection, first: datetime, last: datetime) -> List[str]:
+    """Create the partitions of every month from ``first`` to ``last`` inclusive (no commit)"""
+    created = []
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        if create_partition(connection, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partition(connection: Connection, month: datetime) -> None:
+    """Drop the partition of ``month`` with its ids and hourly rollups (no commit)"""
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    connection.execute(text(f"DELETE FROM {IDS_TABLE} AS ids USING {name} WHERE ids.id = {name}.id"))
+    connection.execute(text(f"DELETE FROM {ROLLUPS_TABLE} WHERE bucket >= :start AND bucket < :end"), bounds)
+    connection.execute(text(f"DROP TABLE {name}"))
+
+
+def setup_partitioning(connection: Connection, first: Optional[datetime] = None) -> None:
+    """Registry, triggers and partitions of a new partitioned table (no commit)"""
+    now = datetime.now()
+    create_id_registry(connection)
+    create_default_partition(connection)
+    create_partitions(connection, first or now, add_months(month_start(now), settings.partition_months_ahead))
+
+
+def maintain(
+    connection: Connection,
+    months_ahead: Optional[int] = None,
+    retention_months: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Dict[str, List[str]]:
+    """Create upcoming partitions and drop expired ones, committing each step
+
+    Does nothing when the table is not partitioned or another process holds
+    the maintenance lock.
+    """
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    retention_months = settings.retention_months if retention_months is None else retention_months
+    changes = {"created": [], "dropped": []}
+    if not is_partitioned(connection):
+        return changes
+    if not connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK}):
+        return changes
+    try:
+        current = month_start(now or datetime.now())
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if create_partition(connection, month):
+                changes["created"].append(partition_name(month))
+            connection.commit()
+
+        if retention_months is not None:
+            cutoff = add_months(current, -retention_months)
+            for month in monthly_partitions(connection):
+                if add_months(month, 1) > cutoff:
+                    break
+                drop_partition(connection, month)
+                connection.commit()
+                changes["dropped"].append(partition_name(month))
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK})
+        connection.commit()
+    return changes
+
+
+async def maintenance_loop(async_engine) -> None:
+    """Run ``maintain`` every settings.partition_maintenance_interval seconds"""
+    while True:
+        try:
+            async with async_engine.connect() as connection:
+                changes = await connection.run_sync(maintain)
+            if changes["created"] or changes["dropped"]:
+                logger.info(
+                    "Partition maintenance created %s, dropped %s", changes["created"], changes["dropped"]
+                )
+        except Exception as e:
+            logger.error("Partition maintenance failed: %s", e)
+        await asyncio.sleep(settings.partition_maintenance_interval)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            print(f"{TABLE} is not partitioned (PostgreSQL only, see migration 0006)")
+        else:
+            result = maintain(connection)
+            print(f"Created: {', '.join(result['created']) or 'none'}")
+            print(f"Dropped: {', '.join(result['dropped']) or 'none'}")
@@ -0,0 +1,84 @@
+"""
+Binary columnar encoding of processing-result raw data.
+
+Layout (little-endian)::
+
+    magic    4s   b"PRV1"
+    flags    B    bit 0: body is zlib-compressed
+    dtype    B    b"d" float64 / b"f" float32
+    reserved 2x
+    n_rows   I    number of original data rows
+    n_values Q    total number of values
+    reserved 4x   (keeps the body 8-byte aligned)
+    body          n_rows x uint32 row lengths, zero padding to 8 bytes,
+                  then n_values values of ``dtype``
+
+Uncompressed blobs decode without copying: the returned arrays are views
+over the stored bytes.
+"""
+import struct
+import zlib
+from typing import List, NamedTuple
+
+import numpy as np
+
+MAGIC = b"PRV1"
+HEADER = struct.Struct("<4sBc2xIQ4x")
+FLAG_COMPRESSED = 0x01
+DTYPES = {"float64": b"d", "float32": b"f"}
+
+
+class RawValues(NamedTuple):
+    """Decoded raw data: flat values plus the length of every original row"""
+    values: np.ndarray
+    row_lengths: np.ndarray
+
+    def rows(self) -> List[np.ndarray]:
+        """Split the flat values back into per-row views"""
+        return np.split(self.values, np.cumsum(self.row_lengths)[:-1])
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def encode(
+    values: np.ndarray,
+    row_lengths: np.ndarray,
+    dtype: str = "float64",
+    compress: bool = False,
+    level: int = 6
+) -> bytes:
+    """Encode parsed values and their row lengths into a blob"""
+    code = DTYPES[dtype]
+    values = np.ascontiguousarray(values, dtype=np.dtype(f"<{code.decode()}"))
+    lengths = np.ascontiguousarray(row_lengths, dtype="<u4")
+    if int(lengths.sum()) != values.size:
+        raise ValueError("Row lengths do not add up to the number of values")
+
+    lengths_bytes = lengths.tobytes()
+    padding = b"\0" * (_padded(len(lengths_bytes)) - len(lengths_bytes))
+    body = lengths_bytes + padding + values.tobytes()
+    flags = 0
+    if compress:
+        body = zlib.compress(body, level)
+        flags |= FLAG_COMPRESSED
+    return HEADER.pack(MAGIC, flags, code, lengths.size, values.size) + body
+
+
+def decode(blob: bytes) -> RawValues:
+    """Decode a blob; uncompressed blobs are returned as zero-copy views"""
+    magic, flags, code, n_rows, n_values = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a raw values blob")
+
+    buffer = memoryview(blob)[HEADER.size:]
+    if flags & FLAG_COMPRESSED:
+        buffer = memoryview(zlib.decompress(buffer))
+
+    row_lengths = np.frombuffer(buffer, dtype="<u4", count=n_rows)
+    values = np.frombuffer(
+        buffer, dtype=np.dtype(f"<{code.decode()}"), count=n_values,
+        offset=_padded(4 * n_rows),
+    )
+    return RawValues(values, row_lengths)
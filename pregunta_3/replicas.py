@@ -0,0 +1,98 @@
+"""
+Read-replica routing.
+
+Read-only endpoints get sessions bound to one of settings.read_replica_urls,
+chosen round-robin among the replicas that passed their last health check;
+with no healthy replica they use the primary. Writes always go to the
+primary. After a successful write the client receives a cookie that keeps
+its reads on the primary for settings.read_your_writes_window seconds, so it
+does not miss its own writes while the replicas catch up.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from database import make_async_engine
+from metrics import DB_REPLICAS_HEALTHY
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the time (epoch seconds) until which reads use the primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine: AsyncEngine = make_async_engine(url)
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        # Assumed up until the first health check says otherwise
+        self.healthy = True
+
+
+class ReplicaRouter:
+    """Round-robin choice among healthy replicas"""
+
+    def __init__(self, urls: Sequence[str] = ()):
+        self.replicas: List[Replica] = []
+        self.configure(urls)
+
+    def configure(self, urls: Sequence[str]) -> None:
+        """Replace the replica set (existing engines are not disposed)"""
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    async def check(self) -> None:
+        """Run a trivial query on every replica and record which ones answer"""
+        for replica, healthy in zip(self.replicas, await asyncio.gather(
+            *(self._ping(replica) for replica in self.replicas)
+        )):
+            if healthy != replica.healthy:
+                log = logger.info if healthy else logger.warning
+                log("Read replica %s is %s", replica.name, "back up" if healthy else "down")
+            replica.healthy = healthy
+
+    async def _ping(self, replica: Replica) -> bool:
+        async def ping():
+            async with replica.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        try:
+            await asyncio.wait_for(ping(), settings.replica_health_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.replica_health_interval)
+            await self.check()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [{"url": replica.name, "healthy": replica.healthy} for replica in self.replicas]
+
+
+def reads_primary(cookies: Mapping[str, str]) -> bool:
+    """Whether the client wrote within the read-your-writes window"""
+    try:
+        return float(cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+replica_router = ReplicaRouter(settings.read_replica_urls)
+DB_REPLICAS_HEALTHY.set_function(lambda: sum(replica.healthy for replica in replica_router.replicas))
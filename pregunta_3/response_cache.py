@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config import settings
+
+# Key whose value is bumped on every write; list entries embed it so a write
+# makes every cached list unreachable at once (they then age out by TTL)
+LIST_GENERATION_KEY = "elements:list:generation"
+
+
+class CacheBackend(ABC):
+    """Minimal key/value interface, a subset of the redis.asyncio client API"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process backend with per-entry TTL and LRU eviction
+
+    Counters (incr) are kept apart from the cached values and never evicted,
+    so the list generation cannot fall back to an earlier value.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+            expires_at = time.monotonic() + ex if ex else None
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._counters.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            value = self._counters.get(key, int(entry[1]) if entry else 0) + 1
+            self._counters[key] = value
+            return value
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend delegating to a redis.asyncio-compatible client (or a fake)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        await self.client.set(key, value, ex=ex)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+class ResponseCache:
+    """Caches serialized element responses with their ETag and headers"""
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: int = 30):
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def element_key(element_id: str) -> str:
+        return f"elements:item:{element_id}"
+
+    async def list_key(self, params: Iterable[Tuple[str, str]]) -> str:
+        generation = await self.backend.get(LIST_GENERATION_KEY) or b"0"
+        query = "&".join(f"{k}={v}" for k, v in sorted(params))
+        return f"elements:list:{generation.decode()}:{query}"
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Return (body, headers) for a cached response"""
+        if not self.enabled:
+            return None
+        entry = await self.backend.get(key)
+        if entry is None:
+            return None
+        headers, _, body = entry.partition(b"\n")
+        return body, json.loads(headers)
+
+    async def set(self, key: str, body: bytes, headers: Dict[str, str]) -> None:
+        if self.enabled:
+            await self.backend.set(key, json.dumps(headers).encode() + b"\n" + body, ex=self.ttl)
+
+    async def invalidate(self, *element_ids: str) -> None:
+        """Drop the given elements and every cached list (write-through)"""
+        if not self.enabled:
+            return
+        await self.backend.delete(*(self.element_key(element_id) for element_id in element_ids))
+        await self.backend.incr(LIST_GENERATION_KEY)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match accepts ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+def json_response(request: Request, body: bytes, headers: Dict[str, str]) -> Response:
+    """Return the JSON body, or an empty 304 when the client's copy is current"""
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def build_backend() -> Optional[CacheBackend]:
+    """Create the backend selected in config.Settings (None disables caching)"""
+    if not settings.response_cache_enabled:
+        return None
+    if settings.response_cache_backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from e
+        return RedisCacheBackend(redis.from_url(settings.redis_url))
+    return MemoryCacheBackend(settings.response_cache_max_entries)
+
+
+response_cache = ResponseCache(build_backend(), ttl=settings.response_cache_ttl)
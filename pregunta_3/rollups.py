@@ -0,0 +1,152 @@
+"""
+Hourly per-device rollups of processing results.
+
+processing_result_rollups keeps the count, sum, min and max of both averages
+and the total data_size of every (device, hour). Inserts add to their bucket
+with an upsert; updates and deletes recompute the buckets they touch, since a
+min or max cannot be decremented.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, insert, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import upsert_for
+from models import ProcessingResult, ProcessingResultRollup, Timestamp
+
+BUCKET = timedelta(hours=1)
+SQLITE_FORMATS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+
+rollups = ProcessingResultRollup.__table__
+STAT_COLUMNS = [column.name for column in rollups.columns if column.name not in ("device_id", "bucket")]
+BucketKey = Tuple[int, datetime]
+
+
+def bucket_of(value: datetime) -> datetime:
+    """Start of the hour containing ``value``"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_to(dialect_name: str, unit: str, column):
+    """SQL expression truncating a timestamp column to the hour or day"""
+    if unit not in SQLITE_FORMATS:
+        raise ValueError(f"Unsupported time bucket: {unit}")
+    if dialect_name == "sqlite":
+        return func.strftime(SQLITE_FORMATS[unit], column, type_=Timestamp)
+    # The unit is inlined so SELECT and GROUP BY render the same expression
+    return func.date_trunc(literal_column(f"'{unit}'"), column, type_=Timestamp)
+
+
+def combine(name: str, *values, least=min, greatest=max, add=lambda a, b: a + b):
+    """Combine values of the statistic ``name`` (works on SQL expressions too)"""
+    if name.endswith("_min"):
+        return least(*values)
+    if name.endswith("_max"):
+        return greatest(*values)
+    return add(*values)
+
+
+def base_stats():
+    """Rollup statistics computed from processing_results rows"""
+    return [
+        # Pending results have no statistics yet and are not counted
+        func.count(ProcessingResult.average_before_normalization).label("result_count"),
+        func.sum(ProcessingResult.average_before_normalization).label("avg_before_sum"),
+        func.min(ProcessingResult.average_before_normalization).label("avg_before_min"),
+        func.max(ProcessingResult.average_before_normalization).label("avg_before_max"),
+        func.sum(ProcessingResult.average_after_normalization).label("avg_after_sum"),
+        func.min(ProcessingResult.average_after_normalization).label("avg_after_min"),
+        func.max(ProcessingResult.average_after_normalization).label("avg_after_max"),
+        func.sum(ProcessingResult.data_size).label("data_size_total"),
+    ]
+
+
+def rollup_stats():
+    """The same statistics combined from several rollup rows"""
+    return [
+        combine(name, rollups.c[name], least=func.min, greatest=func.max, add=func.sum).label(name)
+        for name in STAT_COLUMNS
+    ]
+
+
+def bucket_totals_query(dialect_name: str, *where):
+    """processing_results grouped into rollup rows, optionally restricted"""
+    bucket = truncate_to(dialect_name, "hour", ProcessingResult.created_date)
+    return (
+        select(ProcessingResult.device_id, bucket.label("bucket"), *base_stats())
+        .where(*where)
+        .group_by(ProcessingResult.device_id, bucket)
+    )
+
+
+def merge_stats(into: dict, other: dict) -> None:
+    """Combine the statistics of ``other`` into ``into``"""
+    for name in STAT_COLUMNS:
+        into[name] = combine(name, into[name], other[name])
+
+
+async def record_inserts(db: AsyncSession, results: Iterable[ProcessingResult]) -> None:
+    """Add newly inserted results to their buckets (no commit)"""
+    buckets: Dict[BucketKey, dict] = {}
+    for result in results:
+        key = (result.device_id, bucket_of(result.created_date))
+        before, after = result.average_before_normalization, result.average_after_normalization
+        stats = {
+            "result_count": 1,
+            "avg_before_sum": before, "avg_before_min": before, "avg_before_max": before,
+            "avg_after_sum": after, "avg_after_min": after, "avg_after_max": after,
+            "data_size_total": result.data_size,
+        }
+        if key in buckets:
+            merge_stats(buckets[key], stats)
+        else:
+            buckets[key] = {"device_id": key[0], "bucket": key[1], **stats}
+    if not buckets:
+        return
+
+    dialect_name = db.get_bind().dialect.name
+    upsert = upsert_for(dialect_name)
+    if upsert is None:
+        await refresh_buckets(db, buckets)
+        return
+
+    # SQLite's two-argument min()/max() are scalar, like LEAST()/GREATEST()
+    least, greatest = (func.min, func.max) if dialect_name == "sqlite" else (func.least, func.greatest)
+    stmt = upsert(rollups)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[rollups.c.device_id, rollups.c.bucket],
+        set_={
+            name: combine(name, rollups.c[name], stmt.excluded[name], least=least, greatest=greatest)
+            for name in STAT_COLUMNS
+        }
+    )
+    await db.execute(stmt, list(buckets.values()))
+
+
+async def refresh_buckets(db: AsyncSession, keys: Iterable[BucketKey]) -> None:
+    """Recompute the buckets holding the given (device_id, created_date) pairs (no commit)"""
+    keys = {(device_id, bucket_of(created_date)) for device_id, created_date in keys}
+    if not keys:
+        return
+    key_column = tuple_(rollups.c.device_id, rollups.c.bucket)
+
+    # Lock the existing rows first: concurrent inserts into these buckets then
+    # wait and add on top of the recomputed totals instead of being lost
+    await db.execute(select(rollups.c.device_id).where(key_column.in_(keys)).with_for_update())
+
+    dialect_name = db.get_bind().dialect.name
+    query = bucket_totals_query(
+        dialect_name,
+        ProcessingResult.device_id.in_({device_id for device_id, _ in keys}),
+        ProcessingResult.created_date >= min(bucket for _, bucket in keys),
+        ProcessingResult.created_date < max(bucket for _, bucket in keys) + BUCKET,
+    )
+    rows: List[dict] = [
+        dict(row._mapping) for row in await db.execute(query)
+        if (row.device_id, row.bucket) in keys and row.result_count
+    ]
+
+    await db.execute(delete(rollups).where(key_column.in_(keys)))
+    if rows:
+        await db.execute(insert(rollups), rows)
@@ -1,34 +1,93 @@
-from pydantic import BaseModel, validator, Field
-from typing import List, Optional
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, PrivateAttr, TypeAdapter, ValidationError, validator, model_validator, Field
+from typing import Annotated, List, Optional
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import settings
+from stats_engine import get_engine
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert an aware filter value to that"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Date filter of the list, aggregate and bulk endpoints. asyncpg rejects aware
+# datetimes for timestamp without time zone columns, and SQLite would compare
+# their wall-clock time ignoring the offset
+FilterDatetime = Annotated[Optional[datetime], AfterValidator(naive_utc)]
+
+def invalid_number_message(data: List[str]) -> str:
+    """Describe the first token of ``data`` that is not a number"""
+    for i, row in enumerate(data):
+        for j, num_str in enumerate(row.split()):
+            try:
+                float(num_str)
+            except ValueError:
+                return f"Invalid number '{num_str}' in row {i+1}, position {j+1}"
+    return "Data contains invalid numbers"
+
+def format_validation_error(key: str, validation_error: ValidationError) -> str:
+    """Build the 422 detail message for an invalid element"""
+    error_details = []
+    for error in validation_error.errors():
+        field = error['loc'][0] if error['loc'] else 'unknown'
+        message = error['msg']
+        error_details.append(f"Field '{field}': {message}")
+    
+    return f"Validation error in element {key}: {'; '.join(error_details)}"
 
 class ProcessingResultCreate(BaseModel):
     id: str = Field(..., min_length=1, description="Unique identifier for the processing result")
     data: List[str] = Field(..., min_items=1, description="List of data rows, each containing space-separated numbers")
     device_name: str = Field(..., min_length=1, description="Name of the device that generated the data")
     
+    # Values of ``data``, parsed once during validation and reused for the statistics;
+    # with binary raw data storage also the number of values of each row
+    _values: Optional[np.ndarray] = PrivateAttr(default=None)
+    _row_lengths: Optional[np.ndarray] = PrivateAttr(default=None)
+    
     @validator('data')
     def validate_data(cls, v):
-        """Validate that data contains only valid numbers"""
+        """Validate that data has no empty rows (numbers are checked when parsed)"""
         if not v:
             raise ValueError("Data list cannot be empty")
         
         for i, row in enumerate(v):
             if not row.strip():
                 raise ValueError(f"Row {i+1} cannot be empty")
-            
-            numbers = row.split()
-            if not numbers:
-                raise ValueError(f"Row {i+1} must contain at least one number")
-            
-            for j, num_str in enumerate(numbers):
-                try:
-                    float(num_str)
-                except ValueError:
-                    raise ValueError(f"Invalid number '{num_str}' in row {i+1}, position {j+1}")
         
         return v
     
+    @model_validator(mode='after')
+    def parse_data(self):
+        """Validate that data contains only valid numbers, parsing it a single time"""
+        try:
+            if settings.raw_data_storage == "binary":
+                self._values, self._row_lengths = get_engine().parse_rows(self.data)
+            else:
+                self._values = get_engine().parse(self.data)
+        except ValueError:
+            raise ValidationError.from_exception_data(type(self).__name__, [{
+                "type": "value_error",
+                "loc": ("data",),
+                "input": self.data,
+                "ctx": {"error": ValueError(invalid_number_message(self.data))},
+            }])
+        return self
+    
+    @property
+    def parsed_values(self) -> np.ndarray:
+        if self._values is None:
+            self._values = get_engine().parse(self.data)
+        return self._values
+    
+    @property
+    def parsed_row_lengths(self) -> Optional[np.ndarray]:
+        """Values per row, if they were counted while parsing (binary storage only)"""
+        return self._row_lengths
+    
     @validator('device_name')
     def validate_device_name(cls, v):
         """Validate device name"""
@@ -51,12 +110,64 @@ class DeviceResponse(BaseModel):
 class ProcessingResultResponse(BaseModel):
     id: str
     device_id: int
-    average_before_normalization: float
-    average_after_normalization: float
-    data_size: int
+    # None while the result is pending
+    average_before_normalization: Optional[float]
+    average_after_normalization: Optional[float]
+    data_size: Optional[int]
+    status: str
     created_date: datetime
     updated_date: datetime
     device: DeviceResponse
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProcessingResultAccepted(BaseModel):
+    ids: List[str]
+    status: str
+
+class ProcessingResultAggregate(BaseModel):
+    device_id: Optional[int] = None
+    device_name: Optional[str] = None
+    bucket: Optional[datetime] = Field(None, description="Start of the hour or day when grouping by time")
+    count: int
+    avg_before_min: float
+    avg_before_max: float
+    avg_before_mean: float
+    avg_after_min: float
+    avg_after_max: float
+    avg_after_mean: float
+    total_data_size: int
+
+class ProcessingResultSelection(BaseModel):
+    """Results targeted by a bulk operation: explicit ids and/or list filters"""
+    ids: Optional[List[str]] = Field(None, max_length=100000)
+    device_name: Optional[str] = None
+    created_date_from: FilterDatetime = None
+    created_date_to: FilterDatetime = None
+    updated_date_from: FilterDatetime = None
+    updated_date_to: FilterDatetime = None
+    avg_before_min: Optional[float] = None
+    avg_before_max: Optional[float] = None
+    avg_after_min: Optional[float] = None
+    avg_after_max: Optional[float] = None
+    data_size_min: Optional[int] = None
+    data_size_max: Optional[int] = None
+    
+    @model_validator(mode='after')
+    def not_everything(self):
+        # An empty selection would match the whole table
+        if not any(value is not None for value in self.model_dump().values()):
+            raise ValueError('Selection needs ids or at least one filter')
+        return self
+
+class ProcessingResultBulkUpdate(BaseModel):
+    where: ProcessingResultSelection
+    device_name: str = Field(..., description="Device the selected results are reassigned to")
+
+class ProcessingResultBulkResult(BaseModel):
+    affected: int
+    chunks: int
+
+# Serializer for list responses built outside of FastAPI's response_model
+ProcessingResultList = TypeAdapter(List[ProcessingResultResponse])
@@ -10,12 +10,15 @@ setup(
     install_requires=[
         "fastapi>=0.104.1",
         "uvicorn[standard]>=0.24.0",
-        "sqlalchemy>=2.0.23",
+        "sqlalchemy[asyncio]>=2.0.23",
         "psycopg2-binary>=2.9.9",
         "pydantic>=2.5.0",
         "python-multipart>=0.0.6",
         "python-dotenv>=1.0.0",
         "alembic>=1.12.0",
+        "numpy>=1.24.0",
+        "asyncpg>=0.29.0",
+        "pydantic-settings>=2.1.0",
     ],
     extras_require={
         "dev": [
@@ -24,6 +27,8 @@ setup(
             "isort>=5.12.0",
             "pytest>=7.4.0",
             "pytest-asyncio>=0.21.0",
+            "aiosqlite>=0.19.0",
+            "httpx>=0.25.0",
             "requests>=2.31.0",
         ]
     },
@@ -0,0 +1,103 @@
+import itertools
+import warnings
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+
+class DataStatistics(NamedTuple):
+    """Statistics computed for a single processing result"""
+    avg_before: float
+    max_value: float
+    avg_after: float
+    data_size: int
+
+
+class ParsedRows(NamedTuple):
+    """Parsed values of some data rows and the number of values in each row"""
+    values: np.ndarray
+    row_lengths: np.ndarray
+
+
+class StatisticsEngine(ABC):
+    """Base statistics engine: parses data rows and computes statistics"""
+
+    @abstractmethod
+    def parse(self, data: List[str]) -> np.ndarray:
+        """Parse rows of space-separated numbers into a float64 array"""
+
+    def parse_rows(self, data: List[str]) -> ParsedRows:
+        """Parse rows of space-separated numbers, keeping the length of every row"""
+        rows = [row.split() for row in data]
+        row_lengths = np.fromiter(map(len, rows), dtype=np.uint32, count=len(rows))
+        values = np.fromiter(
+            map(float, itertools.chain.from_iterable(rows)), dtype=np.float64, count=int(row_lengths.sum())
+        )
+        return ParsedRows(values, row_lengths)
+
+    def compute(self, values: np.ndarray) -> DataStatistics:
+        """Compute statistics over an already parsed array"""
+        if values.size == 0:
+            raise ValueError("No numeric values to process")
+
+        avg_before = float(values.mean())
+        max_value = float(values.max())
+
+        # mean(x / max) == mean(x) / max, so the normalized copy is never built.
+        # An all-zero (or non-positive with max 0) payload cannot be scaled,
+        # its normalized average is reported as 0.
+        avg_after = avg_before / max_value if max_value != 0 else 0.0
+
+        return DataStatistics(avg_before, max_value, avg_after, int(values.size))
+
+    def normalize(self, values: np.ndarray, max_value: float) -> np.ndarray:
+        """Scale values by their maximum, with the same all-zero rule as compute()"""
+        if max_value == 0:
+            return np.zeros_like(values)
+        return values / max_value
+
+    def process(self, data: List[str]) -> DataStatistics:
+        """Parse and compute statistics in one call"""
+        return self.compute(self.parse(data))
+
+
+class PythonStatisticsEngine(StatisticsEngine):
+    """Reference engine parsing token by token with float()"""
+
+    def parse(self, data: List[str]) -> np.ndarray:
+        tokens = " ".join(data).split()
+        return np.fromiter(map(float, tokens), dtype=np.float64, count=len(tokens))
+
+
+class NumpyStatisticsEngine(PythonStatisticsEngine):
+    """Engine that parses all rows with a single C-level pass"""
+
+    def parse(self, data: List[str]) -> np.ndarray:
+        # Whitespace-only text would parse as [-1.0]
+        text = " ".join(data).strip()
+        with warnings.catch_warnings():
+            # Older NumPy releases only warn on unparsable input
+            warnings.simplefilter("error", DeprecationWarning)
+            try:
+                return np.fromstring(text, dtype=np.float64, sep=" ")
+            except (ValueError, DeprecationWarning):
+                pass
+        # Tokens NumPy rejects but float() accepts (e.g. "1_000"), or a real
+        # error that float() reports with the offending token
+        return super().parse(data)
+
+
+_engine: StatisticsEngine = NumpyStatisticsEngine()
+
+
+def get_engine() -> StatisticsEngine:
+    """Return the active statistics engine"""
+    return _engine
+
+
+def set_engine(engine: Optional[StatisticsEngine] = None) -> StatisticsEngine:
+    """Replace the active statistics engine (None restores the default)"""
+    global _engine
+    _engine = engine if engine is not None else NumpyStatisticsEngine()
+    return _engine
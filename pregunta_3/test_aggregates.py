@@ -0,0 +1,138 @@
+"""
+Aggregate endpoint tests: results served from the hourly rollups must match
+a full scan of processing_results, also after updates and deletes.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from database import engine
+from main import app
+from models import Device, ProcessingResult
+from rollups import STAT_COLUMNS, bucket_totals_query, rollups
+from schemas import ProcessingResultSelection
+
+SEED_START = datetime(2025, 3, 1, 8, 0, 0)
+
+
+def seed():
+    """Insert five hours of results for two devices and backfill their rollups"""
+    with engine.begin() as conn:
+        device_ids = list(conn.scalars(
+            insert(Device).returning(Device.id),
+            [{"device_name": "AGG A"}, {"device_name": "AGG B"}]
+        ))
+        conn.execute(insert(ProcessingResult), [
+            {
+                "id": f"agg{i}",
+                "device_id": device_ids[i % 2],
+                "average_before_normalization": 10.0 + i,
+                "average_after_normalization": (10.0 + i) / 80,
+                "data_size": i + 1,
+                "raw_data": ["1 2 3"],
+                "created_date": SEED_START + timedelta(minutes=7 * i),
+                "updated_date": SEED_START + timedelta(minutes=7 * i),
+            }
+            for i in range(40)
+        ])
+        conn.execute(insert(rollups).from_select(
+            list(rollups.columns.keys()),
+            bucket_totals_query("sqlite", ProcessingResult.id.startswith("agg"))
+        ))
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        seed()
+        yield test_client
+
+
+def aggregate(client, **params):
+    response = client.get("/api/elements/aggregate", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def assert_matches_base_table(client, **params):
+    # data_size_min=1 matches every row but forces a processing_results scan
+    from_rollups = aggregate(client, **params)
+    from_base = aggregate(client, data_size_min=1, **params)
+    assert from_rollups
+    assert from_rollups == [pytest.approx(group) for group in from_base]
+
+
+@pytest.mark.parametrize("group_by", [[], ["device"], ["hour"], ["device", "day"]])
+@pytest.mark.parametrize("date_range", [
+    {},
+    {"created_date_from": "2025-03-01T09:00:00", "created_date_to": "2025-03-01T11:00:00"},
+    {"created_date_from": "2025-03-01T08:20:00", "created_date_to": "2025-03-01T11:45:00"},
+    {"created_date_from": "2025-03-01T09:10:00", "created_date_to": "2025-03-01T09:50:00"},
+])
+def test_rollups_match_base_table(client, group_by, date_range):
+    assert_matches_base_table(client, group_by=group_by, **date_range)
+
+
+def test_hourly_groups(client):
+    groups = aggregate(client, group_by=["device", "hour"], created_date_to="2025-03-01T08:59:59")
+    assert [(group["device_name"], group["count"]) for group in groups] == [("AGG A", 5), ("AGG B", 4)]
+    assert groups[0]["bucket"] == "2025-03-01T08:00:00"
+    assert groups[0]["avg_before_min"] == 10.0
+    assert groups[0]["avg_before_max"] == 18.0
+    assert groups[0]["total_data_size"] == 1 + 3 + 5 + 7 + 9
+
+
+def test_writes_keep_rollups_current(client):
+    client.post("/api/elements/", json={
+        "1": {"id": "aggnew", "data": ["5 6 7"], "deviceName": "AGG A"}
+    })
+    assert client.put("/api/elements/agg3", json={"device_name": "AGG A"}).status_code == 200
+    assert client.delete("/api/elements/agg10").status_code == 200
+
+    with engine.connect() as conn:
+        stored = {
+            (row.device_id, row.bucket): [row._mapping[name] for name in STAT_COLUMNS]
+            for row in conn.execute(select(rollups))
+        }
+        recomputed = {
+            (row.device_id, row.bucket): [row._mapping[name] for name in STAT_COLUMNS]
+            for row in conn.execute(bucket_totals_query("sqlite"))
+        }
+    assert stored.keys() == recomputed.keys()
+    for key, stats in stored.items():
+        # Sums maintained write by write differ from a recomputation in the last bits
+        assert stats == pytest.approx(recomputed[key]), key
+    assert_matches_base_table(client, group_by=["device", "hour"])
+
+
+def test_rejects_two_time_buckets(client):
+    response = client.get("/api/elements/aggregate", params={"group_by": ["hour", "day"]})
+    assert response.status_code == 400
+
+
+NAIVE_RANGE = {"created_date_from": "2025-03-01T09:00:00", "created_date_to": "2025-03-01T11:00:00"}
+AWARE_RANGES = [
+    {"created_date_from": "2025-03-01T09:00:00Z", "created_date_to": "2025-03-01T11:00:00Z"},
+    {"created_date_from": "2025-03-01T14:00:00+05:00", "created_date_to": "2025-03-01T06:00:00-05:00"},
+]
+
+
+@pytest.mark.parametrize("aware", AWARE_RANGES)
+def test_aware_dates_are_compared_in_utc(client, aware):
+    assert aggregate(client, **aware) == aggregate(client, **NAIVE_RANGE)
+    assert aggregate(client, data_size_min=1, **aware) == aggregate(client, data_size_min=1, **NAIVE_RANGE)
+
+    def listed(params):
+        response = client.get("/api/elements/", params={"limit": 1000, **params})
+        assert response.status_code == 200
+        return [element["id"] for element in response.json()]
+
+    assert listed(aware) == listed(NAIVE_RANGE) != []
+
+
+def test_bulk_selection_dates_become_naive_utc():
+    selection = ProcessingResultSelection(**AWARE_RANGES[1])
+    assert selection.created_date_from == datetime(2025, 3, 1, 9, 0, 0)
+    assert selection.created_date_to == datetime(2025, 3, 1, 11, 0, 0)
@@ -0,0 +1,81 @@
+"""
+Worker pool tests: large elements are parsed in the pool and elements
+posted with background=true are completed there.
+"""
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import workers
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def wait_for_status(client, element_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        element = client.get(f"/api/elements/{element_id}").json()
+        if element["status"] != "pending" or time.monotonic() > deadline:
+            return element
+        time.sleep(0.1)
+
+
+def test_background_ingest_matches_synchronous(client):
+    data = ["10 20 30", "40 50 60"]
+    response = client.post("/api/elements/", params={"background": True}, json={
+        str(i): {"id": f"bg{i}", "data": data, "deviceName": "BG DEVICE"} for i in range(4)
+    })
+    assert response.status_code == 202
+    assert response.json() == {"ids": ["bg0", "bg1", "bg2", "bg3"], "status": "pending"}
+
+    synchronous = client.post("/api/elements/", json={
+        "1": {"id": "sync0", "data": data, "deviceName": "BG DEVICE"}
+    }).json()[0]
+    assert synchronous["status"] == "completed"
+
+    for i in range(4):
+        element = wait_for_status(client, f"bg{i}")
+        assert element["status"] == "completed"
+        for field in ("average_before_normalization", "average_after_normalization", "data_size"):
+            assert element[field] == synchronous[field]
+
+    groups = client.get("/api/elements/aggregate", params={"group_by": "device"}).json()
+    assert [group["count"] for group in groups if group["device_name"] == "BG DEVICE"] == [5]
+
+
+def test_large_elements_are_parsed_in_the_pool(client, monkeypatch):
+    monkeypatch.setattr(workers.settings, "inline_parse_max_size", 20)
+    data = [" ".join(str(i) for i in range(50))]
+
+    response = client.post("/api/elements/", json={
+        "1": {"id": "pooled0", "data": data, "deviceName": "BG DEVICE"},
+        "2": {"id": "inline0", "data": ["1 2 3"], "deviceName": "BG DEVICE"},
+    })
+    assert response.status_code == 200
+    assert [result["average_before_normalization"] for result in response.json()] == [24.5, 2.0]
+    assert workers._pool is not None
+
+    response = client.post("/api/elements/", json={
+        "1": {"id": "pooled1", "data": data + ["1 2 x"], "deviceName": "BG DEVICE"}
+    })
+    assert response.status_code == 422
+    assert response.json()["detail"] == (
+        "Validation error in element 1: Field 'data': Value error, Invalid number 'x' in row 2, position 3"
+    )
+
+
+def test_background_statistics_reuse_parsed_values():
+    # The values parsed during validation are used as given, the rows are not parsed again
+    computed = workers.compute_many([
+        ("parsed", ["1 2 3"], np.array([10.0, 30.0]), None),
+        ("resumed", ["1 2 3"], None, None),
+    ])
+    assert computed["parsed"]["average_before_normalization"] == 20.0
+    assert computed["resumed"]["average_before_normalization"] == 2.0
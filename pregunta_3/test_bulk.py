@@ -0,0 +1,89 @@
+"""
+Bulk update/delete tests: chunked set-based statements, affected counts and
+rollups kept in step with processing_results.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from config import settings
+from database import engine
+from main import app
+from rollups import STAT_COLUMNS, bucket_totals_query, rollups
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        payload = {
+            str(i): {"id": f"bulk{i:02d}", "data": [" ".join(str(v) for v in range(1, i + 2))], "deviceName": "BULK A"}
+            for i in range(25)
+        }
+        assert test_client.post("/api/elements/", json=payload).status_code == 200
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "bulk_chunk_size", 10)
+
+
+def device_of(client, element_id):
+    return client.get(f"/api/elements/{element_id}").json()["device"]["device_name"]
+
+
+def assert_rollups_consistent():
+    with engine.connect() as conn:
+        expected = {
+            (row.device_id, row.bucket): [row._mapping[name] for name in STAT_COLUMNS]
+            for row in conn.execute(bucket_totals_query("sqlite"))
+        }
+        stored = {
+            (row.device_id, row.bucket): [row._mapping[name] for name in STAT_COLUMNS]
+            for row in conn.execute(select(rollups))
+        }
+    assert stored.keys() == expected.keys()
+    for key, stats in stored.items():
+        # Sums maintained write by write differ from a recomputation in the last bits
+        assert stats == pytest.approx(expected[key]), key
+
+
+def test_bulk_update_by_ids(client):
+    response = client.post("/api/elements/bulk-update", json={
+        "where": {"ids": ["bulk00", "bulk01", "bulk02", "missing"]},
+        "device_name": "BULK B",
+    })
+    assert response.status_code == 200
+    assert response.json() == {"affected": 3, "chunks": 1}
+    assert device_of(client, "bulk01") == "BULK B"
+    assert device_of(client, "bulk03") == "BULK A"
+    assert_rollups_consistent()
+
+
+def test_bulk_update_by_filter_is_chunked(client):
+    response = client.post("/api/elements/bulk-update", json={
+        "where": {"device_name": "BULK A", "data_size_min": 5},
+        "device_name": "BULK C",
+    })
+    # bulk04..bulk24 have data_size 5..25
+    assert response.json() == {"affected": 21, "chunks": 3}
+    assert device_of(client, "bulk24") == "BULK C"
+    assert device_of(client, "bulk03") == "BULK A"
+    assert_rollups_consistent()
+
+
+def test_bulk_delete_by_filter(client):
+    response = client.post("/api/elements/bulk-delete", json={"device_name": "BULK C", "data_size_max": 14})
+    assert response.json() == {"affected": 10, "chunks": 1}
+    assert client.get("/api/elements/bulk13").status_code == 404
+    assert client.get("/api/elements/bulk14").status_code == 200
+    assert_rollups_consistent()
+
+    response = client.post("/api/elements/bulk-delete", json={"ids": ["bulk00", "bulk14"]})
+    assert response.json() == {"affected": 2, "chunks": 1}
+    assert_rollups_consistent()
+
+
+def test_empty_selection_is_rejected(client):
+    assert client.post("/api/elements/bulk-delete", json={}).status_code == 422
+    assert client.post("/api/elements/bulk-update", json={"where": {}, "device_name": "X"}).status_code == 422
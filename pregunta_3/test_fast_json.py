@@ -0,0 +1,55 @@
+"""
+Fast JSON path tests: list pages built from SQL rows and encoded with orjson
+must match the Pydantic responses.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import fast_json
+from config import settings
+from main import app
+
+orjson = pytest.importorskip("orjson")
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        payload = {
+            str(i): {"id": f"fast{i:02d}", "data": [f"{i} 2.5 {i * 3}", "7"], "deviceName": f"FAST {i % 3}"}
+            for i in range(12)
+        }
+        assert test_client.post("/api/elements/", json=payload).status_code == 200
+        yield test_client
+
+
+def get_page(client, monkeypatch, enabled, **params):
+    monkeypatch.setattr(settings, "fast_json", enabled)
+    monkeypatch.setattr(fast_json, "orjson", orjson if enabled else None)
+    response = client.get("/api/elements/", params={"avg_before_min": 0.1, **params})
+    assert response.status_code == 200
+    return response
+
+
+def test_fast_list_matches_pydantic(client, monkeypatch):
+    slow = get_page(client, monkeypatch, False, limit=5)
+    fast = get_page(client, monkeypatch, True, limit=5)
+    assert fast.content == slow.content
+    assert fast.headers["ETag"] == slow.headers["ETag"]
+    assert fast.headers["X-Next-Cursor"] == slow.headers["X-Next-Cursor"]
+
+
+def test_fast_list_follows_cursor(client, monkeypatch):
+    first = get_page(client, monkeypatch, True, limit=5)
+    cursor = first.headers["X-Next-Cursor"]
+    slow = get_page(client, monkeypatch, False, limit=5, cursor=cursor)
+    fast = get_page(client, monkeypatch, True, limit=5, cursor=cursor)
+    assert fast.json() == slow.json()
+    assert fast.json()[0]["id"] not in {item["id"] for item in first.json()}
+
+
+def test_fast_response_class_renders_numpy(monkeypatch):
+    monkeypatch.setattr(fast_json, "orjson", orjson)
+    response = fast_json.FastJSONResponse({"values": np.arange(3)})
+    assert orjson.loads(response.body) == {"values": [0, 1, 2]}
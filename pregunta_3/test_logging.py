@@ -0,0 +1,80 @@
+"""
+Logging tests: JSON lines with request ids and access line sampling.
+"""
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from logging_setup import (
+    DeferredQueueHandler, JsonFormatter, RequestIdFilter, request_id_var,
+    should_log_request,
+)
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def make_record(**extra):
+    record = logging.LogRecord("api", logging.INFO, __file__, 1, "Stored %s results", (3,), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_request_id_and_extra_fields():
+    token = request_id_var.set("abc123")
+    try:
+        record = make_record(status=201)
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Stored 3 results"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "abc123"
+    assert entry["status"] == 201
+
+
+def test_queued_message_is_merged_when_logged():
+    records = queue.Queue()
+    handler = DeferredQueueHandler(records)
+    ids = ["a"]
+    record = logging.LogRecord(
+        "api", logging.ERROR, __file__, 1, "Failed ids: %s", (ids,), None
+    )
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record.exc_info = sys.exc_info()
+    handler.handle(record)
+    ids.append("b")
+
+    queued = records.get_nowait()
+    assert queued.getMessage() == "Failed ids: ['a']"
+    assert queued.args is None
+    assert queued.exc_text is None
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(queued))["exc_info"]
+    assert record.args == (ids,)
+
+
+def test_errors_are_never_sampled_out():
+    assert should_log_request(500, 0.0)
+    assert should_log_request(404, 0.0)
+    assert not should_log_request(200, 0.0)
+    assert should_log_request(200, 1.0)
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.get("/health", headers={"X-Request-ID": "req-42"})
+    assert response.headers["X-Request-ID"] == "req-42"
+
+    generated = client.get("/health").headers["X-Request-ID"]
+    assert len(generated) == 32
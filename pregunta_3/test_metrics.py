@@ -0,0 +1,83 @@
+"""
+Metrics tests: the exposition format and the request/stage instrumentation
+behind GET /metrics.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from metrics import Gauge, Histogram, Metric
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test histogram", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="parse")
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 4.25',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+
+
+def test_gauge_reads_function_at_scrape_time():
+    values = iter([3, 5])
+    gauge = Gauge("test_in_use", "Test gauge")
+    gauge.set_function(lambda: next(values))
+    assert gauge.render()[-1] == "test_in_use 3"
+    assert gauge.render()[-1] == "test_in_use 5"
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("test_untyped", "Test metric")
+
+
+def test_metrics_endpoint_reports_requests_and_stages(client):
+    client.post("/api/elements/", json={"1": {"id": "metrics1", "data": ["1 2 3"], "deviceName": "M"}})
+    client.get("/api/elements/metrics1")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    # The registry is per process, so other test modules add to the counts
+    assert any(
+        line.startswith('http_requests_total{method="GET",route="/api/elements/{element_id}",status="200"} ')
+        for line in lines
+    )
+    for stage in ("validation", "process_data", "db_flush", "db_commit", "serialization"):
+        assert any(line.startswith(f'processing_stage_duration_seconds_count{{stage="{stage}"}}') for line in lines)
+    assert any(line.startswith("db_pool_connections_in_use ") for line in lines)
+    assert any(line.startswith("db_pool_checkout_wait_seconds_count ") for line in lines)
+
+
+def stage_count(client, stage):
+    prefix = f'processing_stage_duration_seconds_count{{stage="{stage}"}} '
+    lines = [line for line in client.get("/metrics").text.splitlines() if line.startswith(prefix)]
+    return float(lines[0][len(prefix):]) if lines else 0.0
+
+
+def test_process_data_is_timed_for_pool_and_inline_elements(client):
+    before = stage_count(client, "process_data")
+    element = {"id": "metrics-bg", "data": ["1 2 3"], "deviceName": "M"}
+    assert client.post("/api/elements/", params={"background": True}, json={"1": element}).status_code == 202
+    deadline = time.monotonic() + 60
+    while client.get("/api/elements/metrics-bg").json()["status"] == "pending" and time.monotonic() < deadline:
+        time.sleep(0.1)
+    # The statistics ran in a worker process, but the stage is observed by the API
+    assert stage_count(client, "process_data") == before + 1
+
+    client.post("/api/elements/", json={"1": {"id": "metrics-inline", "data": ["1 2 3"], "deviceName": "M"}})
+    assert stage_count(client, "process_data") == before + 2
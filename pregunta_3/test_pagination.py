@@ -0,0 +1,112 @@
+"""
+Keyset pagination tests: walking the list with X-Next-Cursor, including rows
+that share a created_date.
+"""
+import base64
+import random
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+import fast_json
+from config import settings
+from database import engine
+from main import app
+from models import ProcessingResult
+
+# Two timestamps shared by most rows, so pages break inside a tie
+SHARED_DATES = [datetime(2026, 3, 1, 12, 0), datetime(2026, 3, 2, 8, 30)]
+
+
+@pytest.fixture(scope="module")
+def ids():
+    ids = [f"page{i:02d}" for i in range(23)]
+    random.Random(7).shuffle(ids)
+    return ids
+
+
+@pytest.fixture(scope="module")
+def client(ids):
+    with TestClient(app) as test_client:
+        payload = {
+            str(i): {"id": element_id, "data": ["1 2 3"], "deviceName": f"PAGE {i % 3}"}
+            for i, element_id in enumerate(ids)
+        }
+        assert test_client.post("/api/elements/", json=payload).status_code == 200
+        with engine.begin() as conn:
+            for i, element_id in enumerate(ids):
+                created = SHARED_DATES[i % 2] if i < 20 else datetime(2026, 3, 1, 18, i)
+                conn.execute(
+                    update(ProcessingResult).where(ProcessingResult.id == element_id)
+                    .values(created_date=created)
+                )
+        yield test_client
+
+
+def walk(client, limit):
+    """Follow X-Next-Cursor from the first page until a page comes without it"""
+    seen, cursor = [], None
+    for _ in range(100):
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/elements/", params=params)
+        assert response.status_code == 200
+        page = [item["id"] for item in response.json()]
+        seen.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            assert len(page) < limit
+            return seen
+    pytest.fail("pagination did not end")
+
+
+def expected_order(client, ids):
+    items = [client.get(f"/api/elements/{element_id}").json() for element_id in ids]
+    return [item["id"] for item in sorted(items, key=lambda item: (item["created_date"], item["id"]))]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("limit", [1, 4, 7, 23])
+def test_pages_have_no_duplicates_or_gaps(client, ids, monkeypatch, fast, limit):
+    monkeypatch.setattr(settings, "fast_json", fast)
+    if fast:
+        monkeypatch.setattr(fast_json, "orjson", pytest.importorskip("orjson"))
+    seen = walk(client, limit)
+    assert len(seen) == len(set(seen))
+    assert seen == expected_order(client, ids)
+
+
+def test_rows_added_behind_the_cursor_do_not_shift_pages(client, ids):
+    first = client.get("/api/elements/", params={"limit": 5})
+    cursor = first.headers["X-Next-Cursor"]
+    before = client.get("/api/elements/", params={"limit": 5, "cursor": cursor}).json()
+
+    payload = {"0": {"id": "page-early", "data": ["1"], "deviceName": "PAGE 0"}}
+    assert client.post("/api/elements/", json=payload).status_code == 200
+    with engine.begin() as conn:
+        conn.execute(
+            update(ProcessingResult).where(ProcessingResult.id == "page-early")
+            .values(created_date=datetime(2026, 1, 1))
+        )
+
+    after = client.get("/api/elements/", params={"limit": 5, "cursor": cursor}).json()
+    assert [item["id"] for item in after] == [item["id"] for item in before]
+
+
+def encode(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode("plain text"),
+    encode('["2026-03-01T12:00:00"]'),
+    encode('["yesterday", "page01"]'),
+    encode('[null, "page01"]'),
+    encode('{"created_date": "2026-03-01T12:00:00"}'),
+])
+def test_bad_cursor_is_rejected(client, cursor):
+    response = client.get("/api/elements/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
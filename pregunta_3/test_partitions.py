@@ -0,0 +1,40 @@
+"""
+Partition helper tests. Partitioning itself is PostgreSQL only; on SQLite
+maintenance must be a no-op and ids must stay unique.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import partitions
+from database import engine
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_month_arithmetic():
+    month = partitions.month_start(datetime(2025, 11, 17, 13, 45, 12, 5))
+    assert month == datetime(2025, 11, 1)
+    assert partitions.add_months(month, 2) == datetime(2026, 1, 1)
+    assert partitions.add_months(month, -11) == datetime(2024, 12, 1)
+    assert partitions.partition_name(month) == "processing_results_p2025_11"
+    assert partitions.PARTITION_NAME.match("processing_results_p2025_11")
+    assert not partitions.PARTITION_NAME.match(partitions.DEFAULT_PARTITION)
+
+
+def test_maintenance_is_a_noop_without_partitioning(client):
+    with engine.connect() as connection:
+        assert not partitions.is_partitioned(connection)
+        assert partitions.maintain(connection, retention_months=1) == {"created": [], "dropped": []}
+
+
+def test_ids_stay_unique(client):
+    element = {"id": "part1", "data": ["1 2 3"], "deviceName": "PART"}
+    assert client.post("/api/elements/", json={"1": element}).status_code == 200
+    assert client.post("/api/elements/", json={"1": element}).status_code == 409
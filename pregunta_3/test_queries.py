@@ -0,0 +1,114 @@
+"""
+Query-count tests: list, get and create must not load devices row by row (N+1).
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+
+from database import async_engine, engine
+from main import app
+from models import Device, ProcessingResult
+
+
+class StatementCounter:
+    """Counts SQL statements sent to the database"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self)
+
+
+def make_payload(prefix, count, devices):
+    return {
+        str(i): {
+            "id": f"{prefix}{i}",
+            "data": ["1 2 3", "4 5 6"],
+            "deviceName": f"DEVICE {i % devices}",
+        }
+        for i in range(count)
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_create_query_count_is_constant(client):
+    with StatementCounter() as small:
+        response = client.post("/api/elements/", json=make_payload("small", 5, devices=5))
+    assert response.status_code == 200
+
+    with StatementCounter() as large:
+        response = client.post("/api/elements/", json=make_payload("large", 200, devices=10))
+    assert response.status_code == 200
+    assert len(response.json()) == 200
+
+    assert large.count == small.count
+
+
+def test_list_page_uses_one_query(client):
+    with StatementCounter() as counter:
+        response = client.get("/api/elements/", params={"limit": 150})
+    assert response.status_code == 200
+    assert len(response.json()) == 150
+    assert len({result["device"]["device_name"] for result in response.json()}) > 1
+    assert counter.count == 1
+
+
+def test_get_element_uses_one_query(client):
+    with StatementCounter() as counter:
+        response = client.get("/api/elements/large7")
+    assert response.status_code == 200
+    assert response.json()["device"]["device_name"] == "DEVICE 7"
+    assert counter.count == 1
+
+
+def test_known_devices_skip_device_lookups(client):
+    client.post("/api/elements/", json=make_payload("warm", 3, devices=3))
+
+    with StatementCounter() as counter:
+        response = client.post("/api/elements/", json=make_payload("cached", 50, devices=3))
+    assert response.status_code == 200
+    assert counter.count == 2  # the result INSERT and the rollup upsert
+
+    stats = client.get("/health").json()["device_cache"]
+    assert stats["hits"] >= 3
+
+
+@pytest.mark.parametrize("case", ["existing", "repeated"])
+def test_duplicate_in_batch_writes_nothing(client, case):
+    prefix = f"rollback-{case}-"
+    payload = make_payload(prefix, 5, devices=5)
+    for item in payload.values():
+        item["deviceName"] = f"{prefix.upper()}{item['deviceName']}"
+    # An id already stored, or one repeated within the batch, in its middle
+    payload["2"]["id"] = "large7" if case == "existing" else f"{prefix}0"
+
+    response = client.post("/api/elements/", json=payload)
+    assert response.status_code == 409
+
+    with engine.connect() as conn:
+        assert conn.scalar(
+            select(func.count()).select_from(ProcessingResult).where(ProcessingResult.id.startswith(prefix))
+        ) == 0
+        assert conn.scalar(
+            select(func.count()).select_from(Device).where(Device.device_name.startswith(prefix.upper()))
+        ) == 0
+    assert client.get("/api/elements/large7").json()["device"]["device_name"] == "DEVICE 7"
+
+    # The rolled back devices are not served from the device cache afterwards
+    payload["2"]["id"] = f"{prefix}2"
+    assert client.post("/api/elements/", json=payload).status_code == 200
+    assert client.get(f"/api/elements/{prefix}3").json()["device"]["device_name"] == f"{prefix.upper()}DEVICE 3"
@@ -0,0 +1,37 @@
+"""
+Round-trip tests for the binary raw data encoding.
+"""
+import numpy as np
+import pytest
+
+import raw_codec
+from stats_engine import NumpyStatisticsEngine, PythonStatisticsEngine, get_engine
+
+DATA = ["1 2 3", "4.5", "", "-7 8e3"]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip_preserves_rows(compress):
+    values, row_lengths = get_engine().parse_rows(DATA)
+    blob = raw_codec.encode(values, row_lengths, compress=compress)
+
+    decoded = raw_codec.decode(blob)
+    assert [row.tolist() for row in decoded.rows()] == [[1, 2, 3], [4.5], [], [-7, 8000]]
+    assert np.array_equal(decoded.values, values)
+
+
+def test_uncompressed_decode_does_not_copy():
+    blob = raw_codec.encode(np.arange(5.0), np.array([5]))
+    assert not raw_codec.decode(blob).values.flags.owndata
+
+
+def test_rejects_mismatched_row_lengths():
+    with pytest.raises(ValueError):
+        raw_codec.encode(np.arange(3.0), np.array([2]))
+
+
+@pytest.mark.parametrize("engine", [PythonStatisticsEngine(), NumpyStatisticsEngine()])
+def test_parse_rows_counts_values_per_row(engine):
+    values, row_lengths = engine.parse_rows(DATA + ["  1_000\t2 "])
+    assert row_lengths.tolist() == [3, 1, 0, 2, 2]
+    assert np.array_equal(values, np.append(engine.parse(DATA), [1000, 2]))
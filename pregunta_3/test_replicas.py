@@ -0,0 +1,117 @@
+"""
+Read replica tests: read-only endpoints use a healthy replica, writes and
+clients inside the read-your-writes window use the primary, and reads fall
+back to the primary when no replica passes its health check.
+"""
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from config import settings
+from main import app
+from models import Base, Device, ProcessingResult
+from replicas import READ_PRIMARY_COOKIE, replica_router
+from response_cache import MemoryCacheBackend, response_cache
+
+REPLICA_DB = os.path.join(tempfile.mkdtemp(), "test_replicas_replica.db")
+
+
+@pytest.fixture(scope="module")
+def replica_url():
+    # A separate database standing in for a replica, with a row the primary lacks
+    url = f"sqlite:///{REPLICA_DB}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        device_id = conn.scalar(insert(Device).returning(Device.id), {"device_name": "REPLICA ONLY"})
+        conn.execute(insert(ProcessingResult), [
+            {
+                "id": element_id,
+                "device_id": device_id,
+                "average_before_normalization": 2.0,
+                "average_after_normalization": 0.5,
+                "data_size": 3,
+                "raw_data": ["1 2 3"],
+                "created_date": datetime(2025, 1, 1),
+                "updated_date": datetime(2025, 1, 1),
+            }
+            # "rep-cached" also exists on the primary, where the replica lags behind
+            for element_id in ("replica-only", "rep-cached")
+        ])
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def client(replica_url):
+    replica_router.configure([replica_url])
+    with TestClient(app) as test_client:
+        yield test_client
+    replica_router.configure([])
+
+
+def device_names(response):
+    assert response.status_code == 200
+    body = response.json()
+    return {item["id"]: item["device"]["device_name"] for item in (body if isinstance(body, list) else [body])}
+
+
+def test_reads_go_to_replica(client):
+    response = client.get("/api/elements/replica-only")
+    assert response.status_code == 200
+    assert response.json()["device"]["device_name"] == "REPLICA ONLY"
+    assert {row["id"] for row in client.get("/api/elements/?device_id=1").json()} == {"replica-only", "rep-cached"}
+    assert client.get("/health").json()["replicas"][0]["healthy"] is True
+
+
+def test_writes_go_to_primary(client):
+    payload = {"0": {"id": "rep-write-1", "data": ["1 2 3"], "deviceName": "REPLICA TEST"}}
+    assert client.post("/api/elements/", json=payload).status_code == 200
+    # Without a read-your-writes window the read is served by the replica
+    assert READ_PRIMARY_COOKIE not in client.cookies
+    assert client.get("/api/elements/rep-write-1").status_code == 404
+
+
+def test_read_your_writes_window(client, monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_window", 5.0)
+    payload = {"0": {"id": "rep-write-2", "data": ["1 2 3"], "deviceName": "REPLICA TEST"}}
+    response = client.post("/api/elements/", json=payload)
+    assert response.status_code == 200
+    assert READ_PRIMARY_COOKIE in response.cookies
+
+    assert client.get("/api/elements/rep-write-2").status_code == 200
+    client.cookies.clear()
+    assert client.get("/api/elements/rep-write-2").status_code == 404
+
+
+def test_unhealthy_replica_falls_back_to_primary(client):
+    replica_router.configure([f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'missing', 'replica.db')}"])
+    client.portal.call(replica_router.check)
+    assert client.get("/health").json()["replicas"][0]["healthy"] is False
+    payload = {"0": {"id": "rep-write-3", "data": ["1 2 3"], "deviceName": "REPLICA TEST"}}
+    assert client.post("/api/elements/", json=payload).status_code == 200
+    assert client.get("/api/elements/rep-write-3").status_code == 200
+
+
+def test_read_your_writes_bypasses_response_cache(client, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryCacheBackend())
+    payload = {"0": {"id": "rep-cached", "data": ["1 2 3"], "deviceName": "REPLICA ONLY"}}
+    assert client.post("/api/elements/", json=payload).status_code == 200
+
+    monkeypatch.setattr(settings, "read_your_writes_window", 5.0)
+    response = client.put("/api/elements/rep-cached", json={"device_name": "REPLICA UPDATED"})
+    assert response.status_code == 200
+    assert READ_PRIMARY_COOKIE in client.cookies
+
+    # Another client reads the lagging replica, and its responses are cached
+    other = TestClient(app)
+    for _ in range(2):
+        assert device_names(other.get("/api/elements/rep-cached"))["rep-cached"] == "REPLICA ONLY"
+        assert device_names(other.get("/api/elements/"))["rep-cached"] == "REPLICA ONLY"
+
+    assert device_names(client.get("/api/elements/rep-cached"))["rep-cached"] == "REPLICA UPDATED"
+    assert device_names(client.get("/api/elements/"))["rep-cached"] == "REPLICA UPDATED"
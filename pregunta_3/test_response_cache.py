@@ -0,0 +1,113 @@
+"""
+Response cache and ETag tests for GET /api/elements/, using the in-memory
+backend and a fake Redis client.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from response_cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache, response_cache
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for RedisCacheBackend"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+
+@pytest.fixture(params=["memory", "redis"])
+def client(request):
+    response_cache.backend = MemoryCacheBackend() if request.param == "memory" else RedisCacheBackend(FakeRedis())
+    with TestClient(app) as test_client:
+        yield test_client
+    response_cache.backend = None
+
+
+def create(client, element_id, device_name="CT SCAN"):
+    response = client.post("/api/elements/", json={
+        "1": {"id": element_id, "data": ["1 2 3"], "deviceName": device_name}
+    })
+    assert response.status_code == 200
+
+
+def test_unchanged_element_returns_304(client):
+    create(client, f"etag-{id(client)}")
+    first = client.get(f"/api/elements/etag-{id(client)}")
+    assert first.status_code == 200
+
+    second = client.get(f"/api/elements/etag-{id(client)}", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_update_and_delete_invalidate_cached_element(client):
+    element_id = f"inv-{id(client)}"
+    create(client, element_id)
+    etag = client.get(f"/api/elements/{element_id}").headers["ETag"]
+
+    client.put(f"/api/elements/{element_id}", json={"device_name": "MRI SCANNER"})
+    updated = client.get(f"/api/elements/{element_id}", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["device"]["device_name"] == "MRI SCANNER"
+
+    client.delete(f"/api/elements/{element_id}")
+    assert client.get(f"/api/elements/{element_id}").status_code == 404
+
+
+def test_writes_invalidate_cached_lists(client):
+    params = {"limit": 1000}
+    before = client.get("/api/elements/", params=params).json()
+    create(client, f"list-{id(client)}")
+    after = client.get("/api/elements/", params=params).json()
+    assert len(after) == len(before) + 1
+
+
+def test_memory_backend_expires_and_evicts():
+    backend = MemoryCacheBackend(max_entries=2)
+
+    async def scenario():
+        await backend.set("a", b"1", ex=60)
+        await backend.set("b", b"2", ex=60)
+        await backend.get("a")
+        await backend.set("c", b"3", ex=60)  # evicts "b", the least recently used
+        evicted = [await backend.get(key) for key in "abc"]
+        await backend.set("d", b"4", ex=-1)  # already expired
+        return evicted, await backend.get("d")
+
+    assert asyncio.run(scenario()) == ([b"1", None, b"3"], None)
+
+
+def test_list_generation_survives_eviction():
+    cache = ResponseCache(MemoryCacheBackend(max_entries=3), ttl=60)
+    params = [("limit", "10")]
+
+    async def scenario():
+        await cache.invalidate()
+        stale_key = await cache.list_key(params)
+        await cache.set(stale_key, b"[old]", {"ETag": '"old"'})
+        await cache.invalidate()
+        # More entries than max_entries: the LRU drops the oldest ones
+        for element_id in ("a", "b", "c"):
+            await cache.set(cache.element_key(element_id), b"{}", {"ETag": '"e"'})
+        await cache.invalidate()
+        key = await cache.list_key(params)
+        return key != stale_key, await cache.get(key)
+
+    assert asyncio.run(scenario()) == (True, None)
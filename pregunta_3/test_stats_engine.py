@@ -0,0 +1,56 @@
+"""
+Parity tests between the NumPy and the float() statistics engines.
+"""
+import numpy as np
+import pytest
+
+from stats_engine import NumpyStatisticsEngine, PythonStatisticsEngine, StatisticsEngine
+from utils import normalize_data
+
+ENGINES = [PythonStatisticsEngine(), NumpyStatisticsEngine()]
+
+
+def test_base_engine_is_abstract():
+    with pytest.raises(TypeError):
+        StatisticsEngine()
+
+
+@pytest.mark.parametrize("data", [
+    ["inf -inf", "Infinity"],
+    ["nan NaN 1"],
+    ["1e5 1E-3 -2.5e+2"],
+    ["  1 \t 2  ", "\t3\n"],
+    ["", "4", ""],
+    ["", "  ", "\t"],
+    [],
+    ["+1 -0 1_000"],
+])
+def test_engines_parse_the_same_values(data):
+    python, numpy = (engine.parse(data) for engine in ENGINES)
+    assert numpy.dtype == python.dtype == np.float64
+    assert np.array_equal(numpy, python, equal_nan=True)
+    assert np.array_equal(np.signbit(numpy), np.signbit(python))
+
+
+@pytest.mark.parametrize("data", [["1 2 x"], ["1,5"], ["2abc"], ["0x10"]])
+def test_engines_reject_the_same_tokens(data):
+    for engine in ENGINES:
+        with pytest.raises(ValueError, match="could not convert"):
+            engine.parse(data)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_empty_rows_have_no_values(engine):
+    with pytest.raises(ValueError, match="No numeric values"):
+        engine.process(["", "   "])
+
+
+@pytest.mark.parametrize("data, expected", [
+    (["0 0", "0"], [0.0, 0.0, 0.0]),
+    (["-2 0 -1"], [0.0, 0.0, 0.0]),
+    (["1 2 4"], [0.25, 0.5, 1.0]),
+])
+def test_normalized_values_match_avg_after(data, expected):
+    normalized, _, avg_after = normalize_data(data)
+    assert normalized == expected
+    assert avg_after == pytest.approx(np.mean(normalized))
@@ -0,0 +1,123 @@
+"""
+Streaming NDJSON upload tests: per-line outcomes, batching, line limits and
+incremental line splitting.
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import settings
+from main import app, iter_ndjson_lines
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        assert test_client.post("/api/elements/", json={
+            "1": {"id": "stream-existing", "data": ["1 2"], "deviceName": "STREAM A"}
+        }).status_code == 200
+        yield test_client
+
+
+def element(element_id, device="STREAM A", data=("1 2 3",)):
+    return json.dumps({"id": element_id, "data": list(data), "deviceName": device})
+
+
+def upload(client, lines, batch_size=500, newline_at_end=True):
+    body = "\n".join(lines) + ("\n" if newline_at_end else "")
+    response = client.post(f"/api/elements/stream?batch_size={batch_size}", content=body.encode())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    outcomes = [json.loads(line) for line in response.text.splitlines()]
+    return {outcome["line"]: outcome for outcome in outcomes}
+
+
+def statuses(outcomes):
+    return {line: outcome["status_code"] for line, outcome in outcomes.items()}
+
+
+def exists(client, element_id):
+    return client.get(f"/api/elements/{element_id}").status_code == 200
+
+
+@pytest.mark.parametrize("batch_size", [1, 500])
+def test_mixed_upload(client, batch_size):
+    prefix = f"mixed{batch_size}"
+    outcomes = upload(client, [
+        element(f"{prefix}-a"),
+        "{not json",
+        json.dumps({"id": f"{prefix}-b", "data": ["1"]}),
+        element(f"{prefix}-c", data=[""]),
+        element("stream-existing"),
+        "",
+        element(f"{prefix}-d", device="STREAM B"),
+    ], batch_size=batch_size)
+    assert statuses(outcomes) == {1: 201, 2: 400, 3: 400, 4: 422, 5: 409, 7: 201}
+    assert outcomes[1]["result"]["id"] == f"{prefix}-a"
+    assert outcomes[2]["detail"] == "Invalid JSON"
+    assert "Missing required fields" in outcomes[3]["detail"]
+    assert outcomes[7]["result"]["device"]["device_name"] == "STREAM B"
+    assert exists(client, f"{prefix}-a") and exists(client, f"{prefix}-d")
+    assert not exists(client, f"{prefix}-b") and not exists(client, f"{prefix}-c")
+
+
+def test_last_line_without_newline(client):
+    outcomes = upload(client, [element("nonl-a"), element("nonl-b")], newline_at_end=False)
+    assert statuses(outcomes) == {1: 201, 2: 201}
+    assert exists(client, "nonl-b")
+
+
+def test_conflict_keeps_the_rest_of_its_batch(client):
+    lines = [element(f"conflict-{i}") for i in range(3)] + [element("stream-existing")]
+    lines += [element(f"conflict-{i}") for i in range(3, 6)]
+    outcomes = upload(client, lines, batch_size=10)
+    assert statuses(outcomes) == {1: 201, 2: 201, 3: 201, 4: 409, 5: 201, 6: 201, 7: 201}
+    assert all(exists(client, f"conflict-{i}") for i in range(6))
+
+
+def test_duplicate_within_upload(client):
+    outcomes = upload(client, [element("dup-a"), element("dup-b"), element("dup-a")], batch_size=2)
+    assert statuses(outcomes) == {1: 201, 2: 201, 3: 409}
+
+
+def test_long_lines_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "stream_max_line_size", 200)
+    long_line = element("long-a", data=[" ".join(["1"] * 200)])
+    outcomes = upload(client, [element("long-ok"), long_line, element("long-b")])
+    assert statuses(outcomes) == {1: 201, 2: 413, 3: 201}
+    assert not exists(client, "long-a")
+
+
+def test_chunked_upload(client):
+    body = "\n".join([element("chunked-a"), element("chunked-b")]).encode()
+    chunks = (body[i:i + 7] for i in range(0, len(body), 7))
+    response = client.post("/api/elements/stream?batch_size=1", content=chunks)
+    outcomes = [json.loads(line) for line in response.text.splitlines()]
+    assert [(outcome["line"], outcome["status_code"]) for outcome in outcomes] == [(1, 201), (2, 201)]
+
+
+class FakeRequest:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def split_lines(chunks, max_line_size=100):
+    async def collect():
+        return [line async for line in iter_ndjson_lines(FakeRequest(chunks), max_line_size)]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 64])
+def test_lines_split_across_chunks(size):
+    body = b"a\n\nbcd\n" + b"x" * 30 + b"\nlast"
+    chunks = [body[i:i + size] for i in range(0, len(body), size)]
+    assert split_lines(chunks) == [b"a", b"", b"bcd", b"x" * 30, b"last"]
+    # Lines over the limit are yielded as None, whichever chunk ends them
+    assert split_lines(chunks, max_line_size=10) == [b"a", b"", b"bcd", None, b"last"]
+    assert split_lines(chunks, max_line_size=3) == [b"a", b"", b"bcd", None, None]
@@ -0,0 +1,184 @@
+"""
+Process pool for the CPU-bound parts of ingestion.
+
+Large payload elements are validated and parsed in the pool while the
+request waits, so other requests keep being served. Elements ingested with
+``background=true`` are stored as pending with only their raw rows; their
+statistics are computed in the pool from the values parsed during
+validation and written back by a task on the API's event loop. Results
+still pending when the API stops are picked up again on the next start.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from pydantic import ValidationError
+
+from sqlalchemy import select
+
+from config import settings
+from crud import (
+    compute_result_fields, complete_processing_results, fail_processing_results,
+)
+from database import AsyncSessionLocal
+from metrics import STAGE_LATENCY
+from models import ProcessingResult, STATUS_PENDING
+from response_cache import response_cache
+from schemas import ProcessingResultCreate, format_validation_error
+
+logger = logging.getLogger(__name__)
+
+# (result id, data rows, parsed values, values per row); the parsed parts are
+# None when the rows were not parsed yet (results resumed from the database)
+Element = Tuple[str, List[str], Optional[np.ndarray], Optional[np.ndarray]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_tasks: Set[asyncio.Task] = set()
+
+
+def pool_size() -> int:
+    return settings.worker_pool_size or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The shared worker pool, started on first use"""
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def reset_pool() -> None:
+    """Stop the pool; the next submission starts a fresh one"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def validate_element(
+    key: str, element: Dict[str, Any]
+) -> Union[ProcessingResultCreate, str]:
+    """Validate and parse one payload element, or describe why it is invalid"""
+    try:
+        return ProcessingResultCreate(
+            id=element['id'],
+            data=element['data'],
+            device_name=element['deviceName']
+        )
+    except ValidationError as validation_error:
+        return format_validation_error(key, validation_error)
+
+
+def element_size(element: Dict[str, Any]) -> int:
+    data = element.get('data')
+    if not isinstance(data, list):
+        return 0
+    return sum(len(row) for row in data if isinstance(row, str))
+
+
+async def validate_elements(
+    elements: Sequence[Tuple[str, Dict[str, Any]]]
+) -> List[Union[ProcessingResultCreate, str]]:
+    """Validate (key, element) pairs; elements above the inline limit run in the pool"""
+    loop = asyncio.get_running_loop()
+    outcomes = [
+        loop.run_in_executor(get_pool(), validate_element, key, element)
+        if element_size(element) > settings.inline_parse_max_size
+        else validate_element(key, element)
+        for key, element in elements
+    ]
+    try:
+        return [
+            await outcome if isinstance(outcome, asyncio.Future) else outcome
+            for outcome in outcomes
+        ]
+    except BrokenProcessPool:
+        reset_pool()
+        raise
+
+
+def compute_many(elements: List[Element]) -> Dict[str, Optional[dict]]:
+    """Compute the stored fields of several elements (runs in a worker process)"""
+    computed = {}
+    for element_id, data, values, row_lengths in elements:
+        try:
+            computed[element_id] = compute_result_fields(data, values, row_lengths)
+        except ValueError:
+            computed[element_id] = None
+    return computed
+
+
+def submit(elements: Sequence[Element]) -> None:
+    """Schedule the statistics of pending elements, split across the pool"""
+    if not elements:
+        return
+    chunk_size = -(-len(elements) // pool_size())
+    for start in range(0, len(elements), chunk_size):
+        task = asyncio.create_task(_complete(list(elements[start:start + chunk_size])))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+async def _complete(elements: List[Element]) -> None:
+    try:
+        # Timed here: observations made in a worker go to that process's registry
+        with STAGE_LATENCY.time(stage="process_data"):
+            computed = await asyncio.get_running_loop().run_in_executor(
+                get_pool(), compute_many, elements
+            )
+    except BrokenProcessPool as e:
+        # A worker died; start a fresh pool for later submissions
+        logger.error(
+            "Background processing of %s elements failed, left pending: %s",
+            len(elements), e,
+        )
+        reset_pool()
+        return
+
+    fields = {
+        element_id: value for element_id, value in computed.items() if value is not None
+    }
+    failed = [element_id for element_id, value in computed.items() if value is None]
+    try:
+        async with AsyncSessionLocal() as db:
+            completed = await complete_processing_results(db, fields) if fields else []
+            if failed:
+                await fail_processing_results(db, failed)
+        await response_cache.invalidate(*completed, *failed)
+    except Exception as e:
+        # Left pending; retried on the next start
+        logger.error("Error storing background results: %s", e)
+        return
+
+    logger.info(
+        "Background processing completed %s elements, %s failed",
+        len(completed), len(failed),
+    )
+
+
+async def resume_pending() -> int:
+    """Schedule results left pending by a previous run"""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(ProcessingResult.id, ProcessingResult.raw_data)
+            .where(ProcessingResult.status == STATUS_PENDING)
+        )).all()
+    submit([(row.id, row.raw_data, None, None) for row in rows])
+    return len(rows)
+
+
+async def shutdown() -> None:
+    """Stop the pool; unfinished elements stay pending until the next start"""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*list(_tasks), return_exceptions=True)
+    reset_pool()